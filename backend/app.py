@@ -1,22 +1,32 @@
 from __future__ import annotations
 
+import hmac
 import os
 from datetime import date, timedelta
 from decimal import Decimal, InvalidOperation
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
+import db.async_connection
+import db.connection
+from db import invalidation_bus, unit_of_work
+import json_provider
+import metrics
+import profiling
+import query_trace
+from http_cache import conditional_get
 from services.categories_service import CategoriesService
 from services.users_service import UsersService
 from config import AppConfig
 from services.expenses_service import ExpensesService
 from services.summary_service import SummaryService
 from services.charts_service import ChartsService
+from services.dashboard_service import DashboardService
+from services.import_service import ImportMapping, ImportService
+from services.response_cache import ResponseCache
 from flask_jwt_extended import (
     JWTManager,
-    create_access_token,
-    create_refresh_token,
     get_jwt_identity,
     jwt_required,
     set_access_cookies,
@@ -26,6 +36,120 @@ from flask_jwt_extended import (
  )
 
 
+def _parse_date_range() -> tuple[date | None, date | None, str | None]:
+    """Parses the optional `from`/`to` query parameters of the current request."""
+    from_param = request.args.get("from")
+    to_param = request.args.get("to")
+
+    from_date = None
+    to_date = None
+
+    if from_param:
+        try:
+            from_date = date.fromisoformat(from_param)
+        except ValueError:
+            return None, None, "Invalid from date format. Expected YYYY-MM-DD"
+
+    if to_param:
+        try:
+            to_date = date.fromisoformat(to_param)
+        except ValueError:
+            return None, None, "Invalid to date format. Expected YYYY-MM-DD"
+
+    if from_date and to_date and from_date > to_date:
+        return None, None, "'from' cannot be after 'to'"
+
+    return from_date, to_date, None
+
+
+def _parse_expense_filters() -> tuple[dict | None, str | None]:
+    """Parses the expense list filters (from/to/minAmount/maxAmount/category/search/searchMode) of the current request."""
+    min_amount_param = request.args.get("minAmount")
+    max_amount_param = request.args.get("maxAmount")
+    category_id_param = request.args.get("category")
+    search_param = request.args.get("search")
+
+    min_amount = None
+    max_amount = None
+    category_id = None
+    search = None
+
+    from_date, to_date, error = _parse_date_range()
+    if error:
+        return None, error
+
+    if min_amount_param:
+        try:
+            min_amount = Decimal(min_amount_param)
+        except (InvalidOperation, ValueError):
+            return None, "Invalid minAmount format. Expected numeric value"
+
+    if max_amount_param:
+        try:
+            max_amount = Decimal(max_amount_param)
+        except (InvalidOperation, ValueError):
+            return None, "Invalid maxAmount format. Expected numeric value"
+
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        return None, "minAmount cannot be greater than maxAmount"
+
+    if category_id_param:
+        try:
+            category_id = int(category_id_param)
+        except ValueError:
+            return None, "Invalid categoryId format. Expected integer value"
+
+    if search_param:
+        search = search_param
+
+    search_mode = request.args.get("searchMode", "fulltext")
+    if search_mode not in ExpensesService.SEARCH_MODES:
+        return None, "Invalid searchMode. Expected 'fulltext', 'fuzzy' or 'literal'"
+
+    filters = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "category_id": category_id,
+        "search": search,
+        "search_mode": search_mode,
+    }
+    return filters, None
+
+
+def _parse_limit(default: int | None, maximum: int) -> tuple[int | None, str | None]:
+    """Parses the optional `limit` query parameter (1..maximum) of the current request."""
+    limit_param = request.args.get("limit")
+    if not limit_param:
+        return default, None
+
+    try:
+        limit = int(limit_param)
+    except ValueError:
+        return None, "Invalid limit format. Expected integer value"
+    if not 1 <= limit <= maximum:
+        return None, f"limit must be between 1 and {maximum}"
+    return limit, None
+
+
+def _parse_chart_options() -> tuple[str | None, str | None, str | None]:
+    """Parses the `mode` and `granularity` chart parameters of the current request."""
+    mode = request.args.get("mode", "expenses")
+    if mode not in DashboardService.CHART_MODES:
+        return None, None, "Invalid mode. Expected 'expenses' or 'aggregated'"
+
+    granularity = request.args.get("granularity", "month")
+    if mode == "aggregated" and granularity not in ChartsService.GRANULARITIES:
+        return None, None, "Invalid granularity. Expected one of: day, week, month"
+    return mode, granularity, None
+
+
+def _has_bearer_token(token: str) -> bool:
+    """Whether the current request carries `Authorization: Bearer <token>`."""
+    return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+
+
 def create_app() -> Flask:
     cfg = AppConfig.get_singleton()
     expenses_service = ExpensesService.get_singleton()
@@ -33,8 +157,16 @@ def create_app() -> Flask:
     users_service = UsersService.get_singleton()
     summary_service = SummaryService.get_singleton()
     charts_service = ChartsService.get_singleton()
+    import_service = ImportService.get_singleton()
+    dashboard_service = DashboardService.get_singleton()
 
     app = Flask(__name__)
+    json_provider.init_app(app, cfg)
+
+    # Request and query metrics; first, so they include the other hooks
+    metrics.init_app(app, cfg)
+    query_trace.init_app(app, cfg)
+    profiling.init_app(app, cfg)
 
     # JWT
     app.config['SECRET_KEY'] = cfg.secret_key
@@ -54,6 +186,13 @@ def create_app() -> Flask:
 
     jwt = JWTManager(app)
 
+    # One DB connection and transaction per request
+    unit_of_work.init_app(app, db.connection.get_pool)
+
+    # Hear about writes made by other workers
+    if cfg.response_cache_enabled and cfg.invalidation_bus_enabled:
+        ResponseCache.get_singleton().use_invalidation_bus(invalidation_bus.init_app(app))
+
     # CORS
     if cfg.cors_allow_all:
         CORS(app, supports_credentials=True)
@@ -65,6 +204,23 @@ def create_app() -> Flask:
     def health():
         return jsonify({"status": "ok"}), 200
 
+    # Internals, only for whoever holds the token
+    if cfg.health_token:
+        @app.get("/health/db")
+        def health_db():
+            if not _has_bearer_token(cfg.health_token):
+                return jsonify({"error": "Unauthorized"}), 401
+            stats = {"status": "ok", "pool": db.connection.pool_stats()}
+            if cfg.async_db_enabled:
+                stats["async_pool"] = db.async_connection.pool_stats()
+            return jsonify(stats), 200
+
+        @app.get("/health/cache")
+        def health_cache():
+            if not _has_bearer_token(cfg.health_token):
+                return jsonify({"error": "Unauthorized"}), 401
+            return jsonify({"status": "ok", "cache": ResponseCache.get_singleton().stats()}), 200
+
     @app.get("/api/v1/me")
     @jwt_required()
     def me():
@@ -85,13 +241,13 @@ def create_app() -> Flask:
         data = request.get_json()
         lgn = data["login"]
         password = data["password"]
-        if users_service.check_password(lgn, password):
-            access_token = create_access_token(identity=lgn)
-            refresh_token = create_refresh_token(identity=lgn)
+        user = users_service.authenticate(lgn, password)
+        if user is not None:
+            tokens = users_service.issue_tokens(user)
 
             response = jsonify({"msg": "login successful"})
-            set_access_cookies(response, access_token)
-            set_refresh_cookies(response, refresh_token)
+            set_access_cookies(response, tokens["auth_token"])
+            set_refresh_cookies(response, tokens["refresh_token"])
             return response, 200
         else:
             return "", 401
@@ -108,11 +264,9 @@ def create_app() -> Flask:
     @jwt_required(refresh=True)
     def refresh_token():
         # zwraca cookie http-only
-        lgn = get_jwt_identity()
-        response = {
-            "auth_token": create_access_token(identity=lgn),
-            "refresh_token": create_refresh_token(identity=lgn)
-        }
+        response = users_service.refresh_token()
+        if response is None:
+            return "", 401
         return jsonify(response), 200
 
     @app.put("/api/v1/update_user")
@@ -144,7 +298,8 @@ def create_app() -> Flask:
         expense_id = data["expense_id"]
         category_id = data["category_id"]
         amount = data["amount"]
-        expenses_service.update_expense(expense_id, category_id, amount)
+        if not expenses_service.update_expense(expense_id, category_id, amount):
+            return jsonify({"error": "Expense not found"}), 404
         return jsonify({"status": "ok"}), 200
 
     @app.delete("/api/v1/delete_expense")
@@ -152,74 +307,117 @@ def create_app() -> Flask:
     def delete_expense():
         data = request.get_json()
         expense_id = data["expense_id"]
-        expenses_service.delete_expense(expense_id)
+        if not expenses_service.delete_expense(expense_id):
+            return jsonify({"error": "Expense not found"}), 404
         return jsonify({"status": "ok"}), 200
 
+    @app.post("/api/v1/expenses/batch")
+    @jwt_required()
+    def batch_expenses():
+        data = request.get_json()
+        operations = data.get("operations") if isinstance(data, dict) else None
+        if not isinstance(operations, list):
+            return jsonify({"error": "Missing operations list"}), 400
+        if len(operations) > ExpensesService.MAX_BATCH_SIZE:
+            return jsonify({"error": f"At most {ExpensesService.MAX_BATCH_SIZE} operations per batch"}), 400
+
+        results = expenses_service.apply_batch(operations)
+        return jsonify({"results": results}), 200
+
     @app.get("/api/v1/expenses")
     @jwt_required()
+    @conditional_get()
     def expenses():
-        from_param = request.args.get("from")
-        to_param = request.args.get("to")
-        min_amount_param = request.args.get("minAmount")
-        max_amount_param = request.args.get("maxAmount")
-        category_id_param = request.args.get("category")
-        search_param = request.args.get("search")
-
-        from_date = None
-        to_date = None
-        min_amount = None
-        max_amount = None
-        category_id = None
-        search = None
-
-        if from_param:
-            try:
-                from_date = date.fromisoformat(from_param)
-            except ValueError:
-                return jsonify({"error": "Invalid from date format. Expected YYYY-MM-DD"}), 400
+        filters, error = _parse_expense_filters()
+        if error:
+            return jsonify({"error": error}), 400
 
-        if to_param:
-            try:
-                to_date = date.fromisoformat(to_param)
-            except ValueError:
-                return jsonify({"error": "Invalid to date format. Expected YYYY-MM-DD"}), 400
+        sort = request.args.get("sort")
+        if sort is not None and sort not in ExpensesService.SORT_ORDERS:
+            return jsonify({"error": "Invalid sort. Expected 'date_desc' or 'date_asc'"}), 400
 
-        if from_date and to_date and from_date > to_date:
-            return jsonify({"error": "'from' cannot be after 'to'"}), 400
+        cursor = request.args.get("cursor")
 
-        if min_amount_param:
-            try:
-                min_amount = Decimal(min_amount_param)
-            except (InvalidOperation, ValueError):
-                return jsonify({"error": "Invalid minAmount format. Expected numeric value"}), 400
+        # Without limit/cursor the endpoint keeps returning the full list
+        if request.args.get("limit") is None and cursor is None:
+            expenses_list = expenses_service.get_expenses_list(**filters, sort=sort)
+            return jsonify(expenses_list), 200
 
-        if max_amount_param:
-            try:
-                max_amount = Decimal(max_amount_param)
-            except (InvalidOperation, ValueError):
-                return jsonify({"error": "Invalid maxAmount format. Expected numeric value"}), 400
+        limit, error = _parse_limit(50, ExpensesService.MAX_PAGE_SIZE)
+        if error:
+            return jsonify({"error": error}), 400
+
+        try:
+            page = expenses_service.get_expenses_page(limit, cursor=cursor, sort=sort or "date_desc", **filters)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(page), 200
+
+    @app.get("/api/v1/expenses/suggestions")
+    @jwt_required()
+    def expense_suggestions():
+        prefix = request.args.get("q", "")
+
+        limit, error = _parse_limit(10, ExpensesService.MAX_SUGGESTIONS)
+        if error:
+            return jsonify({"error": error}), 400
 
-        if min_amount is not None and max_amount is not None and min_amount > max_amount:
-            return jsonify({"error": "minAmount cannot be greater than maxAmount"}), 400
+        return jsonify({"suggestions": expenses_service.suggest_descriptions(prefix, limit)}), 200
 
-        if category_id_param:
+    @app.get("/api/v1/expenses/export")
+    @jwt_required()
+    def export_expenses():
+        export_format = request.args.get("format", "csv")
+        if export_format not in ExpensesService.EXPORT_FORMATS:
+            return jsonify({"error": "Invalid format. Expected 'csv' or 'ndjson'"}), 400
+
+        filters, error = _parse_expense_filters()
+        if error:
+            return jsonify({"error": error}), 400
+
+        mimetype = ExpensesService.EXPORT_FORMATS[export_format]
+        return Response(
+            expenses_service.export_expenses(export_format, **filters),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename=expenses.{export_format}"},
+        )
+
+    @app.post("/api/v1/import_expenses")
+    @jwt_required()
+    def import_expenses():
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"error": "Missing file"}), 400
+
+        form = request.form
+        default_category_id = None
+        if form.get("defaultCategory"):
             try:
-                category_id = int(category_id_param)
+                default_category_id = int(form["defaultCategory"])
             except ValueError:
-                return jsonify({"error": "Invalid categoryId format. Expected integer value"}), 400
-
-        if search_param:
-            search = search_param
-
-        expenses_list = expenses_service.get_expenses_list(
-            from_date=from_date,
-            to_date=to_date,
-            min_amount=min_amount,
-            max_amount=max_amount,
-            category_id=category_id,
-            search=search,
+                return jsonify({"error": "Invalid defaultCategory format. Expected integer value"}), 400
+
+        mapping = ImportMapping(
+            date_column=form.get("dateColumn", "date"),
+            amount_column=form.get("amountColumn", "amount"),
+            notes_column=form.get("descriptionColumn", "description") or None,
+            category_column=form.get("categoryColumn", "category") or None,
+            date_format=form.get("dateFormat", "%Y-%m-%d"),
+            decimal_separator=form.get("decimalSeparator", "."),
+            delimiter=form.get("delimiter", ","),
+            default_category_id=default_category_id,
+            negate_amounts=form.get("negateAmounts", "false").lower() == "true",
         )
-        return jsonify(expenses_list), 200
+        if mapping.decimal_separator not in (".", ","):
+            return jsonify({"error": "Invalid decimalSeparator. Expected '.' or ','"}), 400
+        if len(mapping.delimiter) != 1:
+            return jsonify({"error": "Invalid delimiter. Expected a single character"}), 400
+
+        try:
+            result = import_service.import_csv(upload.stream, mapping)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(result), 200
 
     @app.post("/api/v1/add_category")
     @jwt_required()
@@ -237,7 +435,8 @@ def create_app() -> Flask:
         category_id = data["category_id"]
         category = data["category"]
         color = data["color"]
-        categories_service.update_category(category_id, category, color)
+        if not categories_service.update_category(category_id, category, color):
+            return jsonify({"error": "Category not found"}), 404
         return jsonify({"status": "ok"}), 200
 
     @app.delete("/api/v1/delete_category")
@@ -245,34 +444,83 @@ def create_app() -> Flask:
     def delete_category():
         data = request.get_json()
         category_id = data["category_id"]
-        categories_service.delete_category(category_id)
+        if not categories_service.delete_category(category_id):
+            return jsonify({"error": "Category not found"}), 404
         return jsonify({"status": "ok"}), 200
 
     @app.get("/api/v1/categories")
     @jwt_required()
+    @conditional_get()
     def categories():
         categories_list = categories_service.get_categories()
         return jsonify({"categories": categories_list}), 200
 
     @app.get("/api/v1/summary")
     @jwt_required()
+    # The summary covers the current month, so it also changes when the month does
+    @conditional_get(vary=lambda: date.today().strftime("%Y-%m"))
     def summary():
         summary_data = summary_service.get_summary()
         return jsonify(summary_data), 200
 
     @app.get("/api/v1/charts")
     @jwt_required()
+    @conditional_get()
     def charts():
-        charts_data = charts_service.get_charts_data()
-        return jsonify(charts_data), 200
+        mode, granularity, error = _parse_chart_options()
+        if error:
+            return jsonify({"error": error}), 400
 
-    return app
+        from_date, to_date, error = _parse_date_range()
+        if error:
+            return jsonify({"error": error}), 400
+
+        if mode == "aggregated":
+            charts_data = charts_service.get_aggregated_charts_data(granularity, from_date, to_date)
+        else:
+            charts_data = charts_service.get_charts_data(from_date=from_date, to_date=to_date)
+        return jsonify(charts_data), 200
 
+    @app.get("/api/v1/dashboard")
+    @jwt_required()
+    @unit_of_work.snapshot
+    # May include the summary, which changes with the month
+    @conditional_get(vary=lambda: date.today().strftime("%Y-%m"))
+    def dashboard():
+        fields_param = request.args.get("fields")
+        fields = [f.strip() for f in fields_param.split(",")] if fields_param else DashboardService.FIELDS
+        if any(f not in DashboardService.FIELDS for f in fields):
+            return jsonify({"error": "Invalid fields. Expected a comma-separated subset of: "
+                                     + ", ".join(DashboardService.FIELDS)}), 400
+
+        filters, error = _parse_expense_filters()
+        if error:
+            return jsonify({"error": error}), 400
+
+        mode, granularity, error = _parse_chart_options()
+        if error:
+            return jsonify({"error": error}), 400
+
+        sort = request.args.get("sort")
+        if sort is not None and sort not in ExpensesService.SORT_ORDERS:
+            return jsonify({"error": "Invalid sort. Expected 'date_desc' or 'date_asc'"}), 400
+
+        limit, error = _parse_limit(None, ExpensesService.MAX_PAGE_SIZE)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Concurrently on the async pool, or one query after another
+        get_dashboard = (dashboard_service.get_dashboard_concurrently if cfg.async_db_enabled
+                         else dashboard_service.get_dashboard)
+        dashboard_data = get_dashboard(
+            fields, chart_mode=mode, granularity=granularity, limit=limit, sort=sort, **filters)
+        return jsonify(dashboard_data), 200
 
-app = create_app()
+    return app
 
 
 if __name__ == "__main__":
+    # Development server; production serves wsgi:app with gunicorn.conf.py
     cfg = AppConfig.get_singleton()
     port = int(os.getenv("PORT", cfg.port))
-    app.run(host=cfg.host, port=port, debug=cfg.debug)
+    create_app().run(host=cfg.host, port=port, debug=cfg.debug)
@@ -0,0 +1,110 @@
+"""
+Compare /api/v1/dashboard throughput with sequential queries (sync pool) and
+concurrent queries (async pool, ASYNC_DB_ENABLED) under concurrent requests.
+
+Runs against the database configured through the DB_* variables, which has to
+be migrated; a throwaway user is created and deleted again. The gain grows
+with the round-trip time to the database, so measure against the deployed
+topology rather than a local socket.
+
+Usage (from backend/):
+    python -m benchmarks.dashboard_concurrency [--threads N] [--seconds S] [--expenses N]
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+
+import db.async_connection
+import db.connection
+from app import create_app
+from config import AppConfig
+
+
+def _seed(app, username: str, expenses: int) -> None:
+    client = app.test_client()
+    client.post("/api/v1/register", json={"login": username, "password": "bench", "budget": 5000})
+    with db.connection.get_connection() as conn:
+        user_id = conn.execute("SELECT user_id FROM users WHERE username = %s", (username,)).fetchone()["user_id"]
+        category_ids = [
+            conn.execute(
+                "INSERT INTO categories (user_id, name) VALUES (%s, %s) RETURNING category_id", (user_id, f"c{c}")
+            ).fetchone()["category_id"]
+            for c in range(8)
+        ]
+        today = date.today()
+        with conn.cursor().copy(
+                "COPY transactions (user_id, category_id, amount, transaction_date, notes) FROM STDIN") as copy:
+            for i in range(expenses):
+                copy.write_row((user_id, category_ids[i % 8], i % 200 + 1, today - timedelta(days=i % 365),
+                                f"expense {i}"))
+
+
+def _logged_in_client(app, username: str):
+    client = app.test_client()
+    client.post("/api/v1/login", json={"login": username, "password": "bench"})
+    return client
+
+
+def _measure(app, username: str, threads: int, seconds: float, url: str) -> tuple[int, list[float]]:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        nonlocal errors
+        client = _logged_in_client(app, username)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = client.get(url).status_code
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += status != 200
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return errors, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8, help="concurrent requests (gunicorn threads)")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--expenses", type=int, default=2000, help="expenses of the benchmark user")
+    parser.add_argument("--url", default="/api/v1/dashboard?limit=50&mode=aggregated&granularity=week")
+    args = parser.parse_args()
+
+    cfg = AppConfig.get_singleton()
+    cfg.response_cache_enabled = False
+    cfg.invalidation_bus_enabled = False
+    app = create_app()
+    app.config["JWT_COOKIE_SECURE"] = False
+
+    username = f"bench-{os.getpid()}-{int(time.time())}"
+    _seed(app, username, args.expenses)
+    try:
+        print(f"{args.threads} threads, {args.seconds:.0f} s each, {args.expenses} expenses, GET {args.url}")
+        for name, concurrent in (("sequential", False), ("concurrent", True)):
+            cfg.async_db_enabled = concurrent
+            _measure(app, username, args.threads, 1, args.url)  # warm up pools and caches
+            errors, latencies = _measure(app, username, args.threads, args.seconds, args.url)
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(f"  {name:<11} {len(latencies) / args.seconds:8.1f} req/s"
+                  f"   p50 {quantiles[49] * 1000:7.2f} ms   p95 {quantiles[94] * 1000:7.2f} ms"
+                  f"   errors {errors}")
+        print(f"\nsync pool:  {db.connection.pool_stats()}")
+        print(f"async pool: {db.async_connection.pool_stats()}")
+    finally:
+        with db.connection.get_connection() as conn:
+            conn.execute("DELETE FROM users WHERE username = %s", (username,))
+
+
+if __name__ == "__main__":
+    main()
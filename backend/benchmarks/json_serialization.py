@@ -0,0 +1,79 @@
+"""
+Time JSON responses of 10k expenses with Flask's default provider and with
+json_provider.OrjsonProvider.
+
+Usage (from backend/):
+    python -m benchmarks.json_serialization [--rows N] [--repeat N]
+"""
+import argparse
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from entities.transaction import Transaction
+from json_provider import OrjsonProvider
+
+
+def _transactions(rows: int) -> list[Transaction]:
+    start = date(2024, 1, 1)
+    return [
+        Transaction(i, 1, i % 12, Decimal(i % 10_000) / 100, start + timedelta(days=i % 365), f"expense {i}")
+        for i in range(rows)
+    ]
+
+
+def _charts(rows: int) -> dict:
+    return {
+        "barChartData": [
+            {
+                "month": f"2024-{m:02d}",
+                "expenses": [
+                    {"expense_id": i, "category": "Food", "amount": float(i % 100), "date": "2024-01-01",
+                     "description": f"expense {i}"}
+                    for i in range(m, rows, 12)
+                ],
+            }
+            for m in range(1, 13)
+        ],
+        "categoryData": [{"category_id": c, "name": f"c{c}", "color": "#000000"} for c in range(12)],
+    }
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {
+        "flask default": DefaultJSONProvider(app),
+        "orjson": OrjsonProvider(app),
+        "orjson iso/number": OrjsonProvider(app, decimal_format="number", date_format="iso"),
+    }
+    payloads = {"expenses": _transactions(args.rows), "charts": _charts(args.rows)}
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    with app.app_context():
+        for payload_name, payload in payloads.items():
+            size = len(providers["flask default"].response(payload).get_data())
+            print(f"\n{payload_name} ({size / 1024:.0f} KiB)")
+            for provider_name, provider in providers.items():
+                seconds = _best_of(args.repeat, lambda: provider.response(payload))
+                print(f"  {provider_name:<18} {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from decorators import singleton
 
 
@@ -16,6 +17,15 @@ class AppConfig:
         self.cors_allow_all: bool = os.getenv("CORS_ALLOW_ALL", "true").lower() == "true"
         self.cors_origins: str = os.getenv("CORS_ORIGINS", "*")  # comma-separated
 
+        # gunicorn (gunicorn.conf.py); 0 workers means sized from the CPU count
+        self.gunicorn_workers: int = int(os.getenv("GUNICORN_WORKERS", "0"))
+        self.gunicorn_max_workers: int = int(os.getenv("GUNICORN_MAX_WORKERS", "8"))
+        self.gunicorn_threads: int = int(os.getenv("GUNICORN_THREADS", "4"))
+        self.gunicorn_timeout: int = int(os.getenv("GUNICORN_TIMEOUT", "30"))  # seconds
+        self.gunicorn_graceful_timeout: int = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))  # seconds
+        self.gunicorn_max_requests: int = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+        self.gunicorn_max_requests_jitter: int = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
         #DB
         self.db_host = os.getenv("DB_HOST", "0.0.0.0")
         self.db_port = os.getenv("DB_PORT", "5432")
@@ -23,6 +33,68 @@ class AppConfig:
         self.db_password = os.getenv("DB_PASSWORD", "postgres")
         self.database = os.getenv("DB_NAME", "postgres")
 
+        self.migrations_dir: str = os.getenv(
+            "MIGRATIONS_DIR",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "sql", "migrations"))
+
+        # DB connection pool
+        self.db_pool_min_size: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+        self.db_pool_max_size: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.db_pool_max_idle: float = float(os.getenv("DB_POOL_MAX_IDLE", "300"))  # seconds
+        self.db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds
+        self.db_pool_check: bool = os.getenv("DB_POOL_CHECK", "true").lower() == "true"
+
+        # Async pool (db.async_connection) that /api/v1/dashboard runs its
+        # queries on concurrently; it holds connections on top of the sync pool
+        self.async_db_enabled: bool = os.getenv("ASYNC_DB_ENABLED", "false").lower() == "true"
+        self.db_async_pool_min_size: int = int(os.getenv("DB_ASYNC_POOL_MIN_SIZE", "1"))
+        self.db_async_pool_max_size: int = int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", "10"))
+
+        # In-process cache of computed summary/charts responses
+        self.response_cache_enabled: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+        self.response_cache_max_entries: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+        self.response_cache_max_bytes: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        self.response_cache_ttl: float = float(os.getenv("RESPONSE_CACHE_TTL", "300"))  # seconds
+
+        # Cross-worker cache invalidation over LISTEN/NOTIFY
+        self.invalidation_bus_enabled: bool = os.getenv("INVALIDATION_BUS_ENABLED", "true").lower() == "true"
+        self.invalidation_bus_retry: float = float(os.getenv("INVALIDATION_BUS_RETRY", "5"))  # seconds
+
+        # Pool and cache stats at /health/db and /health/cache, served only with
+        # "Authorization: Bearer <token>"; off without a token
+        self.health_token: str = os.getenv("HEALTH_TOKEN", "")
+
+        # Prometheus metrics at /metrics, served only with "Authorization: Bearer <token>";
+        # off without a token
+        self.metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+        self.metrics_token: str = os.getenv("METRICS_TOKEN", "")
+
+        # Per-request query tracing: warnings above the thresholds
+        self.query_trace_enabled: bool = os.getenv("QUERY_TRACE_ENABLED", "true").lower() == "true"
+        # Also sends the totals in a Server-Timing header, to anyone; not for production
+        self.query_trace_server_timing: bool = os.getenv("QUERY_TRACE_SERVER_TIMING", "false").lower() == "true"
+        self.query_trace_slow_ms: float = float(os.getenv("QUERY_TRACE_SLOW_MS", "200"))
+        self.query_trace_max_queries: int = int(os.getenv("QUERY_TRACE_MAX_QUERIES", "25"))
+        self.query_trace_max_repeats: int = int(os.getenv("QUERY_TRACE_MAX_REPEATS", "10"))
+        # Keeps the last traces at /debug/query-trace; not for production
+        self.query_trace_debug: bool = os.getenv("QUERY_TRACE_DEBUG", "false").lower() == "true"
+        self.query_trace_debug_size: int = int(os.getenv("QUERY_TRACE_DEBUG_SIZE", "50"))
+
+        # Request profiler: requests with "X-Profile: <token>", and a random sample of the others
+        self.profiler_token: str = os.getenv("PROFILER_TOKEN", "")
+        self.profiler_sample_rate: float = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))  # 0..1
+        self.profiler_interval_ms: float = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+        self.profiler_dir: str = os.getenv("PROFILER_DIR", os.path.join(tempfile.gettempdir(), "expense-tracker-profiles"))
+        self.profiler_max_files: int = int(os.getenv("PROFILER_MAX_FILES", "200"))
+
+        # JSON responses: "orjson" or Flask's "default" provider
+        self.json_provider: str = os.getenv("JSON_PROVIDER", "orjson")
+        self.json_decimal_format: str = os.getenv("JSON_DECIMAL_FORMAT", "string")  # "string" or "number"
+        self.json_date_format: str = os.getenv("JSON_DATE_FORMAT", "http")  # "http" or "iso"
+
+        # Export
+        self.export_batch_size: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
         # Security
         self.secret_key = os.getenv("SECRET_KEY", "your_strong_secret_key")
         self.jwt_secret_key = os.getenv("JWT_SECRET_KEY", "your_jwt_secret_key")
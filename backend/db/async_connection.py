@@ -0,0 +1,185 @@
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, TypeVar
+
+from psycopg import AsyncConnection, IsolationLevel, sql
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from config import AppConfig
+from db import instrumentation
+from db.connection import _conninfo
+from db.instrumentation import InstrumentedAsyncCursor
+
+# Async counterpart of db.connection, for running independent queries of one
+# request concurrently (see repository.aio).
+#
+# The pool lives on a single event loop running in a background thread, so
+# one pool serves every request of the process even though Flask views are
+# synchronous: a view hands a coroutine to run(), which blocks its thread
+# until the coroutine has finished on the loop.
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_pool: AsyncConnectionPool | None = None
+_pid: int | None = None
+_lock = threading.Lock()
+
+# Snapshot joined by connections borrowed through get_connection(), set by snapshot()
+_snapshot_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("snapshot_id", default=None)
+
+
+def _start() -> None:
+    """Starts the loop thread and opens the pool on it, once per process."""
+    global _loop, _pool, _pid
+    with _lock:
+        if _pid == os.getpid():
+            return
+
+        # After a fork neither the parent's loop thread nor its connections are ours
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name="async-db-loop", daemon=True).start()
+
+        cfg = AppConfig.get_singleton()
+        pool = AsyncConnectionPool(
+            _conninfo(cfg),
+            kwargs={"row_factory": dict_row, "cursor_factory": InstrumentedAsyncCursor},
+            min_size=cfg.db_async_pool_min_size,
+            max_size=cfg.db_async_pool_max_size,
+            max_idle=cfg.db_pool_max_idle,
+            timeout=cfg.db_pool_timeout,
+            check=AsyncConnectionPool.check_connection if cfg.db_pool_check else None,
+            name="expense-tracker-async",
+            open=False,
+        )
+        asyncio.run_coroutine_threadsafe(pool.open(), loop).result()
+        _loop, _pool, _pid = loop, pool, os.getpid()
+
+
+async def _in_context(context: contextvars.Context, coro: Awaitable[T]) -> T:
+    # A task runs in a copy of the context current when it is created
+    return await context.run(asyncio.ensure_future, coro)
+
+
+def run(coro: Awaitable[T], timeout: float | None = None) -> T:
+    """
+    Runs `coro` on the database event loop and returns its result, blocking
+    the calling thread until then. The coroutine sees the caller's context
+    variables (e.g. the request's query trace). Must not be called from the
+    loop itself.
+    """
+    _start()
+    future = asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), _loop)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+def get_pool() -> AsyncConnectionPool:
+    """Returns the process-wide async pool. Only usable from coroutines given to run()."""
+    if _pool is None or _pid != os.getpid():
+        raise RuntimeError("The async pool is only available inside db.async_connection.run()")
+    return _pool
+
+
+@asynccontextmanager
+async def get_connection():
+    """
+    Yields a pooled connection to run repository statements on.
+
+    Inside snapshot() the connection joins the shared snapshot in a
+    REPEATABLE READ, read-only transaction; otherwise its transaction is
+    committed (or rolled back on error) when the block exits.
+    """
+    snapshot_id = _snapshot_id.get()
+    if snapshot_id is None:
+        started = time.perf_counter()
+        async with get_pool().connection() as conn:
+            instrumentation.acquired("async", started)
+            yield conn
+        return
+
+    async with _snapshot_connection() as conn:
+        # Has to be the first statement of the transaction
+        await conn.execute(sql.SQL("SET TRANSACTION SNAPSHOT {}").format(sql.Literal(snapshot_id)))
+        yield conn
+
+
+@asynccontextmanager
+async def _snapshot_connection():
+    """A pooled connection in a REPEATABLE READ, read-only transaction, rolled back afterwards."""
+    pool = get_pool()
+    started = time.perf_counter()
+    conn: AsyncConnection = await pool.getconn()
+    instrumentation.acquired("async", started)
+    try:
+        await conn.set_isolation_level(IsolationLevel.REPEATABLE_READ)
+        await conn.set_read_only(True)
+        yield conn
+    finally:
+        try:
+            if not conn.closed:
+                await conn.rollback()
+                # Pooled connections go back with the server defaults
+                await conn.set_isolation_level(None)
+                await conn.set_read_only(None)
+        finally:
+            await pool.putconn(conn)
+
+
+@asynccontextmanager
+async def snapshot(snapshot_id: str | None = None):
+    """
+    Makes every get_connection() in the block, including those of tasks it
+    starts, see the same snapshot of the database, so queries can run
+    concurrently on separate connections and still agree with each other.
+
+    `snapshot_id` is a snapshot exported by another open transaction (see
+    UnitOfWork.export_snapshot); without one, a connection is held for the
+    duration of the block to export a new snapshot.
+    """
+    if snapshot_id is not None:
+        token = _snapshot_id.set(snapshot_id)
+        try:
+            yield
+        finally:
+            _snapshot_id.reset(token)
+        return
+
+    async with _snapshot_connection() as conn:
+        cur = await conn.execute("SELECT pg_export_snapshot() AS snapshot_id")
+        token = _snapshot_id.set((await cur.fetchone())["snapshot_id"])
+        try:
+            yield
+        finally:
+            _snapshot_id.reset(token)
+
+
+def pool_stats() -> dict[str, Any]:
+    if _pool is None or _pid != os.getpid():
+        return {}
+    return _pool.get_stats()
+
+
+def close_pool() -> None:
+    global _loop, _pool, _pid
+    with _lock:
+        if _pool is None or _pid != os.getpid():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(_pool.close(), _loop).result(5)
+        finally:
+            _loop.call_soon_threadsafe(_loop.stop)
+            _loop, _pool, _pid = None, None, None
+
+
+atexit.register(close_pool)
@@ -1,14 +1,103 @@
-import psycopg
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
 from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 
 from config import AppConfig
+from db import instrumentation, unit_of_work
+from db.instrumentation import InstrumentedCursor
 
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
 
-def get_connection():
-    cfg = AppConfig.get_singleton()
+
+def _conninfo(cfg: AppConfig) -> str:
     host = cfg.db_host
     port = cfg.db_port
     username = cfg.db_username
     password = cfg.db_password
     database = cfg.database
-    return psycopg.connect(f"host={host} dbname={database} user={username} password={password} port={port}", row_factory=dict_row)
+    return f"host={host} dbname={database} user={username} password={password} port={port}"
+
+
+def get_pool() -> ConnectionPool:
+    """Returns the process-wide connection pool, opening it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                cfg = AppConfig.get_singleton()
+                _pool = ConnectionPool(
+                    _conninfo(cfg),
+                    kwargs={"row_factory": dict_row, "cursor_factory": InstrumentedCursor},
+                    min_size=cfg.db_pool_min_size,
+                    max_size=cfg.db_pool_max_size,
+                    max_idle=cfg.db_pool_max_idle,
+                    timeout=cfg.db_pool_timeout,
+                    check=ConnectionPool.check_connection if cfg.db_pool_check else None,
+                    name="expense-tracker",
+                    open=True,
+                )
+    return _pool
+
+
+@contextmanager
+def get_connection():
+    """
+    Yields a connection to run repository statements on.
+
+    Inside a request this is the request's unit-of-work connection, which is
+    committed or rolled back once when the request finishes. Outside of a
+    request a connection is borrowed from the pool and its transaction is
+    committed (or rolled back on error) when the block exits.
+    """
+    uow = unit_of_work.current()
+    if uow is not None:
+        yield uow.connection()
+        return
+    with get_dedicated_connection() as conn:
+        yield conn
+
+
+@contextmanager
+def get_dedicated_connection():
+    """
+    Borrows a pooled connection that is independent of the request's unit of
+    work, e.g. for work that outlives the request such as a streamed response.
+    Committed (or rolled back on error) when the block exits.
+    """
+    started = time.perf_counter()
+    with get_pool().connection() as conn:
+        instrumentation.acquired("sync", started)
+        yield conn
+
+
+def pool_stats() -> dict:
+    if _pool is None:
+        return {}
+    return _pool.get_stats()
+
+
+def discard_inherited_pool() -> None:
+    """
+    Forgets a pool inherited from the parent process after a fork. Its
+    connections belong to the parent and its worker threads did not survive
+    the fork, so the child opens a pool of its own on first use.
+    """
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+atexit.register(close_pool)
@@ -0,0 +1,162 @@
+"""
+Observing the SQL statements run on pooled connections.
+
+The pools (db.connection, db.async_connection) create their cursors from
+the classes below, which report every executed statement to the observers
+subscribed here, attributed to the repository function that ran it. Taking
+a connection from a pool is reported as well (acquired()). With no
+observers either costs one extra list check.
+"""
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from types import CodeType, FrameType
+from typing import Any, Callable
+
+from psycopg import AsyncCursor, Cursor
+
+logger = logging.getLogger(__name__)
+
+# Label of statements run from outside the repository modules
+OTHER = "other"
+# Label of the pools' own statements, e.g. the health check of a borrowed connection
+POOL = "pool"
+
+
+@dataclass(frozen=True)
+class QueryEvent:
+    function: str  # e.g. "transactions_repository.find_by_user", "aio.users_repository.get_user_by_username"
+    query: Any  # as given to execute(): str, bytes or psycopg.sql.Composable
+    duration: float  # seconds
+    rows: int  # cursor.rowcount afterwards (-1 when unknown)
+    error: bool = False
+
+
+@dataclass(frozen=True)
+class AcquireEvent:
+    pool: str  # "sync" or "async"
+    duration: float  # seconds spent waiting for the connection
+
+
+_observers: list[Callable[[QueryEvent], None]] = []
+_acquire_observers: list[Callable[[AcquireEvent], None]] = []
+
+# Repository function label per code object of a caller, so frames are only
+# inspected by name once per call site
+_labels: dict[CodeType, str | None] = {}
+
+
+def subscribe(observer: Callable[[QueryEvent], None]) -> None:
+    """Calls `observer` after each statement, on the thread (or loop) that ran it. It must not block."""
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def unsubscribe(observer: Callable[[QueryEvent], None]) -> None:
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def subscribe_acquire(observer: Callable[[AcquireEvent], None]) -> None:
+    """Calls `observer` each time a connection is taken from a pool. It must not block."""
+    if observer not in _acquire_observers:
+        _acquire_observers.append(observer)
+
+
+def unsubscribe_acquire(observer: Callable[[AcquireEvent], None]) -> None:
+    if observer in _acquire_observers:
+        _acquire_observers.remove(observer)
+
+
+def acquired(pool: str, started: float) -> None:
+    """Reports a connection taken from `pool`, asked for at perf_counter() `started`."""
+    if not _acquire_observers:
+        return
+    event = AcquireEvent(pool, time.perf_counter() - started)
+    for observer in _acquire_observers:
+        try:
+            observer(event)
+        except Exception:
+            logger.exception("Acquire observer failed")
+
+
+def _label(code: CodeType, module: str) -> str | None:
+    label = _labels.get(code)
+    if label is None and code not in _labels:
+        if module.startswith("repository."):
+            label = f"{module.removeprefix('repository.')}.{code.co_name}"
+        elif module.startswith("psycopg_pool."):
+            label = POOL
+        _labels[code] = label
+    return label
+
+
+def _repository_function(frame: FrameType | None) -> str:
+    """The innermost repository function (or pool) among the callers of `frame`."""
+    while frame is not None:
+        label = _label(frame.f_code, frame.f_globals.get("__name__", ""))
+        if label is not None:
+            return label
+        frame = frame.f_back
+    return OTHER
+
+
+def _notify(cursor, query, started: float, error: bool, frame: FrameType | None) -> None:
+    event = QueryEvent(_repository_function(frame), query, time.perf_counter() - started, cursor.rowcount, error)
+    for observer in _observers:
+        try:
+            observer(event)
+        except Exception:
+            logger.exception("Query observer failed")
+
+
+class InstrumentedCursor(Cursor):
+    def execute(self, query, params=None, **kwargs):
+        if not _observers:
+            return super().execute(query, params, **kwargs)
+        started = time.perf_counter()
+        error = True
+        try:
+            result = super().execute(query, params, **kwargs)
+            error = False
+            return result
+        finally:
+            _notify(self, query, started, error, sys._getframe(1))
+
+    def executemany(self, query, params_seq, **kwargs):
+        if not _observers:
+            return super().executemany(query, params_seq, **kwargs)
+        started = time.perf_counter()
+        error = True
+        try:
+            super().executemany(query, params_seq, **kwargs)
+            error = False
+        finally:
+            _notify(self, query, started, error, sys._getframe(1))
+
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    async def execute(self, query, params=None, **kwargs):
+        if not _observers:
+            return await super().execute(query, params, **kwargs)
+        started = time.perf_counter()
+        error = True
+        try:
+            result = await super().execute(query, params, **kwargs)
+            error = False
+            return result
+        finally:
+            # The awaiting coroutines are chained through f_back while this one runs
+            _notify(self, query, started, error, sys._getframe(1))
+
+    async def executemany(self, query, params_seq, **kwargs):
+        if not _observers:
+            return await super().executemany(query, params_seq, **kwargs)
+        started = time.perf_counter()
+        error = True
+        try:
+            await super().executemany(query, params_seq, **kwargs)
+            error = False
+        finally:
+            _notify(self, query, started, error, sys._getframe(1))
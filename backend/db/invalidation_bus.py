@@ -0,0 +1,133 @@
+"""
+Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+Triggers publish a `user_data_changed` notification for every committed
+change to a user's data (sql/migrations/0009_user_data_change_notifications.sql).
+Each worker process runs one listener thread on a dedicated connection that
+passes the (user_id, entity) events on to its subscribers.
+
+Events arrive some time after the commit, and those sent while the listener
+is disconnected are lost. Subscribers are therefore reset on every
+(re)connection, and must not serve cached data without checking the user's
+data version: the bus only frees stale entries early.
+"""
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable
+
+import psycopg
+
+from config import AppConfig
+from db.connection import _conninfo
+from decorators import singleton
+
+CHANNEL = "user_data_changed"
+
+logger = logging.getLogger(__name__)
+
+
+@singleton
+class InvalidationBus:
+    def __init__(self):
+        cfg = AppConfig.get_singleton()
+        self._conninfo = _conninfo(cfg)
+        self.retry_interval = cfg.invalidation_bus_retry
+
+        self._event_handlers: list[Callable[[int, str], None]] = []
+        self._reset_handlers: list[Callable[[], None]] = []
+
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+
+        self.events = 0
+        self.connections = 0
+
+    def subscribe(self, on_event: Callable[[int, str], None], on_reset: Callable[[], None]) -> None:
+        """
+        `on_event(user_id, entity)` runs for every published change, `on_reset()`
+        whenever events may have been missed. Both run on the listener thread.
+        """
+        self._event_handlers.append(on_event)
+        self._reset_handlers.append(on_reset)
+
+    @property
+    def connected(self) -> bool:
+        return self._pid == os.getpid() and self._connected.is_set()
+
+    def ensure_started(self) -> None:
+        """Starts this process's listener thread unless it is running. Cheap enough to call per request."""
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            # A forked worker inherits the parent's state, but not its thread
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._connected = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = 5) -> None:
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"connected": self.connected, "events": self.events, "connections": self.connections}
+
+    def _running(self) -> bool:
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        stop, connected = self._stop, self._connected
+        while not stop.is_set():
+            try:
+                with psycopg.connect(self._conninfo, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    self.connections += 1
+                    # Changes committed before LISTEN took effect were not heard
+                    self._reset()
+                    connected.set()
+                    while not stop.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self._dispatch(notify.payload)
+            except psycopg.Error as e:
+                logger.warning("Invalidation listener disconnected: %s", e)
+            finally:
+                connected.clear()
+            stop.wait(self.retry_interval)
+
+    def _reset(self) -> None:
+        for handler in self._reset_handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("Invalidation reset handler failed")
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            user_id, entity = event["user_id"], event["entity"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation event: %r", payload)
+            return
+
+        self.events += 1
+        for handler in self._event_handlers:
+            try:
+                handler(user_id, entity)
+            except Exception:
+                logger.exception("Invalidation event handler failed")
+
+
+def init_app(app) -> InvalidationBus:
+    """Starts the listener lazily, on the first request each worker process handles."""
+    bus = InvalidationBus.get_singleton()
+    app.before_request(bus.ensure_started)
+    return bus
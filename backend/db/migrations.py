@@ -0,0 +1,93 @@
+"""
+Versioned schema migrations.
+
+Migrations are plain SQL files named `<version>_<name>.sql` (e.g.
+`0002_transactions_keys_and_indexes.sql`) in AppConfig.migrations_dir. They are
+applied in version order and recorded in the `schema_migrations` table, so
+applying is idempotent: already recorded versions are skipped.
+
+Usage:
+    python -m db.migrations
+"""
+import os
+import re
+from dataclasses import dataclass
+
+from psycopg import Connection
+
+from config import AppConfig
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Arbitrary key so concurrent deploys apply migrations one at a time
+_LOCK_KEY = 7_342_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    path: str
+
+    def read(self) -> str:
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+
+def discover(directory: str | None = None) -> list[Migration]:
+    """Migrations found in `directory`, ordered by version."""
+    directory = directory or AppConfig.get_singleton().migrations_dir
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(directory, filename)))
+
+    migrations.sort(key=lambda m: int(m.version))
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def applied_versions(conn: Connection) -> set[str]:
+    rows = conn.execute("SELECT version FROM schema_migrations").fetchall()
+    return {row["version"] for row in rows}
+
+
+def apply_all(conn: Connection, directory: str | None = None) -> list[Migration]:
+    """
+    Applies every migration not yet recorded, in order, within the
+    connection's current transaction. Returns the migrations applied.
+    """
+    conn.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version TEXT PRIMARY KEY,"
+        " name TEXT NOT NULL,"
+        " applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    )
+
+    done = applied_versions(conn)
+    applied = []
+    for migration in discover(directory):
+        if migration.version in done:
+            continue
+        conn.execute(migration.read())
+        conn.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+            (migration.version, migration.name),
+        )
+        applied.append(migration)
+    return applied
+
+
+if __name__ == "__main__":
+    import db.connection
+
+    with db.connection.get_connection() as connection:
+        newly_applied = apply_all(connection)
+
+    for m in newly_applied:
+        print(f"Applied {m.version}_{m.name}")
+    print(f"{len(newly_applied)} migration(s) applied")
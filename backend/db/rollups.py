@@ -0,0 +1,46 @@
+"""
+Rebuilds the monthly_category_totals rollup from transactions.
+
+Triggers keep the rollup exact, so this is only needed to repair it, e.g.
+after transactions were changed with the triggers disabled.
+
+Usage:
+    python -m db.rollups [--user USER_ID]
+"""
+from psycopg import Connection
+
+
+def rebuild_monthly_totals(conn: Connection, user_id: int | None = None) -> int:
+    """
+    Recomputes the rollup rows of one user, or of everyone, within the
+    connection's current transaction. Returns the number of rows written.
+    """
+    # Blocks concurrent writes to transactions until the transaction ends,
+    # so no trigger update can interleave with the recomputation
+    conn.execute("LOCK TABLE transactions IN SHARE MODE")
+
+    where = "" if user_id is None else " WHERE user_id = %s"
+    params = () if user_id is None else (user_id,)
+
+    conn.execute("DELETE FROM monthly_category_totals" + where, params)
+    cur = conn.execute(
+        "INSERT INTO monthly_category_totals (user_id, month, category_id, total, expense_count) "
+        "SELECT user_id, date_trunc('month', transaction_date)::date, category_id, SUM(amount), COUNT(*) "
+        "FROM transactions" + where + " GROUP BY 1, 2, 3",
+        params,
+    )
+    return cur.rowcount
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import db.connection
+
+    parser = argparse.ArgumentParser(description="Rebuild the monthly_category_totals rollup")
+    parser.add_argument("--user", type=int, help="only rebuild this user's rows")
+    args = parser.parse_args()
+
+    with db.connection.get_connection() as connection:
+        written = rebuild_monthly_totals(connection, args.user)
+    print(f"{written} rollup row(s) written")
@@ -0,0 +1,153 @@
+import time
+from functools import wraps
+from typing import Callable
+
+from flask import Flask, Response, g, has_request_context
+from psycopg import Connection, IsolationLevel
+from psycopg_pool import ConnectionPool
+
+from db import instrumentation
+
+
+class UnitOfWork:
+    """
+    One connection and one transaction shared by every repository call made
+    while handling a single request.
+
+    The connection is borrowed from the pool lazily, on the first statement,
+    so requests that never touch the database never check one out.
+    """
+
+    def __init__(self, pool_factory: Callable[[], ConnectionPool]) -> None:
+        self._pool_factory = pool_factory
+        self._pool: ConnectionPool | None = None
+        self._conn: Connection | None = None
+        self._after_commit: list[Callable[[], None]] = []
+        self._isolation_level: IsolationLevel | None = None
+        self._read_only: bool | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._conn is not None
+
+    def set_transaction(self, isolation_level: IsolationLevel | None = None, read_only: bool | None = None) -> None:
+        """
+        Sets the isolation level and access mode of the request's transaction.
+        Only possible before its first statement.
+        """
+        if self._conn is not None:
+            raise RuntimeError("The transaction has already started")
+        self._isolation_level = isolation_level
+        self._read_only = read_only
+
+    def connection(self) -> Connection:
+        if self._conn is None:
+            self._pool = self._pool_factory()
+            started = time.perf_counter()
+            conn = self._pool.getconn()
+            instrumentation.acquired("sync", started)
+            if self._isolation_level is not None or self._read_only is not None:
+                conn.isolation_level = self._isolation_level
+                conn.read_only = self._read_only
+            self._conn = conn
+        return self._conn
+
+    def export_snapshot(self) -> str:
+        """
+        Exports the transaction's snapshot, so other connections can see the
+        database exactly as this transaction does (SET TRANSACTION SNAPSHOT)
+        while it stays open.
+        """
+        return self.connection().execute("SELECT pg_export_snapshot() AS snapshot_id").fetchone()["snapshot_id"]
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Runs `callback` once the transaction commits; it is dropped on rollback."""
+        self._after_commit.append(callback)
+
+    def commit(self) -> None:
+        if self._conn is not None:
+            self._conn.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self) -> None:
+        self._after_commit = []
+        if self._conn is not None:
+            self._conn.rollback()
+
+    def close(self) -> None:
+        """Rolls back anything left uncommitted and returns the connection to the pool."""
+        self._after_commit = []
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if not conn.closed:
+                conn.rollback()
+                # Pooled connections go back with the server defaults
+                conn.isolation_level = None
+                conn.read_only = None
+        finally:
+            self._pool.putconn(conn)
+
+
+def current() -> UnitOfWork | None:
+    """Returns the unit of work bound to the current request, if any."""
+    if not has_request_context():
+        return None
+    return g.get("unit_of_work")
+
+
+def snapshot(view):
+    """
+    Runs a view in a REPEATABLE READ, read-only transaction, so every query it
+    makes sees the same snapshot of the database. Has to wrap the view before
+    anything runs a statement in the request.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        uow = current()
+        if uow is not None:
+            uow.set_transaction(IsolationLevel.REPEATABLE_READ, read_only=True)
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """
+    Runs `callback` after the current request's transaction commits, or right
+    away outside a request, where repository calls commit as they go.
+    """
+    uow = current()
+    if uow is None:
+        callback()
+    else:
+        uow.after_commit(callback)
+
+
+def init_app(app: Flask, pool_factory: Callable[[], ConnectionPool]) -> None:
+    """Binds a unit of work to every request handled by `app`."""
+
+    @app.before_request
+    def _begin_unit_of_work():
+        g.unit_of_work = UnitOfWork(pool_factory)
+
+    @app.after_request
+    def _finish_unit_of_work(response: Response) -> Response:
+        uow = g.get("unit_of_work")
+        if uow is not None and uow.active:
+            if response.status_code >= 500:
+                uow.rollback()
+            else:
+                # Committing here (rather than at teardown) means a failed
+                # commit still turns into an error response for the client.
+                uow.commit()
+        return response
+
+    @app.teardown_request
+    def _release_unit_of_work(error: BaseException | None):
+        uow = g.pop("unit_of_work", None)
+        if uow is not None:
+            uow.close()
@@ -0,0 +1,91 @@
+"""
+gunicorn settings for serving wsgi:app (gunicorn -c gunicorn.conf.py wsgi:app).
+
+Threaded workers (gthread), sized from the CPUs available to the process
+unless GUNICORN_WORKERS is set. Each worker opens its own connection pool
+after the fork; keep DB_POOL_MAX_SIZE at least GUNICORN_THREADS.
+"""
+import glob
+import os
+import shutil
+import tempfile
+
+from config import AppConfig
+
+_cfg = AppConfig.get_singleton()
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"{_cfg.host}:{_cfg.port}"
+
+worker_class = "gthread"
+workers = _cfg.gunicorn_workers or min(2 * _cpu_count() + 1, _cfg.gunicorn_max_workers)
+threads = _cfg.gunicorn_threads
+
+timeout = _cfg.gunicorn_timeout
+graceful_timeout = _cfg.gunicorn_graceful_timeout
+keepalive = 5
+
+# Recycle workers now and then to bound slow leaks; the jitter keeps them
+# from restarting all at once
+max_requests = _cfg.gunicorn_max_requests
+max_requests_jitter = _cfg.gunicorn_max_requests_jitter
+
+accesslog = "-"
+
+# Workers write their Prometheus metrics to files here, so that /metrics on
+# any worker reports all of them (see metrics.py)
+_metrics_tmpdir = None
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    _metrics_tmpdir = os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+
+def on_starting(server):
+    # Counters of a previous run would be added to this one's
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def on_exit(server):
+    if _metrics_tmpdir is not None:
+        shutil.rmtree(_metrics_tmpdir, ignore_errors=True)
+
+
+def post_fork(server, worker):
+    import db.connection
+
+    # With preload_app the parent may have used the database
+    db.connection.discard_inherited_pool()
+
+
+def post_worker_init(worker):
+    import db.connection
+
+    # Open the pool before the first request arrives (connections are
+    # established in the background)
+    db.connection.get_pool()
+
+
+def worker_exit(server, worker):
+    import db.async_connection
+    import db.connection
+    from db.invalidation_bus import InvalidationBus
+
+    InvalidationBus.get_singleton().stop(timeout=2)
+    db.async_connection.close_pool()
+    db.connection.close_pool()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    # Drops the worker's live gauges; its counters and histograms are kept
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,70 @@
+"""
+HTTP conditional GET for per-user JSON resources.
+
+Responses carry an ETag derived from the user's data version (see
+repository.data_versions_repository) and the request path and query, plus
+Last-Modified. A request whose If-None-Match / If-Modified-Since still
+matches is answered with 304 Not Modified without running the view.
+"""
+import hashlib
+from collections.abc import Callable
+from functools import wraps
+
+from flask import Response, g, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from werkzeug.http import is_resource_modified
+
+from repository import data_versions_repository
+from services import current_user
+
+
+def _etag(user_id, version: int, vary: str | None) -> str:
+    parts = [str(user_id), str(version), request.full_path]
+    if vary is not None:
+        parts.append(vary)
+    return hashlib.sha1("\0".join(parts).encode()).hexdigest()
+
+
+def conditional_get(vary: Callable[[], str] | None = None):
+    """
+    Makes a `jwt_required` GET view conditional on the user's data version.
+
+    `vary` returns anything else the response depends on (e.g. the current
+    month); it becomes part of the ETag, and Last-Modified is then left out
+    because it cannot express such changes.
+
+    The version is read before the view runs, so a write racing with the
+    request can only make the next request refetch, never hide a change.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user = current_user.resolve(get_jwt_identity())
+            if user is None:
+                return view(*args, **kwargs)
+
+            version, last_modified = data_versions_repository.get_data_version(user.user_id)
+            # The response cache serves only bodies of this version under this ETag
+            g.data_version = (user.user_id, version)
+            etag = _etag(user.user_id, version, vary() if vary else None)
+            if vary is not None:
+                last_modified = None
+
+            if not is_resource_modified(request.environ, etag, last_modified=last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Browsers may keep the response but must revalidate before reuse
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
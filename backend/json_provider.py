@@ -0,0 +1,111 @@
+"""
+orjson-backed JSON provider for Flask.
+
+Serializes dataclasses (e.g. Transaction), dicts and lists natively in C
+instead of going through `dataclasses.asdict` and the stdlib encoder. The
+default wire format matches Flask's default provider:
+
+- Decimal: a string with the exact value ("12.30"); JSON_DECIMAL_FORMAT=number
+  writes a JSON number instead (exact for up to 15 significant digits, which
+  covers NUMERIC(14, 2) amounts),
+- date/datetime: an HTTP date ("Mon, 01 Jan 2024 00:00:00 GMT");
+  JSON_DATE_FORMAT=iso writes ISO 8601 ("2024-01-01"),
+- object keys sorted, compact separators, pretty-printed in debug mode.
+
+Unlike Flask's provider, non-ASCII text is written as UTF-8 rather than as
+\\u escapes; both decode to the same strings.
+"""
+import dataclasses
+import decimal
+import logging
+import uuid
+from datetime import date, datetime
+from functools import lru_cache
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from werkzeug.http import http_date
+
+from config import AppConfig
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Expense lists repeat the same few hundred dates many times
+_http_date_of_day = lru_cache(maxsize=4096)(http_date)
+
+DECIMAL_FORMATS = ("string", "number")
+DATE_FORMATS = ("http", "iso")
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(JSONProvider):
+    mimetype = "application/json"
+    # None: compact, unless the app runs in debug mode
+    compact: bool | None = None
+
+    def __init__(self, app: Flask, decimal_format: str = "string", date_format: str = "http") -> None:
+        super().__init__(app)
+        if decimal_format not in DECIMAL_FORMATS:
+            raise ValueError(f"Unsupported JSON decimal format: {decimal_format}")
+        if date_format not in DATE_FORMATS:
+            raise ValueError(f"Unsupported JSON date format: {date_format}")
+
+        self._decimal = str if decimal_format == "string" else float
+        # orjson does not sort dataclass fields: they go through _default as
+        # shallow dicts (no deep copy like dataclasses.asdict)
+        self._options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+        self._field_names: dict[type, tuple[str, ...]] = {}
+        if date_format == "http":
+            # Hand dates to _default instead of the native ISO output
+            self._options |= orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _default(self, o):
+        if isinstance(o, datetime):
+            return http_date(o)
+        if isinstance(o, date):
+            return _http_date_of_day(o)
+        if isinstance(o, decimal.Decimal):
+            return self._decimal(o)
+        if dataclasses.is_dataclass(o) and not isinstance(o, type):
+            names = self._field_names.get(type(o))
+            if names is None:
+                names = self._field_names[type(o)] = tuple(f.name for f in dataclasses.fields(o))
+            return {name: getattr(o, name) for name in names}
+        if isinstance(o, uuid.UUID):
+            return str(o)
+        if hasattr(o, "__html__"):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def _dump_bytes(self, obj, indent: bool = False) -> bytes:
+        options = self._options | orjson.OPT_INDENT_2 if indent else self._options
+        return orjson.dumps(obj, default=self._default, option=options)
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self._dump_bytes(obj, indent=kwargs.get("indent") is not None).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dump_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app: Flask, cfg: AppConfig) -> None:
+    """Installs the JSON provider selected by JSON_PROVIDER."""
+    if cfg.json_provider == "default":
+        app.json = DefaultJSONProvider(app)
+        return
+    if cfg.json_provider != "orjson":
+        raise ValueError(f"Unsupported JSON provider: {cfg.json_provider}")
+    if orjson is None:
+        logger.warning("orjson is not installed, using Flask's default JSON provider")
+        return
+
+    app.json = OrjsonProvider(app, cfg.json_decimal_format, cfg.json_date_format)
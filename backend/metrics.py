@@ -0,0 +1,161 @@
+"""
+Prometheus metrics, served at /metrics to holders of METRICS_TOKEN, in the
+text exposition format:
+
+- http_request_duration_seconds{method, route}: request latency histogram,
+  by URL rule (e.g. /api/v1/expenses/<int:expense_id>),
+- http_requests_total{method, route, status},
+- db_query_duration_seconds{function}: statement latency histogram by
+  repository function (see db.instrumentation); its _count is the number
+  of queries,
+- db_query_errors_total{function},
+- db_pool_*{pool}: connection pool sizes and counters from psycopg_pool.
+
+With several gunicorn workers, PROMETHEUS_MULTIPROC_DIR (set by
+gunicorn.conf.py) makes any worker report the metrics of all of them; pool
+metrics then carry a `pid` label, as each worker has its own pools.
+"""
+import hmac
+import logging
+import os
+import time
+
+from flask import Flask, Response, g, jsonify, request
+
+import db.async_connection
+import db.connection
+from config import AppConfig
+from db import instrumentation
+from db.instrumentation import QueryEvent
+from decorators import singleton
+
+try:
+    import prometheus_client
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+    from prometheus_client.multiprocess import MultiProcessCollector
+except ImportError:  # pragma: no cover - optional dependency
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Label of requests that matched no route (404s)
+UNMATCHED_ROUTE = "unmatched"
+
+# psycopg_pool stats: gauges, and counters with the factor to their unit
+_POOL_GAUGES = {
+    "pool_min": ("db_pool_min_size", "Minimum number of connections kept by the pool"),
+    "pool_max": ("db_pool_max_size", "Maximum number of connections of the pool"),
+    "pool_size": ("db_pool_size", "Connections currently managed by the pool"),
+    "pool_available": ("db_pool_available", "Idle connections in the pool"),
+    "requests_waiting": ("db_pool_requests_waiting", "Requests waiting for a connection"),
+}
+_POOL_COUNTERS = {
+    "requests_num": ("db_pool_requests", "Connections requested from the pool", 1),
+    "requests_queued": ("db_pool_requests_queued", "Requests that had to wait for a connection", 1),
+    "requests_wait_ms": ("db_pool_wait_seconds", "Time spent waiting for a connection", 0.001),
+    "requests_errors": ("db_pool_request_errors", "Requests that timed out or failed", 1),
+    "connections_num": ("db_pool_connections", "Connections opened by the pool", 1),
+    "connections_errors": ("db_pool_connection_errors", "Failed connection attempts", 1),
+    "connections_lost": ("db_pool_connections_lost", "Connections found broken", 1),
+}
+
+
+class _PoolCollector:
+    """Reads the pools' stats at scrape time."""
+
+    def __init__(self, pid_label: bool) -> None:
+        self._pid_label = pid_label
+
+    def collect(self):
+        labels = ["pool", "pid"] if self._pid_label else ["pool"]
+        pid = [str(os.getpid())] if self._pid_label else []
+        pools = {"sync": db.connection.pool_stats(), "async": db.async_connection.pool_stats()}
+
+        for key, (name, documentation) in _POOL_GAUGES.items():
+            family = GaugeMetricFamily(name, documentation, labels=labels)
+            for pool, stats in pools.items():
+                if stats:
+                    family.add_metric([pool, *pid], stats.get(key, 0))
+            yield family
+
+        for key, (name, documentation, factor) in _POOL_COUNTERS.items():
+            family = CounterMetricFamily(name, documentation, labels=labels)
+            for pool, stats in pools.items():
+                if stats:
+                    # Counters the pool has not needed yet are missing from its stats
+                    family.add_metric([pool, *pid], stats.get(key, 0) * factor)
+            yield family
+
+
+@singleton
+class Metrics:
+    def __init__(self):
+        self.multiprocess = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=HTTP_BUCKETS)
+        self.requests = Counter("http_requests", "HTTP requests", ["method", "route", "status"])
+        self.query_duration = Histogram(
+            "db_query_duration_seconds", "SQL statement latency", ["function"], buckets=DB_BUCKETS)
+        self.query_errors = Counter("db_query_errors", "SQL statements that failed", ["function"])
+        if not self.multiprocess:
+            REGISTRY.register(_PoolCollector(pid_label=False))
+
+    def observe_request(self, method: str, route: str, status: int, duration: float) -> None:
+        self.request_duration.labels(method, route).observe(duration)
+        self.requests.labels(method, route, str(status)).inc()
+
+    def observe_query(self, event: QueryEvent) -> None:
+        self.query_duration.labels(event.function).observe(event.duration)
+        if event.error:
+            self.query_errors.labels(event.function).inc()
+
+    def render(self) -> bytes:
+        if not self.multiprocess:
+            return prometheus_client.generate_latest(REGISTRY)
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        registry.register(_PoolCollector(pid_label=True))
+        return prometheus_client.generate_latest(registry)
+
+
+def init_app(app: Flask, cfg: AppConfig) -> None:
+    """
+    Times every request of `app` and every query, and serves /metrics
+    behind `Authorization: Bearer <METRICS_TOKEN>`; without a token nothing
+    is collected. Register before other request hooks, so that their time is
+    included.
+    """
+    if not cfg.metrics_enabled:
+        return
+    if not cfg.metrics_token:
+        logger.info("METRICS_TOKEN is not set, /metrics is disabled")
+        return
+    if prometheus_client is None:
+        logger.warning("prometheus_client is not installed, /metrics is disabled")
+        return
+
+    metrics = Metrics.get_singleton()
+    instrumentation.subscribe(metrics.observe_query)
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response: Response) -> Response:
+        started = g.get("request_started")
+        if started is not None:
+            rule = request.url_rule
+            metrics.observe_request(request.method, rule.rule if rule is not None else UNMATCHED_ROUTE,
+                                    response.status_code, time.perf_counter() - started)
+        return response
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {cfg.metrics_token}"):
+            return jsonify({"error": "Unauthorized"}), 401
+        return Response(metrics.render(), content_type=CONTENT_TYPE_LATEST)
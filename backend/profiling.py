@@ -0,0 +1,192 @@
+"""
+Opt-in sampling profiler for individual requests.
+
+A request is profiled when it carries `X-Profile: <PROFILER_TOKEN>` or is
+picked at random with probability PROFILER_SAMPLE_RATE. While its view runs,
+a background thread samples the request thread's call stack every
+PROFILER_INTERVAL_MS (sys._current_frames). The stacks are then written to
+PROFILER_DIR as <id>.collapsed, one "frame;frame;frame count" line per
+distinct stack (the input of flamegraph.pl and speedscope), next to
+<id>.json with the route, status and timings. The response names the
+profile in an X-Profile-Id header; only the newest PROFILER_MAX_FILES
+profiles are kept.
+
+Without a token or a sample rate no hook is installed at all.
+"""
+import glob
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+
+from flask import Flask, Response, g, request
+
+from config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+class Profile:
+    def __init__(self, thread_id: int) -> None:
+        self.thread_id = thread_id
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+
+
+class Sampler:
+    """Samples the stacks of the threads being profiled, from one background thread."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._profiles: dict[int, Profile] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        # Frame label per code object
+        self._labels: dict[CodeType, str] = {}
+
+    def start(self) -> Profile:
+        """Starts profiling the calling thread."""
+        profile = Profile(threading.get_ident())
+        with self._lock:
+            self._profiles[profile.thread_id] = profile
+            # After a fork the parent's sampler thread is gone
+            if self._thread is None or self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            self._wakeup.set()
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.pop(profile.thread_id, None)
+        profile.duration = time.perf_counter() - profile.started
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                profiles = list(self._profiles.values())
+                if not profiles:
+                    # Sleep until the next profile starts
+                    self._wakeup.clear()
+                    continue
+
+            frames = sys._current_frames()
+            for profile in profiles:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.stacks[self._collapse(frame)] += 1
+                    profile.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _collapse(self, frame: FrameType | None) -> str:
+        """The stack ending at `frame`, outermost call first, as "frame;frame;frame"."""
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+
+def _profile_id(profile: Profile, route: str) -> str:
+    milliseconds = int(profile.started_at * 1000) % 1000
+    started = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(profile.started_at))}.{milliseconds:03d}"
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    return f"{started}-{request.method}-{slug}-{round(profile.duration * 1000)}ms-{secrets.token_hex(3)}"
+
+
+def _write(directory: str, profile_id: str, profile: Profile, metadata: dict, max_files: int) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{profile_id}.collapsed"), "w") as f:
+        for stack, count in sorted(profile.stacks.items()):
+            f.write(f"{stack} {count}\n")
+    with open(os.path.join(directory, f"{profile_id}.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    # Ids start with the time, so they sort oldest first
+    stale = sorted(glob.glob(os.path.join(directory, "*.json")))[:-max_files or None]
+    for path in stale:
+        for stale_path in (path, path.removesuffix(".json") + ".collapsed"):
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass
+
+
+def init_app(app: Flask, cfg: AppConfig) -> None:
+    """Profiles requests of `app` asking for it with the token, and a sample of the others."""
+    if not cfg.profiler_token and cfg.profiler_sample_rate <= 0:
+        return
+
+    sampler = Sampler(cfg.profiler_interval_ms / 1000)
+
+    def _requested() -> bool:
+        token = request.headers.get(PROFILE_HEADER)
+        if token is not None and cfg.profiler_token:
+            return hmac.compare_digest(token, cfg.profiler_token)
+        return random.random() < cfg.profiler_sample_rate
+
+    @app.before_request
+    def _start_profile():
+        if _requested():
+            g.profile = sampler.start()
+
+    @app.after_request
+    def _finish_profile(response: Response) -> Response:
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+        sampler.stop(profile)
+
+        route = request.url_rule.rule if request.url_rule is not None else ""
+        profile_id = _profile_id(profile, route)
+        metadata = {
+            "id": profile_id,
+            "method": request.method,
+            "route": route,
+            "path": request.path,
+            "status": response.status_code,
+            "startedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(profile.started_at)),
+            "durationMs": round(profile.duration * 1000, 3),
+            "intervalMs": cfg.profiler_interval_ms,
+            "samples": profile.samples,
+        }
+        try:
+            _write(cfg.profiler_dir, profile_id, profile, metadata, cfg.profiler_max_files)
+        except OSError:
+            logger.exception("Could not write profile %s", profile_id)
+            return response
+
+        response.headers[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    @app.teardown_request
+    def _discard_profile(error: BaseException | None):
+        # Left over when no response was made
+        profile = g.pop("profile", None)
+        if profile is not None:
+            sampler.stop(profile)
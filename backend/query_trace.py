@@ -0,0 +1,187 @@
+"""
+Per-request SQL tracing.
+
+Every statement a request runs (see db.instrumentation) is recorded with the
+repository function that ran it, its duration and row count, along with the
+time spent waiting for pooled connections. Requests are logged with a
+warning when
+
+- a statement takes longer than QUERY_TRACE_SLOW_MS,
+- more than QUERY_TRACE_MAX_QUERIES statements run,
+- one statement runs QUERY_TRACE_MAX_REPEATS times or more, usually a
+  query per item of a list (N+1).
+
+With QUERY_TRACE_SERVER_TIMING the totals go out in a Server-Timing header,
+e.g.
+
+    Server-Timing: db;dur=3.21;desc="4 queries", db-acquire;dur=0.12;desc="1 connection", app;dur=9.80
+
+and with QUERY_TRACE_DEBUG the traces of the last requests are kept and
+served, statements normalized, at /debug/query-trace. Both show database
+timings to any client, so they are off by default.
+"""
+import contextvars
+import logging
+import re
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from flask import Flask, Response, g, jsonify, request
+from psycopg import sql
+
+from config import AppConfig
+from db import instrumentation
+from db.instrumentation import AcquireEvent, QueryEvent
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%[sbt]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def _normalize_text(text: str) -> str:
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _PLACEHOLDER.sub("?", text).replace("%%", "%")
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def normalize(query: Any) -> str:
+    """
+    The statement with literals and placeholders replaced by `?` and
+    whitespace collapsed, so executions of one statement read the same.
+    """
+    if isinstance(query, sql.Composable):
+        query = query.as_string(None)
+    elif isinstance(query, bytes):
+        query = query.decode(errors="replace")
+    return _normalize_text(query)
+
+
+@dataclass
+class RequestTrace:
+    started: float
+    queries: list[QueryEvent] = field(default_factory=list)
+    acquisitions: int = 0
+    acquire_time: float = 0.0
+
+    @property
+    def db_time(self) -> float:
+        # Statements run concurrently (db.async_connection) overlap
+        return sum(q.duration for q in self.queries)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Normalized statements run at least `threshold` times, most repeated first."""
+        counts = Counter(normalize(q.query) for q in self.queries)
+        return [(statement, n) for statement, n in counts.most_common() if n >= threshold]
+
+    def server_timing(self, now: float) -> str:
+        queries = f"{len(self.queries)} {'query' if len(self.queries) == 1 else 'queries'}"
+        connections = f"{self.acquisitions} {'connection' if self.acquisitions == 1 else 'connections'}"
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{queries}", '
+            f'db-acquire;dur={self.acquire_time * 1000:.2f};desc="{connections}", '
+            f"app;dur={(now - self.started) * 1000:.2f}"
+        )
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "durationMs": round((now - self.started) * 1000, 3),
+            "dbMs": round(self.db_time * 1000, 3),
+            "acquireMs": round(self.acquire_time * 1000, 3),
+            "connections": self.acquisitions,
+            "queries": [
+                {
+                    "function": q.function,
+                    "statement": normalize(q.query),
+                    "durationMs": round(q.duration * 1000, 3),
+                    "rows": q.rows,
+                    "error": q.error,
+                }
+                for q in self.queries
+            ],
+        }
+
+
+# Trace of the request being handled; async queries see it through
+# db.async_connection.run, which carries the caller's context over
+_current: contextvars.ContextVar[RequestTrace | None] = contextvars.ContextVar("query_trace", default=None)
+
+
+def current() -> RequestTrace | None:
+    return _current.get()
+
+
+def _record_query(event: QueryEvent) -> None:
+    trace = _current.get()
+    # The pools' connection checks are part of the acquire time
+    if trace is not None and event.function != instrumentation.POOL:
+        trace.queries.append(event)
+
+
+def _record_acquire(event: AcquireEvent) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.acquisitions += 1
+        trace.acquire_time += event.duration
+
+
+def _warn(trace: RequestTrace, cfg: AppConfig) -> None:
+    where = f"{request.method} {request.path}"
+    slow = cfg.query_trace_slow_ms / 1000
+    for q in trace.queries:
+        if q.duration > slow:
+            logger.warning("Slow query in %s: %.1f ms, %d rows, %s: %s",
+                           where, q.duration * 1000, q.rows, q.function, normalize(q.query))
+
+    if len(trace.queries) > cfg.query_trace_max_queries:
+        logger.warning("Too many queries in %s: %d (%.1f ms)", where, len(trace.queries), trace.db_time * 1000)
+
+    for statement, count in trace.repeated(cfg.query_trace_max_repeats):
+        logger.warning("Repeated query in %s: %d times: %s", where, count, statement)
+
+
+def init_app(app: Flask, cfg: AppConfig) -> None:
+    """Traces the queries of every request handled by `app`."""
+    if not cfg.query_trace_enabled:
+        return
+
+    instrumentation.subscribe(_record_query)
+    instrumentation.subscribe_acquire(_record_acquire)
+    recent = deque(maxlen=cfg.query_trace_debug_size) if cfg.query_trace_debug else None
+
+    @app.before_request
+    def _begin_trace():
+        g.query_trace_token = _current.set(RequestTrace(time.perf_counter()))
+
+    @app.after_request
+    def _finish_trace(response: Response) -> Response:
+        trace = _current.get()
+        if trace is None:
+            return response
+        now = time.perf_counter()
+        if cfg.query_trace_server_timing:
+            response.headers.add("Server-Timing", trace.server_timing(now))
+        _warn(trace, cfg)
+        if recent is not None and request.endpoint != "query_trace_dump":
+            recent.append({"method": request.method, "path": request.full_path.rstrip("?"),
+                           "status": response.status_code, **trace.to_dict(now)})
+        return response
+
+    @app.teardown_request
+    def _end_trace(error: BaseException | None):
+        token = g.pop("query_trace_token", None)
+        if token is not None:
+            _current.reset(token)
+
+    if recent is not None:
+        @app.get("/debug/query-trace", endpoint="query_trace_dump")
+        def query_trace_dump():
+            # Most recent first
+            return jsonify({"traces": list(reversed(recent))}), 200
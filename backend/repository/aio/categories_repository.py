@@ -0,0 +1,19 @@
+import db.async_connection
+from entities.category import Category
+
+# Async reads of categories, run on db.async_connection (see repository.categories_repository).
+
+
+async def find_by_user(user_id) -> list[Category]:
+    async with db.async_connection.get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT * FROM categories WHERE user_id = %s", (user_id,))
+            return [
+                Category(
+                    category["category_id"],
+                    category["user_id"],
+                    category["name"],
+                    category["color"],
+                )
+                async for category in cur
+            ]
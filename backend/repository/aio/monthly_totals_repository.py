@@ -0,0 +1,28 @@
+from datetime import date
+from decimal import Decimal
+
+import db.async_connection
+from repository.monthly_totals_repository import _totals_by_month_query
+
+# Async reads of the monthly_category_totals rollup, run on db.async_connection
+# (see repository.monthly_totals_repository).
+
+
+async def sum_for_month(user_id, month: date) -> Decimal:
+    """Total amount of the user's transactions in the month starting at `month`."""
+    async with db.async_connection.get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT COALESCE(SUM(total), 0) AS total FROM monthly_category_totals "
+                "WHERE user_id = %s AND month = %s",
+                (user_id, month),
+            )
+            return (await cur.fetchone())["total"]
+
+
+async def totals_by_month(user_id, from_month: date | None = None, to_month: date | None = None) -> list[dict]:
+    """Same rows as monthly_totals_repository.totals_by_month."""
+    async with db.async_connection.get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(*_totals_by_month_query(user_id, from_month, to_month))
+            return await cur.fetchall()
@@ -0,0 +1,47 @@
+from datetime import date
+
+import db.async_connection
+from entities.transaction import Transaction
+from repository.transactions_repository import (
+    _SET_FUZZY_THRESHOLD,
+    _find_by_user_query,
+    _find_page_query,
+    _is_fuzzy,
+    _to_transaction,
+    _totals_by_period_query,
+)
+
+# Async reads of transactions, run on db.async_connection. Queries are built
+# by repository.transactions_repository, so both variants return the same rows.
+
+
+async def find_by_user(user_id, from_date=None, to_date=None, min_amount=None, max_amount=None, category_id=None,
+                       search=None, search_mode="fulltext", descending: bool | None = None) -> list[Transaction]:
+    """See transactions_repository.find_by_user."""
+    async with db.async_connection.get_connection() as conn:
+        if _is_fuzzy(search, search_mode):
+            await conn.execute(*_SET_FUZZY_THRESHOLD)
+        async with conn.cursor() as cur:
+            await cur.execute(*_find_by_user_query(
+                user_id, from_date, to_date, min_amount, max_amount, category_id, search, search_mode, descending))
+            return [_to_transaction(t) async for t in cur]
+
+
+async def find_page_by_user(user_id, limit: int, after: tuple[date, int] | None = None, descending: bool = True,
+                            **filters) -> list[Transaction]:
+    """See transactions_repository.find_page_by_user."""
+    async with db.async_connection.get_connection() as conn:
+        if _is_fuzzy(filters.get("search"), filters.get("search_mode")):
+            await conn.execute(*_SET_FUZZY_THRESHOLD)
+        async with conn.cursor() as cur:
+            await cur.execute(*_find_page_query(user_id, limit, after, descending, **filters))
+            return [_to_transaction(t) async for t in cur]
+
+
+async def totals_by_period(user_id, granularity: str, from_date: date | None = None,
+                           to_date: date | None = None) -> list[dict]:
+    """See transactions_repository.totals_by_period."""
+    async with db.async_connection.get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(*_totals_by_period_query(user_id, granularity, from_date, to_date))
+            return await cur.fetchall()
@@ -0,0 +1,16 @@
+import db.async_connection
+from entities.user import User
+from typing import Optional
+
+# Async reads of users, run on db.async_connection (see repository.users_repository).
+
+
+async def get_user_by_username(username) -> Optional[User]:
+    async with db.async_connection.get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT * FROM users WHERE username = %s", (username,))
+            result = await cur.fetchone()
+            if result is not None:
+                return User(result["user_id"], result["username"], result["password_hash"], result["budget"])
+            else:
+                return None
@@ -7,7 +7,6 @@ def create_category(category: Category):
         with conn.cursor() as cur:
             cur.execute("INSERT INTO categories (user_id, name, color) VALUES (%s, %s, %s)",
                         (category.user_id, category.name, category.color))
-            conn.commit()
 
 
 def find_by_user(user_id) -> list[Category]:
@@ -25,18 +24,41 @@ def find_by_user(user_id) -> list[Category]:
             ]
 
 
-def save_category(category: Category):
+def save_category(category: Category) -> bool:
+    """
+    Updates the category if it belongs to `category.user_id`, in a single
+    statement. A None `color` keeps the stored one. Returns False when no
+    such category is owned by the user.
+    """
     with db.connection.get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                "UPDATE categories SET user_id = %s, name = %s, color = %s WHERE category_id = %s",
-                (category.user_id, category.name, category.color, category.category_id)
+                "UPDATE categories SET name = %s, color = COALESCE(%s, color) "
+                "WHERE category_id = %s AND user_id = %s RETURNING category_id",
+                (category.name, category.color, category.category_id, category.user_id)
                 )
-            conn.commit()
+            return cur.fetchone() is not None
 
 
-def delete_category(category_id: int):
+def delete_category(category_id: int, user_id: int) -> bool:
+    """Deletes the category if the user owns it; returns whether a row was deleted."""
     with db.connection.get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("DELETE FROM categories WHERE category_id = %s", (category_id,))
-            conn.commit()
+            cur.execute(
+                "DELETE FROM categories WHERE category_id = %s AND user_id = %s RETURNING category_id",
+                (category_id, user_id),
+            )
+            return cur.fetchone() is not None
+
+
+def find_owned_ids(user_id, category_ids: list[int]) -> set[int]:
+    """The subset of `category_ids` that belong to the user, in one query."""
+    if not category_ids:
+        return set()
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT category_id FROM categories WHERE user_id = %s AND category_id = ANY(%s)",
+                (user_id, list(category_ids)),
+            )
+            return {row["category_id"] for row in cur}
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+import db.connection
+
+# Reads of user_data_versions, bumped by triggers on writes to the user's
+# data (see sql/migrations/0008_user_data_versions.sql).
+
+
+def get_data_version(user_id) -> tuple[int, datetime | None]:
+    """(version, time of the last change) of the user's data; (0, None) before any change."""
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version, updated_at FROM user_data_versions WHERE user_id = %s", (user_id,))
+            row = cur.fetchone()
+            if row is None:
+                return 0, None
+            return row["version"], row["updated_at"]
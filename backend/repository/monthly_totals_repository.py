@@ -0,0 +1,51 @@
+from datetime import date
+from decimal import Decimal
+
+import db.connection
+
+# Reads of the monthly_category_totals rollup, maintained by triggers on
+# transactions (see sql/migrations/0007_monthly_category_totals.sql).
+
+
+def sum_for_month(user_id, month: date) -> Decimal:
+    """Total amount of the user's transactions in the month starting at `month`."""
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT COALESCE(SUM(total), 0) AS total FROM monthly_category_totals "
+                "WHERE user_id = %s AND month = %s",
+                (user_id, month),
+            )
+            return cur.fetchone()["total"]
+
+
+def totals_by_month(user_id, from_month: date | None = None, to_month: date | None = None) -> list[dict]:
+    """
+    Per-month, per-category totals of the user, in the same shape as
+    transactions_repository.totals_by_period(user_id, "month"): rows ordered
+    by period with `period`, `category_id`, `total` and `expense_count`.
+    `from_month`/`to_month` are inclusive month starts.
+    """
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(*_totals_by_month_query(user_id, from_month, to_month))
+            return cur.fetchall()
+
+
+def _totals_by_month_query(user_id, from_month, to_month) -> tuple[str, list]:
+    query = (
+        "SELECT month AS period, category_id, total, expense_count "
+        "FROM monthly_category_totals WHERE user_id = %s"
+    )
+    params = [user_id]
+
+    if from_month:
+        query += " AND month >= %s"
+        params.append(from_month)
+
+    if to_month:
+        query += " AND month <= %s"
+        params.append(to_month)
+
+    query += " ORDER BY period, category_id"
+    return query, params
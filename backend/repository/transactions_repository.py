@@ -1,20 +1,39 @@
+import re
+from collections.abc import Iterable, Iterator
+from datetime import date
+
 import db.connection
 from entities.transaction import Transaction
 
+# Explicit column list: keeps derived columns such as notes_search off the wire
+_COLUMNS = "transaction_id, user_id, category_id, amount, transaction_date, notes"
+
+# Minimum pg_trgm word similarity for fuzzy matches. The extension default
+# (0.6) misses common typos such as "grocries" for "groceries".
+FUZZY_SIMILARITY_THRESHOLD = 0.4
+
 
 def create_transaction(transaction: Transaction):
     with db.connection.get_connection() as conn:
         with conn.cursor() as cur:
-            transaction_id = transaction.transaction_id
-            if transaction_id is None:
-                cur.execute("SELECT COALESCE(MAX(transaction_id), 0) + 1 AS next_id FROM transactions")
-                row = cur.fetchone()
-                transaction_id = row["next_id"]
+            if transaction.transaction_id is None:
+                cur.execute(
+                    "INSERT INTO transactions (user_id, category_id, amount, transaction_date, notes) "
+                    "VALUES (%s, %s, %s, %s, %s) RETURNING transaction_id",
+                    (
+                        transaction.user_id,
+                        transaction.category_id,
+                        transaction.amount,
+                        transaction.transaction_date,
+                        transaction.notes,
+                    ),
+                )
+                return cur.fetchone()["transaction_id"]
 
             cur.execute(
                 "INSERT INTO transactions (transaction_id, user_id, category_id, amount, transaction_date, notes) VALUES (%s, %s, %s, %s, %s, %s)",
                 (
-                    transaction_id,
+                    transaction.transaction_id,
                     transaction.user_id,
                     transaction.category_id,
                     transaction.amount,
@@ -22,90 +41,418 @@ def create_transaction(transaction: Transaction):
                     transaction.notes,
                 ),
             )
-            conn.commit()
-            return transaction_id
+            return transaction.transaction_id
+
+
+def reserve_transaction_ids(count: int) -> list[int]:
+    """Allocates a block of `count` ids from the transactions sequence in one round trip."""
+    if count <= 0:
+        return []
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT nextval(pg_get_serial_sequence('transactions', 'transaction_id')) AS transaction_id "
+                "FROM generate_series(1, %s)",
+                (count,),
+            )
+            return [row["transaction_id"] for row in cur]
+
+
+def create_transactions(transactions: list[Transaction]) -> list[int]:
+    """
+    Inserts many transactions at once and returns their ids in input order.
+
+    Missing ids are pre-allocated as one block, so the rows can go out in a
+    single pipelined executemany instead of one INSERT ... RETURNING each.
+    """
+    reserved = iter(reserve_transaction_ids(sum(1 for t in transactions if t.transaction_id is None)))
+    ids = [t.transaction_id if t.transaction_id is not None else next(reserved) for t in transactions]
+
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO transactions (transaction_id, user_id, category_id, amount, transaction_date, notes) VALUES (%s, %s, %s, %s, %s, %s)",
+                [
+                    (transaction_id, t.user_id, t.category_id, t.amount, t.transaction_date, t.notes)
+                    for transaction_id, t in zip(ids, transactions)
+                ],
+            )
+    return ids
+
+
+def find_owned_ids(user_id, transaction_ids: list[int]) -> set[int]:
+    """The subset of `transaction_ids` that belong to the user, in one query."""
+    if not transaction_ids:
+        return set()
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT transaction_id FROM transactions WHERE user_id = %s AND transaction_id = ANY(%s)",
+                (user_id, list(transaction_ids)),
+            )
+            return {row["transaction_id"] for row in cur}
+
+
+def update_transactions(user_id, transactions: list[Transaction]):
+    """
+    Updates category, amount and notes of many of the user's transactions in
+    one pipelined executemany. A None `notes` keeps the stored value.
+    """
+    if not transactions:
+        return
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                "UPDATE transactions SET category_id = %s, amount = %s, notes = COALESCE(%s, notes) "
+                "WHERE transaction_id = %s AND user_id = %s",
+                [(t.category_id, t.amount, t.notes, t.transaction_id, user_id) for t in transactions],
+            )
+
+
+def delete_transactions(user_id, transaction_ids: list[int]):
+    if not transaction_ids:
+        return
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM transactions WHERE user_id = %s AND transaction_id = ANY(%s)",
+                (user_id, list(transaction_ids)),
+            )
 
 
-def find_by_user(user_id, from_date=None, to_date=None, min_amount=None, max_amount=None, category_id=None, search=None) -> list[Transaction]:
+def import_transactions(user_id, rows: Iterable[tuple]) -> tuple[int, int]:
+    """
+    Bulk-loads `rows` of (category_id, amount, transaction_date, notes) for the
+    user and returns (rows staged, rows inserted).
+
+    Rows are streamed with COPY into a temporary staging table and merged into
+    transactions in one statement. Rows whose (date, amount, notes) content
+    matches an existing transaction of the user, or an earlier row of the same
+    load, are skipped as duplicates.
+    """
+    staged = 0
     with db.connection.get_connection() as conn:
         with conn.cursor() as cur:
-            query = "SELECT * FROM transactions WHERE user_id = %s"
-            params = [user_id]
-
-            if from_date:
-                query += " AND transaction_date >= %s"
-                params.append(from_date)
-
-            if to_date:
-                query += " AND transaction_date <= %s"
-                params.append(to_date)
-
-            if min_amount is not None:
-                query += " AND amount >= %s"
-                params.append(min_amount)
-
-            if max_amount is not None:
-                query += " AND amount <= %s"
-                params.append(max_amount)
-
-            if category_id is not None:
-                query += " AND category_id = %s"
-                params.append(category_id)
-
-            if search:
-                query += " AND notes ~* %s"
-                params.append(search)
-
-            cur.execute(query, params)
-            return [
-                Transaction(
-                    t["transaction_id"],
-                    t["user_id"],
-                    t["category_id"],
-                    t["amount"],
-                    t["transaction_date"],
-                    t["notes"],
+            cur.execute(
+                "CREATE TEMP TABLE transactions_import ("
+                " category_id INTEGER NOT NULL,"
+                " amount NUMERIC(10, 2) NOT NULL,"
+                " transaction_date DATE NOT NULL,"
+                " notes TEXT"
+                ")"
+            )
+            with cur.copy("COPY transactions_import (category_id, amount, transaction_date, notes) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    staged += 1
+
+            cur.execute(
+                """
+                INSERT INTO transactions (user_id, category_id, amount, transaction_date, notes)
+                SELECT DISTINCT ON (s.transaction_date, s.amount, md5(COALESCE(s.notes, '')))
+                    %s, s.category_id, s.amount, s.transaction_date, s.notes
+                FROM transactions_import s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM transactions t
+                    WHERE t.user_id = %s
+                      AND t.transaction_date = s.transaction_date
+                      AND t.amount = s.amount
+                      AND md5(COALESCE(t.notes, '')) = md5(COALESCE(s.notes, ''))
                 )
-                for t in cur
-            ]
+                """,
+                (user_id, user_id),
+            )
+            inserted = cur.rowcount
+            cur.execute("DROP TABLE transactions_import")
+            return staged, inserted
+
+
+def _prefix_tsquery(search: str) -> str | None:
+    """
+    tsquery text matching every word of `search` as a prefix, so partially
+    typed words match ("coff bea" -> "coff:* & bea:*"). Only word characters
+    are kept, so user input cannot inject tsquery syntax. None when the input
+    has no words.
+    """
+    words = re.findall(r"\w+", search.lower())
+    return " & ".join(f"{word}:*" for word in words) or None
+
+
+def _like_pattern(search: str) -> str:
+    """ILIKE pattern matching `search` literally anywhere in the text."""
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _is_fuzzy(search, search_mode) -> bool:
+    return bool(search) and search_mode == "fuzzy" and re.search(r"\w", search) is not None
+
+
+# Applies FUZZY_SIMILARITY_THRESHOLD to the `<%` operator for the rest of the
+# current transaction. The threshold has to be a setting rather than a WHERE
+# condition for the trigram index to be used.
+_SET_FUZZY_THRESHOLD = (
+    "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+    (str(FUZZY_SIMILARITY_THRESHOLD),),
+)
+
+
+def _set_fuzzy_threshold(conn):
+    conn.execute(*_SET_FUZZY_THRESHOLD)
+
+
+def _filter_clause(user_id, from_date=None, to_date=None, min_amount=None, max_amount=None, category_id=None, search=None,
+                   search_mode="fulltext") -> tuple[str, list]:
+    """
+    WHERE clause (without the keyword) and parameters shared by the list queries.
 
+    `search_mode` selects how `search` matches notes: "fulltext" uses the
+    indexed tsvector with prefix matching, "fuzzy" is a trigram word
+    similarity match that tolerates typos (callers apply
+    _set_fuzzy_threshold first), "literal" is a case-insensitive substring
+    match.
+    """
+    clause = "user_id = %s"
+    params = [user_id]
 
-def save_transaction(transaction: Transaction):
+    if from_date:
+        clause += " AND transaction_date >= %s"
+        params.append(from_date)
+
+    if to_date:
+        clause += " AND transaction_date <= %s"
+        params.append(to_date)
+
+    if min_amount is not None:
+        clause += " AND amount >= %s"
+        params.append(min_amount)
+
+    if max_amount is not None:
+        clause += " AND amount <= %s"
+        params.append(max_amount)
+
+    if category_id is not None:
+        clause += " AND category_id = %s"
+        params.append(category_id)
+
+    if search:
+        tsquery = _prefix_tsquery(search) if search_mode == "fulltext" else None
+        if tsquery is not None:
+            clause += " AND notes_search @@ to_tsquery('simple', %s)"
+            params.append(tsquery)
+        elif _is_fuzzy(search, search_mode):
+            clause += " AND %s <%% notes"
+            params.append(search)
+        else:
+            # Literal mode, or input without any words to search for
+            clause += " AND notes ILIKE %s"
+            params.append(_like_pattern(search))
+
+    return clause, params
+
+
+def _to_transaction(row) -> Transaction:
+    return Transaction(
+        row["transaction_id"],
+        row["user_id"],
+        row["category_id"],
+        row["amount"],
+        row["transaction_date"],
+        row["notes"],
+    )
+
+
+def find_by_user(user_id, from_date=None, to_date=None, min_amount=None, max_amount=None, category_id=None, search=None,
+                 search_mode="fulltext", descending: bool | None = None) -> list[Transaction]:
+    """
+    The user's transactions matching the filters. When `descending` is given
+    rows are sorted by date and id; otherwise full-text and fuzzy searches
+    return the best matches first and other queries are unordered.
+    """
+    with db.connection.get_connection() as conn:
+        if _is_fuzzy(search, search_mode):
+            _set_fuzzy_threshold(conn)
+        with conn.cursor() as cur:
+            cur.execute(*_find_by_user_query(
+                user_id, from_date, to_date, min_amount, max_amount, category_id, search, search_mode, descending))
+            return [_to_transaction(t) for t in cur]
+
+
+def _find_by_user_query(user_id, from_date, to_date, min_amount, max_amount, category_id, search, search_mode,
+                        descending) -> tuple[str, list]:
+    where, params = _filter_clause(
+        user_id, from_date, to_date, min_amount, max_amount, category_id, search, search_mode)
+    query = f"SELECT {_COLUMNS} FROM transactions WHERE {where}"
+
+    tsquery = _prefix_tsquery(search) if search and search_mode == "fulltext" else None
+    if descending is not None:
+        direction = "DESC" if descending else "ASC"
+        query += f" ORDER BY transaction_date {direction}, transaction_id {direction}"
+    elif tsquery is not None:
+        query += (
+            " ORDER BY ts_rank(notes_search, to_tsquery('simple', %s)) DESC,"
+            " transaction_date DESC, transaction_id DESC"
+        )
+        params.append(tsquery)
+    elif _is_fuzzy(search, search_mode):
+        query += " ORDER BY %s <<-> notes, transaction_date DESC, transaction_id DESC"
+        params.append(search)
+
+    return query, params
+
+
+def find_page_by_user(user_id, limit: int, after: tuple[date, int] | None = None, descending: bool = True,
+                      **filters) -> list[Transaction]:
+    """
+    One page of the user's transactions ordered by (transaction_date, transaction_id).
+
+    `after` is the (transaction_date, transaction_id) key of the last row of
+    the previous page; the page continues strictly past it, so each page is a
+    range scan on the key instead of an OFFSET over everything before it.
+    """
+    with db.connection.get_connection() as conn:
+        if _is_fuzzy(filters.get("search"), filters.get("search_mode")):
+            _set_fuzzy_threshold(conn)
+        with conn.cursor() as cur:
+            cur.execute(*_find_page_query(user_id, limit, after, descending, **filters))
+            return [_to_transaction(t) for t in cur]
+
+
+def _find_page_query(user_id, limit, after, descending, **filters) -> tuple[str, list]:
+    where, params = _filter_clause(user_id, **filters)
+    direction = "DESC" if descending else "ASC"
+
+    if after is not None:
+        where += f" AND (transaction_date, transaction_id) {'<' if descending else '>'} (%s, %s)"
+        params.extend(after)
+
+    return (
+        f"SELECT {_COLUMNS} FROM transactions WHERE {where} "
+        f"ORDER BY transaction_date {direction}, transaction_id {direction} LIMIT %s",
+        [*params, limit],
+    )
+
+
+def stream_by_user(user_id, batch_size: int, **filters) -> Iterator[list[Transaction]]:
+    """
+    Yields the user's matching transactions, ordered by date and id, in
+    batches of `batch_size` read through a named server-side cursor, so only
+    one batch is held in memory at a time.
+
+    Runs on its own pooled connection rather than the request's unit of work,
+    because the generator is consumed while a response streams out.
+    """
+    with db.connection.get_dedicated_connection() as conn:
+        if _is_fuzzy(filters.get("search"), filters.get("search_mode")):
+            _set_fuzzy_threshold(conn)
+        with conn.cursor(name="transactions_stream") as cur:
+            where, params = _filter_clause(user_id, **filters)
+            cur.execute(
+                f"SELECT {_COLUMNS} FROM transactions WHERE {where} ORDER BY transaction_date, transaction_id",
+                params,
+            )
+            while batch := cur.fetchmany(batch_size):
+                yield [_to_transaction(t) for t in batch]
+
+
+def suggest_notes(user_id, prefix: str, limit: int) -> list[dict]:
+    """
+    The user's distinct past notes matching `prefix`, for autocomplete. Rows
+    carry `notes` and `uses` (how many transactions have them).
+
+    Notes starting with the prefix come first, then notes with a word similar
+    to it (so typos still match); ties go to the more frequently used note.
+    Both conditions are served by the trigram index.
+    """
     with db.connection.get_connection() as conn:
+        _set_fuzzy_threshold(conn)
         with conn.cursor() as cur:
+            starts_with = _like_pattern(prefix)[1:]
             cur.execute(
-                "UPDATE transactions SET user_id = %s, category_id = %s, amount = %s, transaction_date = %s, notes = %s WHERE transaction_id = %s",
+                "SELECT notes, COUNT(*) AS uses FROM transactions "
+                "WHERE user_id = %s AND (notes ILIKE %s OR %s <%% notes) "
+                "GROUP BY notes "
+                "ORDER BY notes ILIKE %s DESC, word_similarity(%s, notes) DESC, uses DESC, notes "
+                "LIMIT %s",
+                (user_id, starts_with, prefix, starts_with, prefix, limit),
+            )
+            return cur.fetchall()
+
+
+def totals_by_period(user_id, granularity: str, from_date: date | None = None, to_date: date | None = None) -> list[dict]:
+    """
+    Per-period, per-category totals of the user's transactions.
+
+    `granularity` is a date_trunc unit ("day", "week" or "month"). Rows are
+    ordered by period and carry `period`, `category_id`, `total` and
+    `expense_count`.
+    """
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(*_totals_by_period_query(user_id, granularity, from_date, to_date))
+            return cur.fetchall()
+
+
+def _totals_by_period_query(user_id, granularity, from_date, to_date) -> tuple[str, list]:
+    query = (
+        "SELECT date_trunc(%s, transaction_date::timestamp)::date AS period, category_id, "
+        "SUM(amount) AS total, COUNT(*) AS expense_count "
+        "FROM transactions WHERE user_id = %s"
+    )
+    params = [granularity, user_id]
+
+    if from_date:
+        query += " AND transaction_date >= %s"
+        params.append(from_date)
+
+    if to_date:
+        query += " AND transaction_date <= %s"
+        params.append(to_date)
+
+    query += " GROUP BY period, category_id ORDER BY period, category_id"
+    return query, params
+
+
+def save_transaction(transaction: Transaction) -> bool:
+    """
+    Updates the transaction if it belongs to `transaction.user_id`, in a single
+    statement. None `transaction_date`/`notes` keep the stored values.
+    Returns False when no such transaction is owned by the user.
+    """
+    with db.connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE transactions SET category_id = %s, amount = %s, "
+                "transaction_date = COALESCE(%s, transaction_date), notes = COALESCE(%s, notes) "
+                "WHERE transaction_id = %s AND user_id = %s RETURNING transaction_id",
                 (
-                    transaction.user_id,
                     transaction.category_id,
                     transaction.amount,
                     transaction.transaction_date,
                     transaction.notes,
                     transaction.transaction_id,
+                    transaction.user_id,
                 ),
             )
-            conn.commit()
+            return cur.fetchone() is not None
 
 
 def get_transaction(transaction_id: int) -> Transaction | None:
     with db.connection.get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT * FROM transactions WHERE transaction_id = %s", (transaction_id,))
+            cur.execute(f"SELECT {_COLUMNS} FROM transactions WHERE transaction_id = %s", (transaction_id,))
             row = cur.fetchone()
             if row is None:
                 return None
-            return Transaction(
-                row["transaction_id"],
-                row["user_id"],
-                row["category_id"],
-                row["amount"],
-                row["transaction_date"],
-                row["notes"],
-            )
+            return _to_transaction(row)
 
 
-def delete_transaction(transaction_id: int):
+def delete_transaction(transaction_id: int, user_id: int) -> bool:
+    """Deletes the transaction if the user owns it; returns whether a row was deleted."""
     with db.connection.get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("DELETE FROM transactions WHERE transaction_id = %s", (transaction_id,))
-            conn.commit()
+            cur.execute(
+                "DELETE FROM transactions WHERE transaction_id = %s AND user_id = %s RETURNING transaction_id",
+                (transaction_id, user_id),
+            )
+            return cur.fetchone() is not None
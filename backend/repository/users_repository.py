@@ -15,7 +15,6 @@ def create_user(username, password, budget=0):
         with conn.cursor() as cur:
             cur.execute("INSERT INTO users (username, password_hash, budget) VALUES (%s, %s, %s)",
                         (username, password_hash, budget))
-            conn.commit()
 
 
 def get_all_users() -> list[User]:
@@ -40,6 +39,5 @@ def update_user_budget(user_id: int, budget: float):
     with db.connection.get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("UPDATE users SET budget = %s WHERE user_id = %s", (budget, user_id))
-            conn.commit()
 
 
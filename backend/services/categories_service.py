@@ -2,7 +2,9 @@ from flask_jwt_extended import get_jwt_identity
 
 from decorators import singleton
 from entities.category import Category
-from repository import categories_repository, users_repository
+from repository import categories_repository
+from services import current_user
+from services.response_cache import CHARTS, invalidate_after_commit
 
 
 @singleton
@@ -11,34 +13,34 @@ class CategoriesService:
         pass
 
     def _current_user(self):
-        login = get_jwt_identity()
-        return users_repository.get_user_by_username(login)
+        return current_user.resolve(get_jwt_identity())
 
     def add_category(self, name, color):
         user = self._current_user()
         if user is None:
             return
         categories_repository.create_category(Category(None, user.user_id, name, color))
+        invalidate_after_commit(user.user_id, CHARTS)
 
     def update_category(self, category_id, name, color=None):
+        """Returns False when the category does not exist or is not the user's."""
         user = self._current_user()
         if user is None:
-            return
-        user_categories = categories_repository.find_by_user(user.user_id)
-        existing = next((c for c in user_categories if c.category_id == category_id), None)
-        if existing:
-            updated_color = color if color is not None else existing.color
-            categories_repository.save_category(
-                Category(category_id, user.user_id, name, updated_color))
+            return False
+        saved = categories_repository.save_category(Category(category_id, user.user_id, name, color))
+        if saved:
+            invalidate_after_commit(user.user_id, CHARTS)
+        return saved
 
     def delete_category(self, category_id):
+        """Returns False when the category does not exist or is not the user's."""
         user = self._current_user()
         if user is None:
-            return
-
-        user_categories = categories_repository.find_by_user(user.user_id)
-        if any(c.category_id == category_id for c in user_categories):
-            categories_repository.delete_category(category_id)
+            return False
+        deleted = categories_repository.delete_category(category_id, user.user_id)
+        if deleted:
+            invalidate_after_commit(user.user_id, CHARTS)
+        return deleted
 
     def get_categories(self):
         user = self._current_user()
@@ -1,30 +1,44 @@
 from collections import defaultdict
+from datetime import date, timedelta
 from flask_jwt_extended import get_jwt_identity
 
 from decorators import singleton
-from repository import transactions_repository, categories_repository, users_repository
+from repository import monthly_totals_repository, transactions_repository, categories_repository
+from services import current_user, response_cache
+from services.response_cache import ResponseCache
 
 
 @singleton
 class ChartsService:
+    GRANULARITIES = ("day", "week", "month")
+
     def __init__(self):
-        pass
+        self.cache = ResponseCache.get_singleton()
 
     def _current_user(self):
-        login = get_jwt_identity()
-        return users_repository.get_user_by_username(login)
+        return current_user.resolve(get_jwt_identity())
 
-    def get_charts_data(self):
+    def get_charts_data(self, from_date=None, to_date=None, cached: bool = True):
         user = self._current_user()
         if user is None:
             return None
 
-        # Get all transactions for the user
-        all_transactions = transactions_repository.find_by_user(user.user_id)
+        if not cached:
+            return self._compute_charts_data(user, from_date, to_date)
+        return self.cache.get_or_compute(
+            user.user_id, response_cache.CHARTS, ("expenses", from_date, to_date),
+            lambda: self._compute_charts_data(user, from_date, to_date))
+
+    def _compute_charts_data(self, user, from_date, to_date):
+        # Get the user's transactions within the requested window
+        all_transactions = transactions_repository.find_by_user(
+            user.user_id, from_date=from_date, to_date=to_date)
 
         # Get all categories for the user
         categories = categories_repository.find_by_user(user.user_id)
+        return self._charts_data(all_transactions, categories)
 
+    def _charts_data(self, all_transactions, categories):
         # Create category lookup map
         category_map = {cat.category_id: cat.name for cat in categories}
 
@@ -54,8 +68,87 @@ class ChartsService:
             for month, expenses in sorted(transactions_by_month.items())
         ]
 
-        # Create category data with colors from database
-        category_data = [
+        return {
+            "barChartData": bar_chart_data,
+            "categoryData": self._category_data(categories)
+        }
+
+    def get_aggregated_charts_data(self, granularity="month", from_date=None, to_date=None, cached: bool = True):
+        """
+        Chart data as per-period totals (split by category) instead of
+        individual expenses. Periods are labelled "YYYY-MM" for months and
+        with the ISO date of the period start for days and weeks.
+        """
+        user = self._current_user()
+        if user is None:
+            return None
+
+        if granularity not in self.GRANULARITIES:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+
+        if not cached:
+            return self._compute_aggregated_charts_data(user, granularity, from_date, to_date)
+        return self.cache.get_or_compute(
+            user.user_id, response_cache.CHARTS, ("aggregated", granularity, from_date, to_date),
+            lambda: self._compute_aggregated_charts_data(user, granularity, from_date, to_date))
+
+    def _compute_aggregated_charts_data(self, user, granularity, from_date, to_date):
+        months = self._whole_months(from_date, to_date) if granularity == "month" else None
+        if months is not None:
+            # Whole months are answered from the rollup instead of raw transactions
+            rows = monthly_totals_repository.totals_by_month(user.user_id, *months)
+        else:
+            rows = transactions_repository.totals_by_period(
+                user.user_id, granularity, from_date=from_date, to_date=to_date)
+        categories = categories_repository.find_by_user(user.user_id)
+        return self._aggregated_charts_data(granularity, rows, categories)
+
+    def _aggregated_charts_data(self, granularity, rows, categories):
+        category_map = {cat.category_id: cat.name for cat in categories}
+
+        # Rows come ordered by period, so periods can be built in one pass
+        bar_chart_data = []
+        period_totals = []
+        for row in rows:
+            label = row["period"].strftime("%Y-%m") if granularity == "month" else row["period"].isoformat()
+            if not bar_chart_data or bar_chart_data[-1]["period"] != label:
+                bar_chart_data.append({"period": label, "categories": []})
+                period_totals.append(0)
+
+            period_totals[-1] += row["total"]
+            bar_chart_data[-1]["categories"].append({
+                "category_id": row["category_id"],
+                "category": category_map.get(row["category_id"], "Unknown"),
+                "total": float(row["total"]),
+                "count": row["expense_count"]
+            })
+
+        for period, total in zip(bar_chart_data, period_totals):
+            period["total"] = float(total)
+
+        return {
+            "granularity": granularity,
+            "barChartData": bar_chart_data,
+            "categoryData": self._category_data(categories)
+        }
+
+    @staticmethod
+    def _whole_months(from_date: date | None, to_date: date | None) -> tuple[date | None, date | None] | None:
+        """
+        The (first, last) month starts covered by a window that starts on the
+        first and ends on the last day of a month (open ends allowed), or None
+        when the window cuts through a month.
+        """
+        if from_date and from_date.day != 1:
+            return None
+        if to_date and (to_date + timedelta(days=1)).day != 1:
+            return None
+        return from_date, to_date.replace(day=1) if to_date else None
+
+    @staticmethod
+    def _category_data(categories):
+        # Category data with colors from database
+        return [
             {
                 "category_id": cat.category_id,
                 "name": cat.name,
@@ -63,8 +156,3 @@ class ChartsService:
             }
             for cat in categories
         ]
-
-        return {
-            "barChartData": bar_chart_data,
-            "categoryData": category_data
-        }
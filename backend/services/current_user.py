@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+
+from flask import has_request_context
+from flask_jwt_extended import get_jwt
+
+from entities.user import User
+from repository import users_repository
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Authenticated user as described by the access token claims."""
+    user_id: int
+    username: str
+
+
+def token_claims(user: User | CurrentUser) -> dict:
+    """Additional claims embedded in access and refresh tokens."""
+    return {"user_id": user.user_id}
+
+
+def _jwt_claims() -> dict:
+    if not has_request_context():
+        return {}
+    try:
+        return get_jwt()
+    except RuntimeError:
+        # No verified JWT in this request
+        return {}
+
+
+def resolve(identity, fresh: bool = False) -> CurrentUser | User | None:
+    """
+    Resolves the user behind `identity` (the JWT subject).
+
+    The user id comes straight from the token claims, so most requests do not
+    query the users table. Pass `fresh=True` when current column values such
+    as `budget` are needed. Tokens issued before the claims were added fall
+    back to a lookup by username.
+    """
+    if identity is None:
+        return None
+
+    claims = _jwt_claims()
+    if not fresh and claims.get("sub") == identity and "user_id" in claims:
+        return CurrentUser(claims["user_id"], identity)
+
+    return users_repository.get_user_by_username(identity)
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import date
+
+from flask_jwt_extended import get_jwt_identity
+
+import db.async_connection
+from db import unit_of_work
+from decorators import singleton
+from repository.aio import categories_repository, monthly_totals_repository, transactions_repository, users_repository
+from services import current_user
+from services.categories_service import CategoriesService
+from services.charts_service import ChartsService
+from services.expenses_service import ExpensesService
+from services.summary_service import SummaryService
+
+
+@singleton
+class DashboardService:
+    FIELDS = ("summary", "charts", "categories", "expenses")
+    CHART_MODES = ("expenses", "aggregated")
+
+    def __init__(self):
+        self.summary_service = SummaryService.get_singleton()
+        self.charts_service = ChartsService.get_singleton()
+        self.categories_service = CategoriesService.get_singleton()
+        self.expenses_service = ExpensesService.get_singleton()
+
+    def get_dashboard(self, fields=FIELDS, chart_mode="expenses", granularity="month", limit=None, sort=None,
+                      **filters):
+        """
+        The dashboard sections named in `fields`, keyed by name.
+
+        Charts use the `from_date`/`to_date` of `filters`; expenses use all of
+        them and are paginated like /api/v1/expenses when `limit` is given.
+        Sections are always computed rather than taken from the response
+        cache, whose entries may come from different points in time: run this
+        inside one snapshot (unit_of_work.snapshot) and the sections agree.
+        """
+        dashboard = {}
+
+        if "summary" in fields:
+            dashboard["summary"] = self.summary_service.get_summary(cached=False)
+
+        if "charts" in fields:
+            window = {"from_date": filters.get("from_date"), "to_date": filters.get("to_date")}
+            if chart_mode == "aggregated":
+                dashboard["charts"] = self.charts_service.get_aggregated_charts_data(granularity, **window, cached=False)
+            else:
+                dashboard["charts"] = self.charts_service.get_charts_data(**window, cached=False)
+
+        if "categories" in fields:
+            dashboard["categories"] = self.categories_service.get_categories()
+
+        if "expenses" in fields:
+            if limit is None:
+                dashboard["expenses"] = self.expenses_service.get_expenses_list(**filters, sort=sort)
+            else:
+                dashboard["expenses"] = self.expenses_service.get_expenses_page(
+                    limit, sort=sort or "date_desc", **filters)
+
+        return dashboard
+
+    def get_dashboard_concurrently(self, fields=FIELDS, chart_mode="expenses", granularity="month", limit=None,
+                                   sort=None, **filters):
+        """
+        Same as get_dashboard, but the sections' queries run concurrently, on
+        connections of the async pool (db.async_connection), instead of one
+        after another on the request's connection. They all import the
+        snapshot of the request's transaction (or share a new one outside a
+        request), so the sections still agree with each other.
+        """
+        identity = get_jwt_identity()
+        user = current_user.resolve(identity)
+        if user is None:
+            return self.get_dashboard(fields, chart_mode, granularity, limit, sort, **filters)
+
+        if "charts" in fields and chart_mode == "aggregated" and granularity not in ChartsService.GRANULARITIES:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+
+        uow = unit_of_work.current()
+        snapshot_id = uow.export_snapshot() if uow is not None else None
+        return db.async_connection.run(self._gather_dashboard(
+            user.user_id, identity, snapshot_id, fields, chart_mode, granularity, limit, sort, filters))
+
+    async def _gather_dashboard(self, user_id, identity, snapshot_id, fields, chart_mode, granularity, limit, sort,
+                                filters):
+        async def summary():
+            first_day_of_month = date.today().replace(day=1)
+            user, monthly_expenses = await asyncio.gather(
+                users_repository.get_user_by_username(identity),
+                monthly_totals_repository.sum_for_month(user_id, first_day_of_month))
+            return None if user is None else SummaryService._summary(user, monthly_expenses)
+
+        async def charts():
+            from_date, to_date = filters.get("from_date"), filters.get("to_date")
+            if chart_mode != "aggregated":
+                transactions = await transactions_repository.find_by_user(
+                    user_id, from_date=from_date, to_date=to_date)
+                return self.charts_service._charts_data(transactions, await categories)
+
+            months = ChartsService._whole_months(from_date, to_date) if granularity == "month" else None
+            if months is not None:
+                rows = await monthly_totals_repository.totals_by_month(user_id, *months)
+            else:
+                rows = await transactions_repository.totals_by_period(
+                    user_id, granularity, from_date=from_date, to_date=to_date)
+            return self.charts_service._aggregated_charts_data(granularity, rows, await categories)
+
+        async def categories_section():
+            return [c.__dict__ for c in await categories]
+
+        async def expenses():
+            if limit is None:
+                return await transactions_repository.find_by_user(
+                    user_id, **filters, descending=None if sort is None else sort == "date_desc")
+            page_sort = sort or "date_desc"
+            rows = await transactions_repository.find_page_by_user(
+                user_id, limit + 1, descending=page_sort == "date_desc", **filters)
+            return ExpensesService._page(rows, limit, page_sort)
+
+        sections = {"summary": summary, "charts": charts, "categories": categories_section, "expenses": expenses}
+        async with db.async_connection.snapshot(snapshot_id):
+            # Tasks are started inside the block so that they join the snapshot.
+            # Charts and the category list share one read of the categories.
+            pending = []
+            if "charts" in fields or "categories" in fields:
+                categories = asyncio.ensure_future(categories_repository.find_by_user(user_id))
+                pending.append(categories)
+            tasks = {name: asyncio.ensure_future(section()) for name, section in sections.items() if name in fields}
+            pending.extend(tasks.values())
+            try:
+                await asyncio.gather(*pending)
+            except BaseException:
+                # Nothing may outlive the snapshot
+                for task in pending:
+                    task.cancel()
+                raise
+
+        return {name: task.result() for name, task in tasks.items()}
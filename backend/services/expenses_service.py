@@ -1,20 +1,55 @@
+import base64
+import csv
+import io
+import json
 from datetime import date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 
 from flask_jwt_extended import get_jwt_identity
 
+from config import AppConfig
 from decorators import singleton
 from entities.transaction import Transaction
-from repository import transactions_repository, users_repository
+from repository import categories_repository, transactions_repository
+from services import current_user
+from services.response_cache import CHARTS, SUMMARY, invalidate_after_commit
+
+
+def _encode_cursor(transaction: Transaction, sort: str) -> str:
+    raw = json.dumps([transaction.transaction_date.isoformat(), transaction.transaction_id, sort])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        transaction_date, transaction_id, cursor_sort = json.loads(raw)
+        key = (date.fromisoformat(transaction_date), int(transaction_id))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match the requested sort order")
+    return key
 
 
 @singleton
 class ExpensesService:
+    SORT_ORDERS = ("date_desc", "date_asc")
+    MAX_PAGE_SIZE = 500
+    EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+    EXPORT_COLUMNS = ("expense_id", "date", "category_id", "category", "amount", "description")
+    SEARCH_MODES = ("fulltext", "fuzzy", "literal")
+    MAX_SUGGESTIONS = 50
+    BATCH_OPERATIONS = ("create", "update", "delete")
+    MAX_BATCH_SIZE = 1000
+    MAX_AMOUNT = Decimal("99999999.99")  # NUMERIC(10, 2)
+
     def __init__(self):
-        pass
+        self.config = AppConfig.get_singleton()
 
     def _current_user(self):
-        login = get_jwt_identity()
-        return users_repository.get_user_by_username(login)
+        return current_user.resolve(get_jwt_identity())
 
     def add_expense(self, category_id, amount, notes: str = "", transaction_date=None):
         user = self._current_user()
@@ -29,39 +64,143 @@ class ExpensesService:
             transaction_date=transaction_date if transaction_date else date.today(),
             notes=notes,
         )
-        return transactions_repository.create_transaction(transaction)
+        expense_id = transactions_repository.create_transaction(transaction)
+        invalidate_after_commit(user.user_id, SUMMARY, CHARTS)
+        return expense_id
 
     def update_expense(self, expense_id, category_id, amount, notes: str = None):
+        """Returns False when the expense does not exist or is not the user's."""
         user = self._current_user()
         if user is None:
-            return
-
-        existing = transactions_repository.get_transaction(expense_id)
-        if existing is None or existing.user_id != user.user_id:
-            return
+            return False
 
         updated = Transaction(
             transaction_id=expense_id,
             user_id=user.user_id,
             category_id=category_id,
             amount=amount,
-            transaction_date=existing.transaction_date,
-            notes=notes if notes is not None else existing.notes,
+            transaction_date=None,
+            notes=notes,
         )
-        transactions_repository.save_transaction(updated)
+        saved = transactions_repository.save_transaction(updated)
+        if saved:
+            invalidate_after_commit(user.user_id, SUMMARY, CHARTS)
+        return saved
 
     def delete_expense(self, expense_id):
+        """Returns False when the expense does not exist or is not the user's."""
         user = self._current_user()
         if user is None:
-            return
+            return False
 
-        existing = transactions_repository.get_transaction(expense_id)
-        if existing is None or existing.user_id != user.user_id:
-            return
+        deleted = transactions_repository.delete_transaction(expense_id, user.user_id)
+        if deleted:
+            invalidate_after_commit(user.user_id, SUMMARY, CHARTS)
+        return deleted
 
-        transactions_repository.delete_transaction(expense_id)
+    def apply_batch(self, operations):
+        """
+        Applies a list of create/update/delete operations in the request's
+        transaction and returns one result per operation, in input order:
+        {"index", "status": "ok" | "not_found" | "invalid", "expense_id"[, "error"]}.
 
-    def get_expenses_list(self, from_date=None, to_date=None, min_amount=None, max_amount=None, category_id=None, search=None):
+        Ownership of every referenced expense and category is checked with
+        one query each, and each kind of write goes out as a single batched
+        statement, so the cost does not grow by a round trip per item. An
+        expense may be referenced by one operation only (later ones are
+        invalid), which makes the outcome independent of the order the
+        writes go out in.
+        """
+        user = self._current_user()
+        if user is None:
+            return None
+
+        results = [None] * len(operations)
+        creates, updates, deletes = [], [], []
+        # Index of the operation referencing each expense
+        referenced = {}
+
+        for index, operation in enumerate(operations):
+            try:
+                kind, transaction = self._parse_batch_operation(operation, user.user_id)
+                expense_id = transaction.transaction_id
+                if expense_id is not None and expense_id in referenced:
+                    raise ValueError(f"Expense {expense_id} is already changed by operation {referenced[expense_id]}")
+            except (KeyError, TypeError, ValueError, InvalidOperation) as e:
+                results[index] = {"index": index, "status": "invalid", "expense_id": None, "error": str(e)}
+                continue
+            if expense_id is not None:
+                referenced[expense_id] = index
+            {"create": creates, "update": updates, "delete": deletes}[kind].append((index, transaction))
+
+        owned = transactions_repository.find_owned_ids(
+            user.user_id, [t.transaction_id for _, t in updates + deletes])
+        for index, transaction in updates + deletes:
+            if transaction.transaction_id not in owned:
+                results[index] = {"index": index, "status": "not_found", "expense_id": transaction.transaction_id}
+        updates = [(i, t) for i, t in updates if t.transaction_id in owned]
+        deletes = [(i, t) for i, t in deletes if t.transaction_id in owned]
+
+        # Unknown and other users' categories would fail the whole batch on the foreign key
+        owned_categories = categories_repository.find_owned_ids(
+            user.user_id, list({t.category_id for _, t in creates + updates}))
+        for index, transaction in creates + updates:
+            if transaction.category_id not in owned_categories:
+                results[index] = {"index": index, "status": "invalid", "expense_id": transaction.transaction_id,
+                                  "error": f"Unknown category: {transaction.category_id}"}
+        creates = [(i, t) for i, t in creates if t.category_id in owned_categories]
+        updates = [(i, t) for i, t in updates if t.category_id in owned_categories]
+
+        created_ids = transactions_repository.create_transactions([t for _, t in creates])
+        transactions_repository.update_transactions(user.user_id, [t for _, t in updates])
+        transactions_repository.delete_transactions(user.user_id, [t.transaction_id for _, t in deletes])
+        if creates or updates or deletes:
+            invalidate_after_commit(user.user_id, SUMMARY, CHARTS)
+
+        for (index, _), expense_id in zip(creates, created_ids):
+            results[index] = {"index": index, "status": "ok", "expense_id": expense_id}
+        for index, transaction in updates + deletes:
+            results[index] = {"index": index, "status": "ok", "expense_id": transaction.transaction_id}
+        return results
+
+    def _parse_batch_operation(self, operation, user_id):
+        kind = operation["op"]
+        if kind not in self.BATCH_OPERATIONS:
+            raise ValueError(f"Unknown op: {kind!r}")
+
+        if kind == "delete":
+            return kind, Transaction(int(operation["expense_id"]), user_id, None, None, None, None)
+
+        category_id = int(operation.get("category_id") or operation["category"])
+        amount = Decimal(str(operation["amount"]))
+        if not amount.is_finite():
+            raise ValueError("amount must be a finite number")
+        # Rounded the way PostgreSQL stores it
+        if abs(amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)) > self.MAX_AMOUNT:
+            raise ValueError(f"amount must be at most {self.MAX_AMOUNT}")
+
+        if kind == "update":
+            return kind, Transaction(
+                transaction_id=int(operation["expense_id"]),
+                user_id=user_id,
+                category_id=category_id,
+                amount=amount,
+                transaction_date=None,
+                notes=operation.get("description"),
+            )
+
+        transaction_date = operation.get("date")
+        return kind, Transaction(
+            transaction_id=None,
+            user_id=user_id,
+            category_id=category_id,
+            amount=amount,
+            transaction_date=date.fromisoformat(transaction_date) if transaction_date else date.today(),
+            notes=operation.get("description", ""),
+        )
+
+    def get_expenses_list(self, from_date=None, to_date=None, min_amount=None, max_amount=None, category_id=None, search=None,
+                          search_mode="fulltext", sort=None):
         user = self._current_user()
         if user is None:
             return []
@@ -73,4 +212,115 @@ class ExpensesService:
             max_amount=max_amount,
             category_id=category_id,
             search=search,
+            search_mode=search_mode,
+            descending=None if sort is None else sort == "date_desc",
         )
+
+    def get_expenses_page(self, limit, cursor=None, sort="date_desc", from_date=None, to_date=None, min_amount=None,
+                          max_amount=None, category_id=None, search=None, search_mode="fulltext"):
+        """
+        One page of expenses plus an opaque cursor for the next one
+        (None on the last page). Raises ValueError for a malformed cursor.
+        """
+        after = _decode_cursor(cursor, sort) if cursor else None
+
+        user = self._current_user()
+        if user is None:
+            return {"expenses": [], "nextCursor": None}
+
+        # One extra row tells whether another page follows
+        rows = transactions_repository.find_page_by_user(
+            user.user_id,
+            limit + 1,
+            after=after,
+            descending=sort == "date_desc",
+            from_date=from_date,
+            to_date=to_date,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            category_id=category_id,
+            search=search,
+            search_mode=search_mode,
+        )
+        return self._page(rows, limit, sort)
+
+    @staticmethod
+    def _page(rows, limit, sort):
+        """The response for `limit` + 1 rows fetched for a page."""
+        next_cursor = _encode_cursor(rows[limit - 1], sort) if len(rows) > limit else None
+        return {"expenses": rows[:limit], "nextCursor": next_cursor}
+
+    def suggest_descriptions(self, prefix: str, limit: int = 10):
+        """
+        The user's past descriptions matching `prefix`, best match first, as
+        [{"description", "count"}] where count is how often it was used.
+        """
+        user = self._current_user()
+        if user is None or not prefix.strip():
+            return []
+
+        rows = transactions_repository.suggest_notes(user.user_id, prefix.strip(), limit)
+        return [{"description": row["notes"], "count": row["uses"]} for row in rows]
+
+    def export_expenses(self, export_format="csv", from_date=None, to_date=None, min_amount=None, max_amount=None,
+                        category_id=None, search=None, search_mode="fulltext"):
+        """
+        Returns an iterator of text chunks with the user's expenses as CSV or
+        NDJSON, one chunk per batch read from the database, so memory use does
+        not depend on the number of exported rows. Amounts are written as exact
+        decimal strings.
+        """
+        if export_format not in self.EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+
+        # Resolved eagerly: the returned generator runs outside the request
+        user = self._current_user()
+        if user is None:
+            return iter(())
+
+        category_map = {c.category_id: c.name for c in categories_repository.find_by_user(user.user_id)}
+        batches = transactions_repository.stream_by_user(
+            user.user_id,
+            self.config.export_batch_size,
+            from_date=from_date,
+            to_date=to_date,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            category_id=category_id,
+            search=search,
+            search_mode=search_mode,
+        )
+
+        def rows():
+            for batch in batches:
+                yield [
+                    (
+                        t.transaction_id,
+                        t.transaction_date.isoformat(),
+                        t.category_id,
+                        category_map.get(t.category_id, "Unknown"),
+                        str(t.amount),
+                        t.notes or "",
+                    )
+                    for t in batch
+                ]
+
+        if export_format == "ndjson":
+            return (
+                "".join(json.dumps(dict(zip(self.EXPORT_COLUMNS, row))) + "\n" for row in batch)
+                for batch in rows()
+            )
+        return self._csv_chunks(rows())
+
+    def _csv_chunks(self, batches):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.EXPORT_COLUMNS)
+        for batch in batches:
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # Header only, nothing was exported
+            yield buffer.getvalue()
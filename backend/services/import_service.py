@@ -0,0 +1,155 @@
+import csv
+import io
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from flask_jwt_extended import get_jwt_identity
+
+from decorators import singleton
+from repository import categories_repository, transactions_repository
+from services import current_user
+from services.response_cache import CHARTS, SUMMARY, invalidate_after_commit
+
+
+@dataclass
+class ImportMapping:
+    """How the columns of an uploaded bank statement map onto expenses."""
+    date_column: str = "date"
+    amount_column: str = "amount"
+    notes_column: str | None = "description"
+    category_column: str | None = "category"
+    date_format: str = "%Y-%m-%d"
+    decimal_separator: str = "."
+    delimiter: str = ","
+    default_category_id: int | None = None
+    # Statements usually list money going out as negative amounts
+    negate_amounts: bool = False
+
+
+@singleton
+class ImportService:
+    MAX_REPORTED_ERRORS = 100
+    MAX_AMOUNT = Decimal("99999999.99")  # NUMERIC(10, 2)
+
+    def __init__(self):
+        pass
+
+    def _current_user(self):
+        return current_user.resolve(get_jwt_identity())
+
+    def import_csv(self, stream, mapping: ImportMapping):
+        """
+        Imports expenses from a CSV byte stream in a single pass: rows are
+        validated and normalized as they are read and bulk-loaded with COPY.
+        Rows duplicating an existing expense (same date, amount and notes)
+        are skipped. Invalid rows are skipped and reported by line number.
+
+        Raises ValueError when the mapping does not fit the file.
+        """
+        user = self._current_user()
+        if user is None:
+            return None
+
+        categories = {c.name.casefold(): c.category_id for c in categories_repository.find_by_user(user.user_id)}
+        if mapping.default_category_id is not None and mapping.default_category_id not in categories.values():
+            raise ValueError("Unknown default category")
+
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""), delimiter=mapping.delimiter)
+        try:
+            fieldnames = reader.fieldnames or []
+        except csv.Error as e:
+            raise ValueError(f"Malformed CSV header: {e}") from None
+        columns = [mapping.date_column, mapping.amount_column, mapping.notes_column]
+        # Rows without a category column get the default one
+        if mapping.default_category_id is None:
+            columns.append(mapping.category_column)
+        missing = [c for c in columns if c is not None and c not in fieldnames]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        errors = []
+        error_count = 0
+
+        def report(line: int, error: str):
+            nonlocal error_count
+            error_count += 1
+            if len(errors) < self.MAX_REPORTED_ERRORS:
+                errors.append({"line": line, "error": error})
+
+        def records():
+            # Line 1 is the header
+            line = 1
+            while True:
+                line += 1
+                try:
+                    record = next(reader)
+                except StopIteration:
+                    return
+                except csv.Error as e:
+                    # The reader moves on to the next row
+                    report(line, f"Malformed row: {e}")
+                    continue
+                yield line, record
+
+        def rows():
+            for line, record in records():
+                try:
+                    yield self._normalize(record, mapping, categories)
+                except ValueError as e:
+                    report(line, str(e))
+
+        staged, imported = transactions_repository.import_transactions(user.user_id, rows())
+        if imported:
+            invalidate_after_commit(user.user_id, SUMMARY, CHARTS)
+        return {
+            "imported": imported,
+            "duplicates": staged - imported,
+            "invalid": error_count,
+            "errors": errors,
+        }
+
+    def _normalize(self, record, mapping: ImportMapping, categories):
+        raw_date = (record.get(mapping.date_column) or "").strip()
+        try:
+            transaction_date = datetime.strptime(raw_date, mapping.date_format).date()
+        except ValueError:
+            raise ValueError(f"Invalid date: {raw_date!r}") from None
+
+        raw_amount = (record.get(mapping.amount_column) or "").strip()
+        # Drop thousands separators: spaces, or whichever of "." and "," is not the decimal separator
+        normalized = raw_amount.replace(" ", "").replace("\u00a0", "")
+        if mapping.decimal_separator != ".":
+            normalized = normalized.replace(".", "").replace(mapping.decimal_separator, ".")
+        else:
+            normalized = normalized.replace(",", "")
+        try:
+            amount = Decimal(normalized)
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {raw_amount!r}") from None
+        if not amount.is_finite():
+            raise ValueError(f"Invalid amount: {raw_amount!r}")
+        try:
+            amount = amount.quantize(Decimal("0.01"))
+        except InvalidOperation:
+            # More digits than the decimal context holds
+            raise ValueError(f"Invalid amount: {raw_amount!r}") from None
+        if mapping.negate_amounts:
+            amount = -amount
+        if amount <= 0:
+            raise ValueError(f"Not an expense: {raw_amount!r}")
+        if amount > self.MAX_AMOUNT:
+            raise ValueError(f"Amount too large: {raw_amount!r}")
+
+        category_id = mapping.default_category_id
+        if mapping.category_column is not None:
+            name = (record.get(mapping.category_column) or "").strip()
+            if name:
+                category_id = categories.get(name.casefold())
+                if category_id is None:
+                    raise ValueError(f"Unknown category: {name!r}")
+        if category_id is None:
+            raise ValueError("Missing category")
+
+        notes = (record.get(mapping.notes_column) or "").strip() if mapping.notes_column is not None else ""
+        return category_id, amount, transaction_date, notes
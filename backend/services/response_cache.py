@@ -0,0 +1,195 @@
+"""
+Per-process cache of computed responses (summary, charts), keyed by user,
+namespace and parameters.
+
+Bounded three ways: entry count and approximate memory size (least recently
+used entries are evicted first) and a TTL. Write paths call
+`invalidate_after_commit` with the namespaces they affect, so a user's
+entries are dropped once the change is committed. With several workers,
+changes made elsewhere arrive through the invalidation bus
+(db.invalidation_bus), but asynchronously: entries are therefore always
+checked against the user's data version before being served. Under
+http_cache.conditional_get that is the version the ETag was made from, so a
+cached body never goes out under the ETag of a newer version.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from flask import g, has_request_context
+
+from config import AppConfig
+from db import unit_of_work
+from db.invalidation_bus import InvalidationBus
+from decorators import singleton
+from repository import data_versions_repository
+
+SUMMARY = "summary"
+CHARTS = "charts"
+
+# Namespaces affected by a change to each table, as published on the bus
+ENTITY_NAMESPACES = {
+    "transactions": (SUMMARY, CHARTS),
+    "categories": (CHARTS,),
+    "users": (SUMMARY,),
+}
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    size: int
+    # User's data version read before the value was computed
+    version: int
+
+
+def _approximate_size(value) -> int:
+    """Rough deep size in bytes of JSON-like data (dicts, lists, scalars)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_approximate_size(k) + _approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_approximate_size(item) for item in value)
+    return size
+
+
+def _data_version(user_id) -> int:
+    # Read for the ETag already when the view is a conditional_get one
+    if has_request_context():
+        known = g.get("data_version")
+        if known is not None and known[0] == user_id:
+            return known[1]
+    return data_versions_repository.get_data_version(user_id)[0]
+
+
+@singleton
+class ResponseCache:
+    """
+    Thread-safe LRU cache with TTL and memory cap.
+
+    Cached values are shared between requests and must not be mutated.
+    """
+
+    def __init__(self):
+        config = AppConfig.get_singleton()
+        self.enabled = config.response_cache_enabled
+        self.max_entries = config.response_cache_max_entries
+        self.max_bytes = config.response_cache_max_bytes
+        self.ttl = config.response_cache_ttl
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._keys_by_user: dict[Any, set[tuple]] = {}
+        # Bumped on every invalidation of a user; a value computed while the
+        # generation changed may predate the write and is not stored
+        self._generations: dict[Any, int] = {}
+        # Bumped by clear(), which also forgets the generations
+        self._epoch = 0
+        self._bytes = 0
+        self._bus: InvalidationBus | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, user_id, namespace: str, params: tuple, compute: Callable[[], Any]):
+        """Returns the cached value for the key, or computes and caches it. None results are not cached."""
+        if not self.enabled:
+            return compute()
+
+        key = (user_id, namespace, params)
+        # Changes made by other workers may not have been heard yet
+        version = _data_version(user_id)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at <= time.monotonic():
+                    self._remove(key)
+                    self.expirations += 1
+                elif entry.version == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(user_id, 0))
+
+        value = compute()
+        if value is None:
+            return value
+
+        size = _approximate_size(value)
+        with self._lock:
+            if (self._epoch, self._generations.get(user_id, 0)) != generation or size > self.max_bytes:
+                return value
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, time.monotonic() + self.ttl, size, version)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def invalidate(self, user_id, *namespaces: str) -> None:
+        """Drops the user's entries in `namespaces`, or all of them when none are given."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self.invalidations += 1
+            for key in list(self._keys_by_user.get(user_id, ())):
+                if not namespaces or key[1] in namespaces:
+                    self._remove(key)
+
+    def apply_change(self, user_id, entity: str) -> None:
+        """Invalidates what a change to `entity` (a table name) of the user affects."""
+        self.invalidate(user_id, *ENTITY_NAMESPACES.get(entity, ()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self._generations.clear()
+            self._epoch += 1
+            self._bytes = 0
+
+    def use_invalidation_bus(self, bus: InvalidationBus) -> None:
+        """Applies changes published by other workers; see the module docstring."""
+        self._bus = bus
+        bus.subscribe(self.apply_change, self.clear)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "bus": self._bus.stats() if self._bus is not None else None,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        user_keys = self._keys_by_user[key[0]]
+        user_keys.discard(key)
+        if not user_keys:
+            del self._keys_by_user[key[0]]
+
+
+def invalidate_after_commit(user_id, *namespaces: str) -> None:
+    """Invalidates the user's cached responses once the current transaction commits."""
+    cache = ResponseCache.get_singleton()
+    unit_of_work.after_commit(lambda: cache.invalidate(user_id, *namespaces))
@@ -1,46 +1,44 @@
-from datetime import date, timedelta
+from datetime import date
 from flask_jwt_extended import get_jwt_identity
 
 from decorators import singleton
-from repository import transactions_repository, users_repository
+from repository import monthly_totals_repository
+from services import current_user, response_cache
+from services.response_cache import ResponseCache
 
 
 @singleton
 class SummaryService:
     def __init__(self):
-        pass
+        self.cache = ResponseCache.get_singleton()
 
     def _current_user(self):
-        login = get_jwt_identity()
-        return users_repository.get_user_by_username(login)
+        return current_user.resolve(get_jwt_identity(), fresh=True)
 
-    def get_summary(self):
-        user = self._current_user()
+    def get_summary(self, cached: bool = True):
+        # The token identifies the user; the budget is only read on a cache miss
+        user = current_user.resolve(get_jwt_identity())
         if user is None:
             return None
 
-        # Get current month's date range
-        today = date.today()
-        first_day_of_month = today.replace(day=1)
-        # Calculate last day of month
-        if today.month == 12:
-            last_day_of_month = today.replace(
-                year=today.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            last_day_of_month = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
-
-        # Get all transactions for the user
-        all_transactions = transactions_repository.find_by_user(user.user_id)
+        first_day_of_month = date.today().replace(day=1)
+        if not cached:
+            return self._compute_summary(first_day_of_month)
+        return self.cache.get_or_compute(
+            user.user_id, response_cache.SUMMARY, (first_day_of_month,),
+            lambda: self._compute_summary(first_day_of_month))
 
-        # Filter transactions for current month
-        monthly_transactions = [
-            t for t in all_transactions
-            if first_day_of_month <= t.transaction_date <= last_day_of_month
-        ]
+    def _compute_summary(self, first_day_of_month: date):
+        user = self._current_user()
+        if user is None:
+            return None
 
-        # Calculate monthly expenses
-        monthly_expenses = sum(t.amount for t in monthly_transactions)
+        # Calculate monthly expenses from the current month's rollup rows
+        monthly_expenses = monthly_totals_repository.sum_for_month(user.user_id, first_day_of_month)
+        return self._summary(user, monthly_expenses)
 
+    @staticmethod
+    def _summary(user, monthly_expenses):
         # Total balance is the global budget from the user entity
         total_balance = user.budget
 
@@ -4,6 +4,8 @@ from repository.users_repository import create_user, get_all_users, get_user_by_
 from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity
 from entities.category import Category
 from repository import categories_repository
+from services import current_user
+from services.response_cache import SUMMARY, invalidate_after_commit
 
 
 @singleton
@@ -16,26 +18,33 @@ class UsersService:
         self.config = AppConfig.get_singleton()
 
     def _current_user(self):
-        login = get_jwt_identity()
-        return get_user_by_username(login)
+        return current_user.resolve(get_jwt_identity())
 
     def register(self, login, password, budget=0):
         create_user(login, password, budget)
 
-    def check_password(self, login, password):
+    def authenticate(self, login, password):
         user = get_user_by_username(login)
-        if user is None:
-            return False
+        if user is None or user.password_hash != hash_password(password):
+            return None
+        return user
 
-        return user.password_hash == hash_password(password)
+    def check_password(self, login, password):
+        return self.authenticate(login, password) is not None
 
-    def refresh_token(self):
-        user = get_jwt_identity()
+    def issue_tokens(self, user):
+        claims = current_user.token_claims(user)
         return {
-            "auth_token": create_access_token(identity=user),
-            "refresh_token": create_refresh_token(identity=user)
+            "auth_token": create_access_token(identity=user.username, additional_claims=claims),
+            "refresh_token": create_refresh_token(identity=user.username, additional_claims=claims)
         }
 
+    def refresh_token(self):
+        user = self._current_user()
+        if user is None:
+            return None
+        return self.issue_tokens(user)
+
     def update_user_budget(self, budget):
         user = self._current_user()
         if user is None or budget is None:
@@ -43,3 +52,4 @@ class UsersService:
 
         if isinstance(budget, (int, float, str)):
             update_user_budget(user.user_id, float(budget))
+            invalidate_after_commit(user.user_id, SUMMARY)
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+import db.async_connection
+import db.connection
+from repository.aio import users_repository
+
+
+async def _count_users():
+    async with db.async_connection.get_connection() as conn:
+        cur = await conn.execute("SELECT COUNT(*) AS n FROM users")
+        return (await cur.fetchone())["n"]
+
+
+def _insert_user(user_id: int):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO users (user_id, username, password_hash) VALUES (%s, %s, 'pw')", (user_id, f"u{user_id}"))
+
+
+def test_run_returns_result_of_coroutine():
+    _insert_user(1)
+
+    user = db.async_connection.run(users_repository.get_user_by_username("u1"))
+
+    assert user.user_id == 1
+    assert db.async_connection.run(users_repository.get_user_by_username("nobody")) is None
+
+
+def test_concurrent_connections_share_snapshot():
+    _insert_user(1)
+
+    async def counts_around_insert():
+        async with db.async_connection.snapshot():
+            before = await _count_users()
+            # Committed after the snapshot was taken
+            await asyncio.get_running_loop().run_in_executor(None, _insert_user, 2)
+            return before, await asyncio.gather(_count_users(), _count_users())
+
+    before, during = db.async_connection.run(counts_around_insert())
+
+    assert before == 1
+    assert during == [1, 1]
+    assert db.async_connection.run(_count_users()) == 2
+
+
+def test_snapshot_joins_exported_snapshot():
+    _insert_user(1)
+
+    with db.connection.get_pool().connection() as conn:
+        conn.execute("BEGIN ISOLATION LEVEL REPEATABLE READ")
+        snapshot_id = conn.execute("SELECT pg_export_snapshot() AS snapshot_id").fetchone()["snapshot_id"]
+        _insert_user(2)
+
+        async def count():
+            async with db.async_connection.snapshot(snapshot_id):
+                return await _count_users()
+
+        assert db.async_connection.run(count()) == 1
+
+
+def test_snapshot_connections_are_read_only():
+    async def write():
+        async with db.async_connection.snapshot():
+            async with db.async_connection.get_connection() as conn:
+                await conn.execute("INSERT INTO users (username, password_hash) VALUES ('u1', 'pw')")
+
+    with pytest.raises(Exception, match="read-only"):
+        db.async_connection.run(write())
+
+    # Connections go back to the pool in their default mode
+    assert db.async_connection.run(_count_users()) == 0
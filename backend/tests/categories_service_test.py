@@ -58,3 +58,30 @@ def test_get_categories_returns_only_current_user(monkeypatch):
     assert categories[0]["name"] == "owner-cat"
     assert categories[0]["user_id"] == 1
     assert categories[0]["color"] == "#FF0000"
+
+
+def test_update_category_updates_owned_and_keeps_color(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "old", "#123456")
+    monkeypatch.setattr("services.categories_service.get_jwt_identity", lambda: "u1")
+    service = CategoriesService.get_singleton()
+
+    assert service.update_category(1, "new") is True
+
+    [category] = categories_repository.find_by_user(1)
+    assert (category.name, category.color) == ("new", "#123456")
+
+
+def test_update_and_delete_category_report_not_found(monkeypatch):
+    _set_user("u1", 1)
+    _set_user("u2", 2)
+    _set_category(1, 1, "owned", "#FF0000")
+    monkeypatch.setattr("services.categories_service.get_jwt_identity", lambda: "u2")
+    service = CategoriesService.get_singleton()
+
+    assert service.update_category(1, "hijack", "#000000") is False
+    assert service.delete_category(1) is False
+    assert service.delete_category(999) is False
+
+    [category] = categories_repository.find_by_user(1)
+    assert (category.name, category.color) == ("owned", "#FF0000")
@@ -174,3 +174,84 @@ def test_get_charts_data_handles_empty_notes(monkeypatch):
 
     expense = charts["barChartData"][0]["expenses"][0]
     assert expense["description"] == ""
+
+
+def test_get_charts_data_respects_date_window(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Food")
+
+    _set_transaction(1, 1, 1, Decimal("100"), date(2024, 1, 15), "January")
+    _set_transaction(2, 1, 1, Decimal("50"), date(2024, 2, 20), "February")
+
+    monkeypatch.setattr("services.charts_service.get_jwt_identity", lambda: "u1")
+    service = ChartsService.get_singleton()
+    charts = service.get_charts_data(from_date=date(2024, 2, 1))
+
+    assert [item["month"] for item in charts["barChartData"]] == ["2024-02"]
+
+
+def test_get_aggregated_charts_data_totals_by_month_and_category(monkeypatch):
+    _set_user("u1", 1)
+    _set_user("u2", 2)
+    _set_category(1, 1, "Food")
+    _set_category(2, 1, "Transport")
+    _set_category(3, 2, "Food")
+
+    _set_transaction(1, 1, 1, Decimal("100.10"), date(2024, 1, 15), "Groceries")
+    _set_transaction(2, 1, 1, Decimal("50.20"), date(2024, 1, 20), "Groceries")
+    _set_transaction(3, 1, 2, Decimal("20"), date(2024, 1, 21), "Bus")
+    _set_transaction(4, 1, 2, Decimal("30"), date(2024, 2, 10), "Train")
+    _set_transaction(5, 2, 3, Decimal("999"), date(2024, 1, 10), "Other user")
+
+    monkeypatch.setattr("services.charts_service.get_jwt_identity", lambda: "u1")
+    service = ChartsService.get_singleton()
+    charts = service.get_aggregated_charts_data()
+
+    assert charts["granularity"] == "month"
+    bar_chart = charts["barChartData"]
+    assert [item["period"] for item in bar_chart] == ["2024-01", "2024-02"]
+    assert bar_chart[0]["total"] == 170.30
+    assert bar_chart[0]["categories"] == [
+        {"category_id": 1, "category": "Food", "total": 150.30, "count": 2},
+        {"category_id": 2, "category": "Transport", "total": 20.0, "count": 1},
+    ]
+    assert bar_chart[1]["total"] == 30.0
+    assert len(charts["categoryData"]) == 2
+
+
+def test_get_aggregated_charts_data_by_week_within_window(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Food")
+
+    # 2024-01-15 is a Monday
+    _set_transaction(1, 1, 1, Decimal("10"), date(2024, 1, 15), "Mon")
+    _set_transaction(2, 1, 1, Decimal("20"), date(2024, 1, 21), "Sun")
+    _set_transaction(3, 1, 1, Decimal("40"), date(2024, 1, 22), "Next Mon")
+    _set_transaction(4, 1, 1, Decimal("80"), date(2024, 2, 5), "Outside window")
+
+    monkeypatch.setattr("services.charts_service.get_jwt_identity", lambda: "u1")
+    service = ChartsService.get_singleton()
+    charts = service.get_aggregated_charts_data("week", from_date=date(2024, 1, 1), to_date=date(2024, 1, 31))
+
+    assert [(item["period"], item["total"]) for item in charts["barChartData"]] == [
+        ("2024-01-15", 30.0),
+        ("2024-01-22", 40.0),
+    ]
+
+
+def test_get_aggregated_charts_data_by_month_counts_only_days_in_window(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Food")
+
+    _set_transaction(1, 1, 1, Decimal("10"), date(2024, 1, 1), "In")
+    _set_transaction(2, 1, 1, Decimal("20"), date(2024, 1, 20), "After window end")
+    _set_transaction(3, 1, 1, Decimal("40"), date(2024, 2, 29), "Next month")
+
+    monkeypatch.setattr("services.charts_service.get_jwt_identity", lambda: "u1")
+    service = ChartsService.get_singleton()
+
+    partial = service.get_aggregated_charts_data("month", from_date=date(2024, 1, 1), to_date=date(2024, 1, 15))
+    assert [(item["period"], item["total"]) for item in partial["barChartData"]] == [("2024-01", 10.0)]
+
+    whole = service.get_aggregated_charts_data("month", from_date=date(2024, 1, 1), to_date=date(2024, 2, 29))
+    assert [(item["period"], item["total"]) for item in whole["barChartData"]] == [("2024-01", 30.0), ("2024-02", 40.0)]
@@ -4,6 +4,8 @@ import os
 
 from testcontainers.postgres import PostgresContainer
 import db.connection
+from db import migrations
+from services.response_cache import ResponseCache
 
 # /backend
 BACKEND_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -27,14 +29,13 @@ def postgres_container():
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_date(postgres_container):
-    root_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    init_sql_path = os.path.join(root_dir, "sql", "init.sql")
-
     with db.connection.get_connection() as conn:
-        conn.execute(open(init_sql_path).read())
+        migrations.apply_all(conn)
 
 
 @pytest.fixture(scope="function", autouse=True)
 def clean_data(postgres_container):
     with db.connection.get_connection() as conn:
         conn.execute("TRUNCATE TABLE users CASCADE; TRUNCATE TABLE categories CASCADE; TRUNCATE TABLE transactions CASCADE;")
+    # Cached responses of the previous test's users would outlive the data
+    ResponseCache.get_singleton().clear()
@@ -0,0 +1,36 @@
+import db.connection
+from config import AppConfig
+
+
+def test_get_connection_reuses_pooled_connections():
+    with db.connection.get_connection() as conn:
+        conn.execute("SELECT 1")
+    opened_before = db.connection.pool_stats().get("connections_num", 0)
+
+    for _ in range(5):
+        with db.connection.get_connection() as conn:
+            conn.execute("SELECT 1")
+
+    assert db.connection.pool_stats().get("connections_num", 0) == opened_before
+
+
+def test_pool_stats_reflect_config():
+    cfg = AppConfig.get_singleton()
+    db.connection.get_pool()
+
+    stats = db.connection.pool_stats()
+
+    assert stats["pool_min"] == cfg.db_pool_min_size
+    assert stats["pool_max"] == cfg.db_pool_max_size
+
+
+def test_get_connection_rolls_back_on_error():
+    try:
+        with db.connection.get_connection() as conn:
+            conn.execute("INSERT INTO users (user_id, username, password_hash) VALUES (1, 'u1', 'pw')")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    with db.connection.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) AS n FROM users").fetchone()["n"] == 0
@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, decode_token, verify_jwt_in_request
+
+import db.connection
+import repository.users_repository as users_repository
+from services import current_user
+from services.users_service import UsersService
+
+
+def _set_user(login: str, user_id: int, budget: float = 0):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO users (user_id, username, password_hash, budget) VALUES (%s, %s, 'pw', %s)",
+            (user_id, login, budget),
+        )
+
+
+def _make_app() -> Flask:
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret-key-with-at-least-32-bytes"
+    app.config["JWT_TOKEN_LOCATION"] = ["headers"]
+    JWTManager(app)
+    return app
+
+
+def _resolve_with_token(app: Flask, identity: str, claims: dict, fresh: bool = False):
+    with app.app_context():
+        token = create_access_token(identity=identity, additional_claims=claims)
+    with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+        verify_jwt_in_request()
+        return current_user.resolve(identity, fresh=fresh)
+
+
+def test_resolve_reads_user_id_from_claims():
+    # No users row exists, so a database lookup would return None
+    user = _resolve_with_token(_make_app(), "u1", {"user_id": 42})
+
+    assert user == current_user.CurrentUser(42, "u1")
+
+
+def test_resolve_falls_back_for_tokens_without_claims():
+    _set_user("u1", 1)
+
+    user = _resolve_with_token(_make_app(), "u1", {})
+
+    assert user.user_id == 1
+
+
+def test_resolve_fresh_reads_database():
+    _set_user("u1", 1, 100)
+
+    user = _resolve_with_token(_make_app(), "u1", {"user_id": 1}, fresh=True)
+
+    assert user.budget == Decimal("100")
+
+
+def test_resolve_outside_request_looks_up_user():
+    _set_user("u1", 1)
+
+    assert current_user.resolve("u1").user_id == 1
+    assert current_user.resolve("missing") is None
+    assert current_user.resolve(None) is None
+
+
+def test_issued_tokens_embed_user_id_claim():
+    users_repository.create_user("u1", "secret")
+    app = _make_app()
+    service = UsersService.get_singleton()
+
+    user = service.authenticate("u1", "secret")
+    with app.app_context():
+        tokens = service.issue_tokens(user)
+        assert decode_token(tokens["auth_token"])["user_id"] == user.user_id
+        assert decode_token(tokens["refresh_token"])["user_id"] == user.user_id
@@ -0,0 +1,53 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import db.connection
+from services.dashboard_service import DashboardService
+
+
+@pytest.fixture
+def user_u1(monkeypatch):
+    with db.connection.get_connection() as conn:
+        conn.execute("INSERT INTO users (user_id, username, password_hash, budget) VALUES (1, 'u1', 'pw', 100)")
+        conn.execute("INSERT INTO categories (category_id, user_id, name) VALUES (1, 1, 'Food')")
+        conn.execute(
+            "INSERT INTO transactions (user_id, category_id, amount, transaction_date, notes) VALUES "
+            "(1, 1, 10, %s, 'lunch'), (1, 1, 30, %s, 'dinner')",
+            (date.today().replace(day=1), date.today()),
+        )
+    for module in ("summary_service", "charts_service", "categories_service", "expenses_service", "dashboard_service"):
+        monkeypatch.setattr(f"services.{module}.get_jwt_identity", lambda: "u1")
+
+
+def test_get_dashboard_returns_all_sections(user_u1):
+    dashboard = DashboardService.get_singleton().get_dashboard()
+
+    assert set(dashboard) == {"summary", "charts", "categories", "expenses"}
+    assert dashboard["summary"]["monthlyExpenses"] == 40.0
+    assert [c["name"] for c in dashboard["categories"]] == ["Food"]
+    assert sorted(t.notes for t in dashboard["expenses"]) == ["dinner", "lunch"]
+    assert sum(len(month["expenses"]) for month in dashboard["charts"]["barChartData"]) == 2
+
+
+def test_get_dashboard_selected_sections_with_filters(user_u1):
+    dashboard = DashboardService.get_singleton().get_dashboard(
+        ["expenses", "charts"], chart_mode="aggregated", limit=1, min_amount=Decimal("20"))
+
+    assert set(dashboard) == {"expenses", "charts"}
+    assert [t.notes for t in dashboard["expenses"]["expenses"]] == ["dinner"]
+    assert dashboard["expenses"]["nextCursor"] is None
+    assert dashboard["charts"]["granularity"] == "month"
+
+
+@pytest.mark.parametrize("fields, options", [
+    (DashboardService.FIELDS, {}),
+    (["charts", "expenses"], {"chart_mode": "aggregated", "granularity": "week", "limit": 1, "sort": "date_asc"}),
+    (["charts", "categories"], {"chart_mode": "aggregated", "from_date": date(2000, 1, 1)}),
+    (["expenses"], {"search": "dinner", "sort": "date_desc"}),
+])
+def test_get_dashboard_concurrently_matches_sequential(user_u1, fields, options):
+    service = DashboardService.get_singleton()
+
+    assert service.get_dashboard_concurrently(fields, **options) == service.get_dashboard(fields, **options)
@@ -1,6 +1,9 @@
+import json
 from datetime import date
 from decimal import Decimal
 
+import pytest
+
 import db.connection
 import repository.transactions_repository as transactions_repository
 from services.expenses_service import ExpensesService
@@ -135,3 +138,286 @@ def test_get_expenses_list_filters_by_search(monkeypatch):
     results = service.get_expenses_list(search="coff")
     assert len(results) == 1
     assert results[0].notes == "coffee beans"
+
+
+def test_get_expenses_page_walks_all_rows_with_cursor(monkeypatch):
+    _set_user("u6", 6)
+    _set_category(7, 6)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u6")
+    service = ExpensesService.get_singleton()
+
+    # Two expenses share a date so the id breaks the tie
+    ids = [
+        service.add_expense(7, 10, transaction_date=date(2026, 4, 1)),
+        service.add_expense(7, 20, transaction_date=date(2026, 4, 2)),
+        service.add_expense(7, 30, transaction_date=date(2026, 4, 2)),
+        service.add_expense(7, 40, transaction_date=date(2026, 4, 3)),
+        service.add_expense(7, 50, transaction_date=date(2026, 4, 4)),
+    ]
+
+    seen = []
+    cursor = None
+    while True:
+        page = service.get_expenses_page(2, cursor=cursor)
+        assert len(page["expenses"]) <= 2
+        seen.extend(t.transaction_id for t in page["expenses"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+
+    assert seen == list(reversed(ids))
+
+
+def test_get_expenses_page_ascending_with_filters(monkeypatch):
+    _set_user("u7", 7)
+    _set_category(8, 7)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u7")
+    service = ExpensesService.get_singleton()
+
+    service.add_expense(8, 10, transaction_date=date(2026, 5, 1))
+    service.add_expense(8, 20, transaction_date=date(2026, 5, 2))
+    service.add_expense(8, 30, transaction_date=date(2026, 5, 3))
+
+    first = service.get_expenses_page(1, sort="date_asc", min_amount=Decimal("15"))
+    assert [float(t.amount) for t in first["expenses"]] == [20.0]
+
+    second = service.get_expenses_page(1, cursor=first["nextCursor"], sort="date_asc", min_amount=Decimal("15"))
+    assert [float(t.amount) for t in second["expenses"]] == [30.0]
+    assert second["nextCursor"] is None
+
+
+def test_get_expenses_page_rejects_bad_cursor(monkeypatch):
+    _set_user("u8", 8)
+    _set_category(9, 8)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u8")
+    service = ExpensesService.get_singleton()
+    service.add_expense(9, 10, transaction_date=date(2026, 6, 1))
+    service.add_expense(9, 20, transaction_date=date(2026, 6, 2))
+
+    cursor = service.get_expenses_page(1)["nextCursor"]
+
+    with pytest.raises(ValueError):
+        service.get_expenses_page(1, cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        service.get_expenses_page(1, cursor=cursor, sort="date_asc")
+
+
+def test_export_expenses_csv_streams_in_batches(monkeypatch):
+    _set_user("u9", 9)
+    _set_category(10, 9, "food")
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u9")
+    service = ExpensesService.get_singleton()
+    monkeypatch.setattr(service.config, "export_batch_size", 2)
+
+    for day in range(1, 6):
+        service.add_expense(10, Decimal(f"{day}.50"), f"item, {day}", transaction_date=date(2026, 7, day))
+
+    chunks = list(service.export_expenses("csv", from_date=date(2026, 7, 2)))
+
+    # Header plus 4 rows read in batches of 2
+    assert len(chunks) == 2
+    lines = "".join(chunks).splitlines()
+    assert lines[0] == "expense_id,date,category_id,category,amount,description"
+    assert len(lines) == 5
+    assert lines[1].split(",", 1)[1] == '2026-07-02,10,food,2.50,"item, 2"'
+
+
+def test_export_expenses_ndjson(monkeypatch):
+    _set_user("u10", 10)
+    _set_category(11, 10, "travel")
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u10")
+    service = ExpensesService.get_singleton()
+    expense_id = service.add_expense(11, Decimal("12.30"), "train", transaction_date=date(2026, 8, 1))
+
+    lines = "".join(service.export_expenses("ndjson")).splitlines()
+
+    assert [json.loads(line) for line in lines] == [{
+        "expense_id": expense_id,
+        "date": "2026-08-01",
+        "category_id": 11,
+        "category": "travel",
+        "amount": "12.30",
+        "description": "train",
+    }]
+
+
+def test_export_expenses_without_rows_returns_header(monkeypatch):
+    _set_user("u11", 11)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u11")
+    service = ExpensesService.get_singleton()
+
+    assert "".join(service.export_expenses("csv")) == "expense_id,date,category_id,category,amount,description\r\n"
+
+
+def test_apply_batch_mixes_operations_and_reports_per_item(monkeypatch):
+    _set_user("u12", 12)
+    _set_user("u13", 13)
+    _set_category(12, 12)
+    _set_category(13, 13)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u13")
+    service = ExpensesService.get_singleton()
+    foreign_id = service.add_expense(13, 99, "not yours")
+
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u12")
+    to_update = service.add_expense(12, 10, "old")
+    to_delete = service.add_expense(12, 20, "bye")
+
+    results = service.apply_batch([
+        {"op": "create", "category_id": 12, "amount": "5.25", "description": "new", "date": "2026-09-01"},
+        {"op": "update", "expense_id": to_update, "category_id": 12, "amount": 15},
+        {"op": "delete", "expense_id": to_delete},
+        {"op": "delete", "expense_id": foreign_id},
+        {"op": "rename"},
+    ])
+
+    assert [r["status"] for r in results] == ["ok", "ok", "ok", "not_found", "invalid"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+
+    created = transactions_repository.get_transaction(results[0]["expense_id"])
+    assert (created.amount, created.notes, created.transaction_date) == (Decimal("5.25"), "new", date(2026, 9, 1))
+    updated = transactions_repository.get_transaction(to_update)
+    assert (updated.amount, updated.notes) == (Decimal("15"), "old")
+    assert transactions_repository.get_transaction(to_delete) is None
+    assert transactions_repository.get_transaction(foreign_id) is not None
+
+
+def test_apply_batch_does_not_update_other_users_expense(monkeypatch):
+    _set_user("u14", 14)
+    _set_user("u15", 15)
+    _set_category(14, 14)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u14")
+    service = ExpensesService.get_singleton()
+    expense_id = service.add_expense(14, 30, "original")
+
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u15")
+    results = service.apply_batch([{"op": "update", "expense_id": expense_id, "category_id": 14, "amount": 1}])
+
+    assert results[0]["status"] == "not_found"
+    assert float(transactions_repository.get_transaction(expense_id).amount) == 30.0
+
+
+def test_apply_batch_reports_bad_categories_amounts_and_conflicts_per_item(monkeypatch):
+    _set_user("u30", 30)
+    _set_user("u31", 31)
+    _set_category(30, 30)
+    _set_category(31, 31)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u30")
+    service = ExpensesService.get_singleton()
+    expense_id = service.add_expense(30, 10, "kept")
+
+    results = service.apply_batch([
+        {"op": "create", "category_id": 31, "amount": 1},
+        {"op": "create", "category_id": 999, "amount": 1},
+        {"op": "create", "category_id": 30, "amount": "100000000"},
+        {"op": "update", "expense_id": expense_id, "category_id": 31, "amount": 2},
+        {"op": "delete", "expense_id": expense_id},
+        {"op": "create", "category_id": 30, "amount": "99999999.99"},
+    ])
+
+    assert [r["status"] for r in results] == ["invalid", "invalid", "invalid", "invalid", "invalid", "ok"]
+    assert results[4]["error"] == f"Expense {expense_id} is already changed by operation 3"
+    kept = transactions_repository.get_transaction(expense_id)
+    assert (kept.category_id, kept.amount) == (30, Decimal("10.00"))
+
+
+def test_update_and_delete_expense_report_not_found(monkeypatch):
+    _set_user("u16", 16)
+    _set_user("u17", 17)
+    _set_category(16, 16)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u16")
+    service = ExpensesService.get_singleton()
+    expense_id = service.add_expense(16, 40, "kept notes", transaction_date=date(2026, 10, 1))
+
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u17")
+    assert service.update_expense(expense_id, 16, 1) is False
+    assert service.delete_expense(expense_id) is False
+
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u16")
+    assert service.update_expense(expense_id, 16, 45) is True
+    txn = transactions_repository.get_transaction(expense_id)
+    assert (float(txn.amount), txn.notes, txn.transaction_date) == (45.0, "kept notes", date(2026, 10, 1))
+
+    assert service.delete_expense(expense_id) is True
+    assert service.delete_expense(expense_id) is False
+
+
+def test_get_expenses_list_fulltext_search_matches_word_prefixes_by_rank(monkeypatch):
+    _set_user("u18", 18)
+    _set_category(18, 18)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u18")
+    service = ExpensesService.get_singleton()
+
+    service.add_expense(18, 1, "Coffee with Anna, coffee beans", transaction_date=date(2026, 1, 1))
+    service.add_expense(18, 2, "beans and rice", transaction_date=date(2026, 1, 2))
+    service.add_expense(18, 3, "coffee", transaction_date=date(2026, 1, 3))
+    service.add_expense(18, 4, "tea", transaction_date=date(2026, 1, 4))
+
+    assert [t.notes for t in service.get_expenses_list(search="COFF bea")] == ["Coffee with Anna, coffee beans"]
+
+    ranked = [t.notes for t in service.get_expenses_list(search="coffee")]
+    assert ranked == ["Coffee with Anna, coffee beans", "coffee"]
+
+
+def test_get_expenses_list_literal_search_treats_input_as_text(monkeypatch):
+    _set_user("u19", 19)
+    _set_category(19, 19)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u19")
+    service = ExpensesService.get_singleton()
+
+    service.add_expense(19, 1, "50% off (sale)", transaction_date=date(2026, 2, 1))
+    service.add_expense(19, 2, "500 pln", transaction_date=date(2026, 2, 2))
+    service.add_expense(19, 3, "a_b", transaction_date=date(2026, 2, 3))
+
+    def notes(**kwargs):
+        return sorted(t.notes for t in service.get_expenses_list(**kwargs))
+
+    assert notes(search="0% off (", search_mode="literal") == ["50% off (sale)"]
+    assert notes(search="a_b", search_mode="literal") == ["a_b"]
+    assert notes(search="ale)", search_mode="literal") == ["50% off (sale)"]
+    # Input with no words falls back to a literal match instead of failing
+    assert notes(search="%") == ["50% off (sale)"]
+    assert notes(search="(.*)+$") == []
+
+
+def test_get_expenses_list_fuzzy_search_tolerates_typos(monkeypatch):
+    _set_user("u20", 20)
+    _set_category(20, 20)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u20")
+    service = ExpensesService.get_singleton()
+
+    service.add_expense(20, 1, "weekly groceries", transaction_date=date(2026, 3, 1))
+    service.add_expense(20, 2, "Groceries", transaction_date=date(2026, 3, 2))
+    service.add_expense(20, 3, "Restaurant dinner", transaction_date=date(2026, 3, 3))
+    service.add_expense(20, 4, "taxi", transaction_date=date(2026, 3, 4))
+
+    assert service.get_expenses_list(search="grocieries") == []
+    assert sorted(t.notes for t in service.get_expenses_list(search="grocieries", search_mode="fuzzy")) == [
+        "Groceries", "weekly groceries"]
+    assert [t.notes for t in service.get_expenses_list(search="resturant", search_mode="fuzzy")] == ["Restaurant dinner"]
+
+    page = service.get_expenses_page(10, search="grocries", search_mode="fuzzy")
+    assert [t.notes for t in page["expenses"]] == ["Groceries", "weekly groceries"]
+
+
+def test_suggest_descriptions_ranks_prefix_matches_and_frequency(monkeypatch):
+    _set_user("u21", 21)
+    _set_user("u22", 22)
+    _set_category(21, 21)
+    _set_category(22, 22)
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u21")
+    service = ExpensesService.get_singleton()
+
+    for notes in ["Coffee", "Coffee", "Coffee beans", "Iced coffee", "Iced coffee", "Iced coffee", "Tea"]:
+        service.add_expense(21, 1, notes, transaction_date=date(2026, 4, 1))
+    transactions_repository.create_transactions([
+        transactions_repository.Transaction(None, 22, 22, 1, date(2026, 4, 1), "Coffee shop"),
+    ])
+
+    assert service.suggest_descriptions("cof") == [
+        {"description": "Coffee", "count": 2},
+        {"description": "Coffee beans", "count": 1},
+        {"description": "Iced coffee", "count": 3},
+    ]
+    # A typo matches no prefix, equally similar notes are ranked by use
+    assert service.suggest_descriptions("cofe", limit=1) == [{"description": "Iced coffee", "count": 3}]
+    assert service.suggest_descriptions("  ") == []
@@ -0,0 +1,109 @@
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+
+import db.connection
+import repository.data_versions_repository as data_versions_repository
+from http_cache import conditional_get
+
+
+def _set_user(login: str, user_id: int):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO users (user_id, username, password_hash) VALUES (%s, %s, 'pw')",
+            (user_id, login),
+        )
+
+
+def _set_category(category_id: int, user_id: int, name: str = "cat"):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO categories (category_id, user_id, name) VALUES (%s, %s, %s)",
+            (category_id, user_id, name),
+        )
+
+
+def _make_app(calls: list):
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret-key-with-at-least-32-bytes"
+    app.config["JWT_TOKEN_LOCATION"] = ["headers"]
+    JWTManager(app)
+
+    @app.get("/resource")
+    @jwt_required()
+    @conditional_get()
+    def resource():
+        calls.append(1)
+        return jsonify({"ok": True}), 200
+
+    return app
+
+
+def _auth(app: Flask, login: str, user_id: int) -> dict:
+    with app.app_context():
+        token = create_access_token(identity=login, additional_claims={"user_id": user_id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_matching_etag_returns_304_without_running_view():
+    _set_user("u1", 1)
+    calls = []
+    app = _make_app(calls)
+    client = app.test_client()
+    headers = _auth(app, "u1", 1)
+
+    first = client.get("/resource", headers=headers)
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] in ("private, no-cache", "no-cache, private")
+    etag = first.headers["ETag"]
+
+    second = client.get("/resource", headers={**headers, "If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert len(calls) == 1
+
+    # Another query string is another representation
+    other = client.get("/resource?page=2", headers={**headers, "If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+
+
+def test_writes_to_user_data_change_the_etag():
+    _set_user("u1", 1)
+    _set_user("u2", 2)
+    app = _make_app([])
+    client = app.test_client()
+    headers = _auth(app, "u1", 1)
+    etag = client.get("/resource", headers=headers).headers["ETag"]
+
+    # Another user's write leaves u1's version alone
+    _set_category(2, 2)
+    assert client.get("/resource", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    _set_category(1, 1)
+    changed = client.get("/resource", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["Last-Modified"]
+
+    etag = changed.headers["ETag"]
+    with db.connection.get_connection() as conn:
+        conn.execute("UPDATE users SET budget = 10 WHERE user_id = 1")
+    assert client.get("/resource", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+
+def test_data_version_counts_statements_touching_the_user():
+    _set_user("u1", 1)
+    assert data_versions_repository.get_data_version(1) == (0, None)
+
+    _set_category(1, 1)
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO transactions (user_id, category_id, amount, notes) "
+            "SELECT 1, 1, g, 'n' FROM generate_series(1, 5) g"
+        )
+        conn.execute("UPDATE transactions SET notes = 'x' WHERE user_id = 1")
+        # Budget unchanged: no bump
+        conn.execute("UPDATE users SET budget = budget WHERE user_id = 1")
+
+    version, updated_at = data_versions_repository.get_data_version(1)
+    assert version == 3
+    assert updated_at is not None
@@ -0,0 +1,180 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import db.connection
+import repository.transactions_repository as transactions_repository
+from services.import_service import ImportMapping, ImportService
+
+
+def _set_user(login: str, user_id: int):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO users (user_id, username, password_hash) VALUES (%s, %s, 'pw')",
+            (user_id, login),
+        )
+
+
+def _set_category(category_id: int, user_id: int, name: str = "cat", color: str = "#000000"):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO categories (category_id, user_id, name, color) VALUES (%s, %s, %s, %s)",
+            (category_id, user_id, name, color),
+        )
+
+
+def _csv(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode("utf-8"))
+
+
+def test_import_csv_loads_rows_and_maps_categories(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Food")
+    _set_category(2, 1, "Transport")
+    monkeypatch.setattr("services.import_service.get_jwt_identity", lambda: "u1")
+    service = ImportService.get_singleton()
+
+    result = service.import_csv(_csv(
+        "date,amount,description,category\n"
+        "2026-01-05,12.50,Groceries,food\n"
+        "2026-01-06,\"1,200.00\",Flight,Transport\n"
+    ), ImportMapping())
+
+    assert result == {"imported": 2, "duplicates": 0, "invalid": 0, "errors": []}
+    expenses = sorted(transactions_repository.find_by_user(1), key=lambda t: t.transaction_date)
+    assert [(t.transaction_date, t.amount, t.category_id, t.notes) for t in expenses] == [
+        (date(2026, 1, 5), Decimal("12.50"), 1, "Groceries"),
+        (date(2026, 1, 6), Decimal("1200.00"), 2, "Flight"),
+    ]
+
+
+def test_import_csv_skips_duplicates(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Food")
+    monkeypatch.setattr("services.import_service.get_jwt_identity", lambda: "u1")
+    service = ImportService.get_singleton()
+    statement = (
+        "date,amount,description,category\n"
+        "2026-01-05,12.50,Groceries,Food\n"
+        "2026-01-05,12.50,Groceries,Food\n"
+        "2026-01-06,3.00,Coffee,Food\n"
+    )
+
+    first = service.import_csv(_csv(statement), ImportMapping())
+    second = service.import_csv(_csv(statement), ImportMapping())
+
+    assert (first["imported"], first["duplicates"]) == (2, 1)
+    assert (second["imported"], second["duplicates"]) == (0, 3)
+    assert len(transactions_repository.find_by_user(1)) == 2
+
+
+def test_import_csv_with_custom_mapping(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Other")
+    monkeypatch.setattr("services.import_service.get_jwt_identity", lambda: "u1")
+    service = ImportService.get_singleton()
+
+    mapping = ImportMapping(
+        date_column="Booking date",
+        amount_column="Value",
+        notes_column="Title",
+        category_column=None,
+        date_format="%d.%m.%Y",
+        decimal_separator=",",
+        delimiter=";",
+        default_category_id=1,
+        negate_amounts=True,
+    )
+    result = service.import_csv(_csv(
+        "Booking date;Value;Title\n"
+        "05.01.2026;-1 234,56;Rent\n"
+        "06.01.2026;2500,00;Salary\n"
+    ), mapping)
+
+    assert result["imported"] == 1
+    assert result["invalid"] == 1
+    assert result["errors"][0]["line"] == 3
+    [expense] = transactions_repository.find_by_user(1)
+    assert (expense.amount, expense.notes, expense.category_id) == (Decimal("1234.56"), "Rent", 1)
+
+
+def test_import_csv_reports_invalid_rows(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Food")
+    monkeypatch.setattr("services.import_service.get_jwt_identity", lambda: "u1")
+    service = ImportService.get_singleton()
+
+    result = service.import_csv(_csv(
+        "date,amount,description,category\n"
+        "2026-13-01,1.00,Bad date,Food\n"
+        "2026-01-02,abc,Bad amount,Food\n"
+        "2026-01-03,NaN,Bad amount,Food\n"
+        "2026-01-04,1.00,Unknown,Travel\n"
+        "2026-01-05,1.00,Ok,Food\n"
+    ), ImportMapping())
+
+    assert result["imported"] == 1
+    assert result["invalid"] == 4
+    assert [e["line"] for e in result["errors"]] == [2, 3, 4, 5]
+
+
+def test_import_csv_rejects_missing_columns(monkeypatch):
+    _set_user("u1", 1)
+    monkeypatch.setattr("services.import_service.get_jwt_identity", lambda: "u1")
+    service = ImportService.get_singleton()
+
+    with pytest.raises(ValueError):
+        service.import_csv(_csv("when,amount\n2026-01-01,1\n"), ImportMapping())
+
+
+def test_import_csv_without_category_column_uses_default_category(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Other")
+    monkeypatch.setattr("services.import_service.get_jwt_identity", lambda: "u1")
+    service = ImportService.get_singleton()
+
+    result = service.import_csv(
+        _csv("date,amount,description\n2026-01-05,12.50,Groceries\n"), ImportMapping(default_category_id=1))
+
+    assert result["imported"] == 1
+    assert transactions_repository.find_by_user(1)[0].category_id == 1
+
+
+def test_import_csv_reports_malformed_rows(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Food")
+    monkeypatch.setattr("services.import_service.get_jwt_identity", lambda: "u1")
+    service = ImportService.get_singleton()
+    limit = csv.field_size_limit(100)
+    try:
+        result = service.import_csv(_csv(
+            "date,amount,description,category\n"
+            f"2026-01-04,1.00,{'x' * 200},Food\n"
+            "2026-01-05,1.00,Ok,Food\n"
+        ), ImportMapping())
+    finally:
+        csv.field_size_limit(limit)
+
+    assert result["imported"] == 1
+    assert [e["line"] for e in result["errors"]] == [2]
+    assert result["errors"][0]["error"].startswith("Malformed row")
+
+
+def test_import_csv_reports_huge_amounts_as_invalid(monkeypatch):
+    _set_user("u1", 1)
+    _set_category(1, 1, "Food")
+    monkeypatch.setattr("services.import_service.get_jwt_identity", lambda: "u1")
+    service = ImportService.get_singleton()
+
+    result = service.import_csv(_csv(
+        "date,amount,description,category\n"
+        "2026-01-04,1e30,Huge,Food\n"
+        f"2026-01-05,{'9' * 30},Huge,Food\n"
+        "2026-01-06,1.00,Ok,Food\n"
+    ), ImportMapping())
+
+    assert (result["imported"], result["invalid"]) == (1, 2)
+    assert [e["line"] for e in result["errors"]] == [2, 3]
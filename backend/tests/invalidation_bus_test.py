@@ -0,0 +1,108 @@
+import os
+import time
+
+import db.connection
+from db.invalidation_bus import InvalidationBus
+from services.response_cache import ResponseCache
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _set_user_with_category(user_id: int):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO users (user_id, username, password_hash) VALUES (%s, %s, 'pw')",
+            (user_id, f"u{user_id}"),
+        )
+        conn.execute(
+            "INSERT INTO categories (category_id, user_id, name) VALUES (%s, %s, 'cat')",
+            (user_id, user_id),
+        )
+
+
+def _started_bus() -> tuple[InvalidationBus, list, list]:
+    bus = InvalidationBus()
+    events, resets = [], []
+    bus.subscribe(lambda user_id, entity: events.append((user_id, entity)), lambda: resets.append(1))
+    bus.ensure_started()
+    assert _wait_for(lambda: bus.connected)
+    return bus, events, resets
+
+
+def test_committed_writes_are_published_to_listeners():
+    _set_user_with_category(1)
+    bus, events, resets = _started_bus()
+    try:
+        assert resets == [1]
+
+        with db.connection.get_connection() as conn:
+            conn.execute("INSERT INTO transactions (user_id, category_id, amount) VALUES (1, 1, 5)")
+            conn.rollback()
+            conn.execute("UPDATE users SET budget = 20 WHERE user_id = 1")
+
+        assert _wait_for(lambda: events)
+        assert events == [(1, "users")]
+    finally:
+        bus.stop()
+
+
+def test_listener_restarts_in_a_forked_process():
+    bus, _, resets = _started_bus()
+    try:
+        # Pretend this process was forked from the one that started the thread
+        bus._pid = os.getpid() + 1
+        assert not bus.connected
+
+        bus.ensure_started()
+
+        assert _wait_for(lambda: bus.connected)
+        assert len(resets) == 2
+    finally:
+        bus.stop()
+
+
+def test_cache_checks_data_version_without_the_bus():
+    _set_user_with_category(1)
+    cache = ResponseCache()
+    cache.enabled = True
+    bus = InvalidationBus()
+    cache.use_invalidation_bus(bus)
+
+    # Never started: writes by other workers could go unnoticed
+    assert cache.get_or_compute(1, "summary", (), lambda: "v0") == "v0"
+    assert cache.get_or_compute(1, "summary", (), lambda: "v0'") == "v0"
+
+    with db.connection.get_connection() as conn:
+        conn.execute("UPDATE users SET budget = 1 WHERE user_id = 1")
+
+    assert cache.get_or_compute(1, "summary", (), lambda: "v1") == "v1"
+
+
+def test_cache_applies_published_changes():
+    _set_user_with_category(1)
+    cache = ResponseCache()
+    cache.enabled = True
+    bus = InvalidationBus()
+    cache.use_invalidation_bus(bus)
+    bus.ensure_started()
+    try:
+        assert _wait_for(lambda: bus.connected)
+        cache.get_or_compute(1, "summary", (), lambda: "summary")
+        cache.get_or_compute(1, "charts", (), lambda: "charts")
+
+        with db.connection.get_connection() as conn:
+            conn.execute("UPDATE users SET budget = 1 WHERE user_id = 1")
+
+        # Only the summary is dropped; the charts entry is kept, but the
+        # user's data version has moved on
+        assert _wait_for(lambda: cache.stats()["entries"] == 1)
+        assert cache.get_or_compute(1, "charts", (), lambda: "recomputed") == "recomputed"
+    finally:
+        bus.stop()
@@ -0,0 +1,56 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from entities.transaction import Transaction
+from json_provider import OrjsonProvider
+
+_PAYLOAD = {
+    "expenses": [Transaction(1, 2, 3, Decimal("12.30"), date(2024, 1, 15), "Coffee")],
+    "total": Decimal("12.30"),
+    "at": datetime(2024, 1, 15, 8, 30),
+    "nested": {"b": [1, 2.5, None, True], "a": "x"},
+}
+
+
+def test_default_wire_format_matches_flask_provider():
+    app = Flask(__name__)
+    with app.app_context():
+        expected = DefaultJSONProvider(app).response(_PAYLOAD).get_data()
+        actual = OrjsonProvider(app).response(_PAYLOAD).get_data()
+
+    assert actual == expected
+    assert json.loads(actual)["expenses"][0] == {
+        "amount": "12.30",
+        "category_id": 3,
+        "notes": "Coffee",
+        "transaction_date": "Mon, 15 Jan 2024 00:00:00 GMT",
+        "transaction_id": 1,
+        "user_id": 2,
+    }
+
+
+def test_iso_dates_and_numeric_decimals():
+    app = Flask(__name__)
+    provider = OrjsonProvider(app, decimal_format="number", date_format="iso")
+
+    data = json.loads(provider.dumps(_PAYLOAD))
+
+    assert data["expenses"][0]["amount"] == 12.3
+    assert data["expenses"][0]["transaction_date"] == "2024-01-15"
+    assert data["at"] == "2024-01-15T08:30:00"
+
+
+def test_loads_and_unsupported_settings():
+    app = Flask(__name__)
+    provider = OrjsonProvider(app)
+
+    assert provider.loads(b'{"amount": 1.5, "name": "\\u017c"}') == {"amount": 1.5, "name": "ż"}
+    with pytest.raises(ValueError):
+        OrjsonProvider(app, decimal_format="float")
+    with pytest.raises(TypeError):
+        provider.dumps({"x": object()})
@@ -0,0 +1,102 @@
+import pytest
+from flask import Flask, jsonify
+from prometheus_client import REGISTRY
+
+import db.async_connection
+import db.connection
+import metrics
+from config import AppConfig
+from db import instrumentation
+from repository import categories_repository
+from repository.aio import categories_repository as aio_categories_repository
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture
+def client(monkeypatch):
+    cfg = AppConfig.get_singleton()
+    monkeypatch.setattr(cfg, "metrics_enabled", True)
+    monkeypatch.setattr(cfg, "metrics_token", "s3cret")
+    app = Flask(__name__)
+    metrics.init_app(app, cfg)
+
+    @app.get("/items/<int:item_id>")
+    def item(item_id):
+        return jsonify({"item_id": item_id}), 200
+
+    return app.test_client()
+
+
+def test_requests_are_counted_by_route_and_status(client):
+    route = "/items/<int:item_id>"
+    count_before = _sample("http_requests_total", method="GET", route=route, status="200")
+    observed_before = _sample("http_request_duration_seconds_count", method="GET", route=route)
+    unmatched_before = _sample("http_requests_total", method="GET", route=metrics.UNMATCHED_ROUTE, status="404")
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nothing-here")
+
+    assert _sample("http_requests_total", method="GET", route=route, status="200") == count_before + 2
+    assert _sample("http_request_duration_seconds_count", method="GET", route=route) == observed_before + 2
+    assert _sample("http_requests_total", method="GET", route=metrics.UNMATCHED_ROUTE, status="404") \
+        == unmatched_before + 1
+
+
+def test_queries_are_attributed_to_repository_functions(client):
+    sync_before = _sample("db_query_duration_seconds_count", function="categories_repository.find_by_user")
+    async_before = _sample("db_query_duration_seconds_count", function="aio.categories_repository.find_by_user")
+    other_before = _sample("db_query_duration_seconds_count", function=instrumentation.OTHER)
+
+    categories_repository.find_by_user(1)
+    db.async_connection.run(aio_categories_repository.find_by_user(1))
+    with db.connection.get_connection() as conn:
+        conn.execute("SELECT 1")
+
+    assert _sample("db_query_duration_seconds_count", function="categories_repository.find_by_user") \
+        == sync_before + 1
+    assert _sample("db_query_duration_seconds_count", function="aio.categories_repository.find_by_user") \
+        == async_before + 1
+    assert _sample("db_query_duration_seconds_count", function=instrumentation.OTHER) == other_before + 1
+
+
+def test_failed_queries_are_counted(client):
+    errors_before = _sample("db_query_errors_total", function=instrumentation.OTHER)
+
+    with pytest.raises(Exception):
+        with db.connection.get_connection() as conn:
+            conn.execute("SELECT * FROM no_such_table")
+
+    assert _sample("db_query_errors_total", function=instrumentation.OTHER) == errors_before + 1
+
+
+def test_metrics_endpoint_serves_text_format_with_pool_stats(client):
+    db.connection.get_pool()
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    body = response.get_data(as_text=True)
+    assert 'db_pool_max_size{pool="sync"}' in body
+    assert "http_request_duration_seconds_bucket" in body
+
+
+def test_metrics_endpoint_requires_configured_token(client):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_metrics_are_off_without_token(monkeypatch):
+    cfg = AppConfig.get_singleton()
+    monkeypatch.setattr(cfg, "metrics_enabled", True)
+    monkeypatch.setattr(cfg, "metrics_token", "")
+    app = Flask(__name__)
+    metrics.init_app(app, cfg)
+
+    assert app.test_client().get("/metrics").status_code == 404
+    assert not app.before_request_funcs
@@ -0,0 +1,69 @@
+from datetime import date
+
+import psycopg
+import pytest
+
+import db.connection
+from db import migrations
+
+
+def test_discover_orders_by_version(tmp_path):
+    (tmp_path / "0010_later.sql").write_text("SELECT 1;")
+    (tmp_path / "0002_second.sql").write_text("SELECT 1;")
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    (tmp_path / "README.md").write_text("not a migration")
+
+    found = migrations.discover(str(tmp_path))
+
+    assert [(m.version, m.name) for m in found] == [("0001", "first"), ("0002", "second"), ("0010", "later")]
+
+
+def test_discover_rejects_duplicate_versions(tmp_path):
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    (tmp_path / "0001_other.sql").write_text("SELECT 1;")
+
+    with pytest.raises(ValueError):
+        migrations.discover(str(tmp_path))
+
+
+def test_apply_all_is_idempotent():
+    with db.connection.get_connection() as conn:
+        assert migrations.apply_all(conn) == []
+        recorded = migrations.applied_versions(conn)
+
+    assert recorded == {m.version for m in migrations.discover()}
+
+
+def test_transactions_have_primary_key():
+    with db.connection.get_connection() as conn:
+        conn.execute("INSERT INTO users (user_id, username, password_hash) VALUES (1, 'u1', 'pw')")
+        conn.execute("INSERT INTO categories (category_id, user_id, name) VALUES (1, 1, 'cat')")
+        conn.execute(
+            "INSERT INTO transactions (transaction_id, user_id, category_id, amount, transaction_date) "
+            "VALUES (1, 1, 1, 10, %s)", (date(2026, 1, 1),))
+
+    with pytest.raises(psycopg.errors.UniqueViolation):
+        with db.connection.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO transactions (transaction_id, user_id, category_id, amount, transaction_date) "
+                "VALUES (1, 1, 1, 20, %s)", (date(2026, 1, 2),))
+
+
+def test_keys_migration_renumbers_duplicate_transaction_ids():
+    migration = next(m for m in migrations.discover() if m.name == "transactions_keys_and_indexes")
+    with db.connection.get_connection() as conn:
+        try:
+            # Shadows the real table for this transaction, as it was before the migration
+            conn.execute("CREATE TEMP TABLE transactions (LIKE public.transactions)")
+            conn.execute(
+                "INSERT INTO pg_temp.transactions (transaction_id, user_id, category_id, amount, transaction_date) "
+                "VALUES (1, 1, 1, 10, '2026-01-01'), (2, 1, 1, 20, '2026-01-02'), (2, 1, 1, 30, '2026-01-03'), "
+                "(2, 1, 1, 40, '2026-01-04'), (3, 1, 1, 50, '2026-01-05')")
+
+            conn.execute(migration.read())
+
+            rows = conn.execute(
+                "SELECT transaction_id, amount FROM pg_temp.transactions ORDER BY transaction_id").fetchall()
+            assert [(r["transaction_id"], int(r["amount"])) for r in rows] == [(1, 10), (2, 20), (3, 50), (4, 30), (5, 40)]
+        finally:
+            conn.rollback()
@@ -0,0 +1,91 @@
+from datetime import date
+from decimal import Decimal
+
+import db.connection
+import repository.monthly_totals_repository as monthly_totals_repository
+import repository.transactions_repository as transactions_repository
+from db import rollups
+from entities.transaction import Transaction
+
+
+def _set_user_with_categories(user_id: int, *category_ids: int):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO users (user_id, username, password_hash) VALUES (%s, %s, 'pw')",
+            (user_id, f"u{user_id}"),
+        )
+        for category_id in category_ids:
+            conn.execute(
+                "INSERT INTO categories (category_id, user_id, name) VALUES (%s, %s, %s)",
+                (category_id, user_id, f"cat{category_id}"),
+            )
+
+
+def _rollup(user_id: int) -> list[tuple]:
+    return [
+        (row["period"], row["category_id"], row["total"], row["expense_count"])
+        for row in monthly_totals_repository.totals_by_month(user_id)
+    ]
+
+
+def test_rollup_follows_inserts_updates_and_deletes():
+    _set_user_with_categories(1, 1, 2)
+    ids = transactions_repository.create_transactions([
+        Transaction(None, 1, 1, Decimal("10.50"), date(2026, 1, 5), "a"),
+        Transaction(None, 1, 1, Decimal("4.50"), date(2026, 1, 31), "b"),
+        Transaction(None, 1, 2, Decimal("7"), date(2026, 2, 1), "c"),
+    ])
+    assert _rollup(1) == [
+        (date(2026, 1, 1), 1, Decimal("15.00"), 2),
+        (date(2026, 2, 1), 2, Decimal("7.00"), 1),
+    ]
+
+    # Move one expense to another month and category
+    transactions_repository.save_transaction(Transaction(ids[1], 1, 2, Decimal("5"), date(2026, 2, 3), None))
+    assert _rollup(1) == [
+        (date(2026, 1, 1), 1, Decimal("10.50"), 1),
+        (date(2026, 2, 1), 2, Decimal("12.00"), 2),
+    ]
+
+    # Emptied groups disappear
+    transactions_repository.delete_transaction(ids[0], 1)
+    assert _rollup(1) == [(date(2026, 2, 1), 2, Decimal("12.00"), 2)]
+    assert monthly_totals_repository.sum_for_month(1, date(2026, 1, 1)) == 0
+    assert monthly_totals_repository.sum_for_month(1, date(2026, 2, 1)) == Decimal("12.00")
+
+
+def test_rollup_follows_bulk_import_and_batch_writes():
+    _set_user_with_categories(1, 1)
+    _set_user_with_categories(2, 2)
+    transactions_repository.import_transactions(1, [
+        (1, Decimal("1"), date(2026, 3, 1), "x"),
+        (1, Decimal("2"), date(2026, 3, 2), "y"),
+    ])
+    other_ids = transactions_repository.create_transactions(
+        [Transaction(None, 2, 2, Decimal("100"), date(2026, 3, 1), "z")])
+    imported_ids = [t.transaction_id for t in transactions_repository.find_by_user(1)]
+    ids = sorted(transactions_repository.find_owned_ids(1, imported_ids + other_ids))
+    assert ids == sorted(imported_ids)
+    transactions_repository.update_transactions(1, [Transaction(ids[0], 1, 1, Decimal("5"), None, None)])
+
+    assert _rollup(1) == [(date(2026, 3, 1), 1, Decimal("7.00"), 2)]
+    assert _rollup(2) == [(date(2026, 3, 1), 2, Decimal("100.00"), 1)]
+
+    transactions_repository.delete_transactions(1, ids)
+    assert _rollup(1) == []
+
+
+def test_rebuild_monthly_totals_repairs_drift():
+    _set_user_with_categories(1, 1)
+    transactions_repository.create_transactions([
+        Transaction(None, 1, 1, Decimal("3"), date(2026, 4, 1), "a"),
+        Transaction(None, 1, 1, Decimal("4"), date(2026, 5, 1), "b"),
+    ])
+    expected = _rollup(1)
+
+    with db.connection.get_connection() as conn:
+        conn.execute("UPDATE monthly_category_totals SET total = 0")
+        conn.execute("INSERT INTO monthly_category_totals VALUES (1, '2020-01-01', 1, 1, 1)")
+        assert rollups.rebuild_monthly_totals(conn, user_id=1) == 2
+
+    assert _rollup(1) == expected
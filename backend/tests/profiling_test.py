@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+import profiling
+from config import AppConfig
+
+
+@pytest.fixture
+def cfg(monkeypatch, tmp_path):
+    cfg = AppConfig.get_singleton()
+    monkeypatch.setattr(cfg, "profiler_token", "s3cret")
+    monkeypatch.setattr(cfg, "profiler_sample_rate", 0.0)
+    monkeypatch.setattr(cfg, "profiler_interval_ms", 1)
+    monkeypatch.setattr(cfg, "profiler_dir", str(tmp_path))
+    monkeypatch.setattr(cfg, "profiler_max_files", 200)
+    return cfg
+
+
+def _busy_view():
+    time.sleep(0.05)
+
+
+def _make_app(cfg: AppConfig) -> Flask:
+    app = Flask(__name__)
+    profiling.init_app(app, cfg)
+
+    @app.get("/charts/<int:chart_id>")
+    def charts(chart_id):
+        _busy_view()
+        return jsonify({}), 200
+
+    return app
+
+
+def test_profiles_request_with_token(cfg, tmp_path):
+    client = _make_app(cfg).test_client()
+
+    response = client.get("/charts/1", headers={profiling.PROFILE_HEADER: "s3cret"})
+
+    profile_id = response.headers[profiling.PROFILE_ID_HEADER]
+    assert "-GET-charts_int_chart_id-" in profile_id
+    metadata = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert metadata["route"] == "/charts/<int:chart_id>"
+    assert metadata["path"] == "/charts/1"
+    assert metadata["status"] == 200
+    assert metadata["durationMs"] >= 50
+    assert metadata["samples"] > 0
+
+    lines = (tmp_path / f"{profile_id}.collapsed").read_text().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == metadata["samples"]
+    assert any("charts (profiling_test.py:" in line and ";_busy_view (profiling_test.py:" in line for line in lines)
+
+
+def test_ignores_requests_without_valid_token(cfg, tmp_path):
+    client = _make_app(cfg).test_client()
+
+    assert profiling.PROFILE_ID_HEADER not in client.get("/charts/1").headers
+    assert profiling.PROFILE_ID_HEADER not in client.get(
+        "/charts/1", headers={profiling.PROFILE_HEADER: "wrong"}).headers
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiles_sampled_requests(cfg, monkeypatch):
+    monkeypatch.setattr(cfg, "profiler_token", "")
+    monkeypatch.setattr(cfg, "profiler_sample_rate", 1.0)
+    client = _make_app(cfg).test_client()
+
+    assert profiling.PROFILE_ID_HEADER in client.get("/charts/1").headers
+
+
+def test_installs_no_hooks_when_disabled(cfg, monkeypatch):
+    monkeypatch.setattr(cfg, "profiler_token", "")
+    app = _make_app(cfg)
+
+    assert not app.before_request_funcs and not app.after_request_funcs
+    assert profiling.PROFILE_ID_HEADER not in app.test_client().get(
+        "/charts/1", headers={profiling.PROFILE_HEADER: ""}).headers
+
+
+def test_keeps_only_newest_profiles(cfg, monkeypatch, tmp_path):
+    monkeypatch.setattr(cfg, "profiler_max_files", 2)
+    client = _make_app(cfg).test_client()
+
+    ids = [
+        client.get("/charts/1", headers={profiling.PROFILE_HEADER: "s3cret"}).headers[profiling.PROFILE_ID_HEADER]
+        for _ in range(3)
+    ]
+
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{i}.{ext}" for i in ids[1:] for ext in ("collapsed", "json"))
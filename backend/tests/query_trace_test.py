@@ -0,0 +1,125 @@
+import logging
+
+import pytest
+from flask import Flask, jsonify
+from psycopg import sql
+
+import db.async_connection
+import db.connection
+import query_trace
+from config import AppConfig
+from db import unit_of_work
+from repository import categories_repository
+from repository.aio import categories_repository as aio_categories_repository
+
+
+@pytest.fixture
+def cfg(monkeypatch):
+    cfg = AppConfig.get_singleton()
+    monkeypatch.setattr(cfg, "query_trace_enabled", True)
+    monkeypatch.setattr(cfg, "query_trace_slow_ms", 10_000)
+    monkeypatch.setattr(cfg, "query_trace_max_queries", 25)
+    monkeypatch.setattr(cfg, "query_trace_max_repeats", 10)
+    monkeypatch.setattr(cfg, "query_trace_server_timing", True)
+    monkeypatch.setattr(cfg, "query_trace_debug", False)
+    return cfg
+
+
+def _make_app(cfg: AppConfig) -> Flask:
+    app = Flask(__name__)
+    query_trace.init_app(app, cfg)
+    unit_of_work.init_app(app, db.connection.get_pool)
+
+    @app.get("/categories/<int:times>")
+    def categories(times):
+        for _ in range(times):
+            categories_repository.find_by_user(1)
+        return jsonify({}), 200
+
+    @app.get("/async-categories")
+    def async_categories():
+        db.async_connection.run(aio_categories_repository.find_by_user(1))
+        return jsonify({}), 200
+
+    return app
+
+
+def test_normalize_replaces_literals_and_placeholders():
+    assert query_trace.normalize("SELECT *\n  FROM t WHERE a = %s AND b = 'x''y' AND c > 42 LIMIT %s") \
+        == "SELECT * FROM t WHERE a = ? AND b = ? AND c > ? LIMIT ?"
+    assert query_trace.normalize("SELECT %s <%% notes") == "SELECT ? <% notes"
+    assert query_trace.normalize(sql.SQL("SET TRANSACTION SNAPSHOT {}").format(sql.Literal("0-1"))) \
+        == "SET TRANSACTION SNAPSHOT ?"
+    assert query_trace.normalize("SELECT int4 FROM t2") == "SELECT int4 FROM t2"
+
+
+def test_server_timing_reports_queries_and_connections(cfg):
+    client = _make_app(cfg).test_client()
+
+    response = client.get("/categories/2")
+
+    timing = response.headers["Server-Timing"]
+    assert 'desc="2 queries"' in timing
+    assert 'db-acquire;dur=' in timing and 'desc="1 connection"' in timing
+    assert ", app;dur=" in timing
+
+
+def test_async_queries_are_traced(cfg):
+    client = _make_app(cfg).test_client()
+
+    response = client.get("/async-categories")
+
+    assert 'desc="1 query"' in response.headers["Server-Timing"]
+
+
+def test_warns_about_slow_many_and_repeated_queries(cfg, monkeypatch, caplog):
+    monkeypatch.setattr(cfg, "query_trace_slow_ms", 0)
+    monkeypatch.setattr(cfg, "query_trace_max_queries", 2)
+    monkeypatch.setattr(cfg, "query_trace_max_repeats", 3)
+    client = _make_app(cfg).test_client()
+
+    with caplog.at_level(logging.WARNING, logger="query_trace"):
+        client.get("/categories/3")
+
+    messages = [r.getMessage() for r in caplog.records]
+    assert sum(m.startswith("Slow query in GET /categories/3") for m in messages) == 3
+    assert "Too many queries in GET /categories/3: 3" in "\n".join(messages)
+    assert any(m.startswith("Repeated query in GET /categories/3: 3 times: SELECT * FROM categories") for m in messages)
+
+
+def test_no_warnings_below_thresholds(cfg, caplog):
+    client = _make_app(cfg).test_client()
+
+    with caplog.at_level(logging.WARNING, logger="query_trace"):
+        client.get("/categories/3")
+
+    assert caplog.records == []
+
+
+def test_debug_dump_lists_recent_traces(cfg, monkeypatch):
+    monkeypatch.setattr(cfg, "query_trace_debug", True)
+    client = _make_app(cfg).test_client()
+    client.get("/categories/1")
+
+    traces = client.get("/debug/query-trace").get_json()["traces"]
+
+    assert traces[0]["path"] == "/categories/1"
+    assert traces[0]["status"] == 200
+    assert traces[0]["connections"] == 1
+    [query] = traces[0]["queries"]
+    assert query["function"] == "categories_repository.find_by_user"
+    assert query["statement"] == "SELECT * FROM categories WHERE user_id = ?"
+    assert query["rows"] == 0
+
+
+def test_debug_dump_is_off_by_default(cfg):
+    client = _make_app(cfg).test_client()
+
+    assert client.get("/debug/query-trace").status_code == 404
+
+
+def test_server_timing_is_off_by_default(cfg, monkeypatch):
+    monkeypatch.setattr(cfg, "query_trace_server_timing", False)
+    client = _make_app(cfg).test_client()
+
+    assert "Server-Timing" not in client.get("/categories/1").headers
@@ -0,0 +1,106 @@
+from datetime import date
+from decimal import Decimal
+
+from flask import Flask, g
+
+import db.connection
+from services.expenses_service import ExpensesService
+from services.response_cache import ResponseCache
+from services.summary_service import SummaryService
+
+
+def _cache(max_entries=10, max_bytes=1024 * 1024, ttl=60.0) -> ResponseCache:
+    cache = ResponseCache()
+    cache.enabled = True
+    cache.max_entries = max_entries
+    cache.max_bytes = max_bytes
+    cache.ttl = ttl
+    return cache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = _cache(max_entries=2)
+    cache.get_or_compute(1, "summary", ("a",), lambda: "a")
+    cache.get_or_compute(1, "summary", ("b",), lambda: "b")
+    # Touch "a" so that "b" is the least recently used
+    assert cache.get_or_compute(1, "summary", ("a",), lambda: "changed") == "a"
+    cache.get_or_compute(1, "summary", ("c",), lambda: "c")
+
+    assert cache.get_or_compute(1, "summary", ("b",), lambda: "b2") == "b2"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 4, 2)
+    assert stats["entries"] == 2
+
+
+def test_memory_cap_and_ttl_bound_the_cache():
+    big = "x" * 600
+    cache = _cache(max_bytes=1000)
+    cache.get_or_compute(1, "charts", ("a",), lambda: big)
+    cache.get_or_compute(1, "charts", ("b",), lambda: big)
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] <= 1000
+
+    expiring = _cache(ttl=0)
+    expiring.get_or_compute(1, "charts", (), lambda: "old")
+    assert expiring.get_or_compute(1, "charts", (), lambda: "new") == "new"
+    assert expiring.stats()["expirations"] == 1
+
+
+def test_invalidate_drops_only_the_users_namespaces():
+    cache = _cache()
+    cache.get_or_compute(1, "summary", (), lambda: "s1")
+    cache.get_or_compute(1, "charts", (), lambda: "c1")
+    cache.get_or_compute(2, "summary", (), lambda: "s2")
+
+    cache.invalidate(1, "summary")
+
+    assert cache.get_or_compute(1, "summary", (), lambda: "s1'") == "s1'"
+    assert cache.get_or_compute(1, "charts", (), lambda: "c1'") == "c1"
+    assert cache.get_or_compute(2, "summary", (), lambda: "s2'") == "s2"
+
+
+def test_value_computed_across_an_invalidation_is_not_stored():
+    cache = _cache()
+
+    def compute():
+        cache.invalidate(1)
+        return "stale"
+
+    assert cache.get_or_compute(1, "summary", (), compute) == "stale"
+    assert cache.get_or_compute(1, "summary", (), lambda: "fresh") == "fresh"
+
+
+def test_summary_is_served_from_cache_until_an_expense_is_written(monkeypatch):
+    with db.connection.get_connection() as conn:
+        conn.execute("INSERT INTO users (user_id, username, password_hash, budget) VALUES (1, 'u1', 'pw', 100)")
+        conn.execute("INSERT INTO categories (category_id, user_id, name) VALUES (1, 1, 'cat')")
+    monkeypatch.setattr("services.summary_service.get_jwt_identity", lambda: "u1")
+    monkeypatch.setattr("services.expenses_service.get_jwt_identity", lambda: "u1")
+    summary_service = SummaryService.get_singleton()
+
+    assert summary_service.get_summary()["monthlyExpenses"] == 0
+    hits = summary_service.cache.stats()["hits"]
+    assert summary_service.get_summary()["monthlyExpenses"] == 0
+    assert summary_service.cache.stats()["hits"] == hits + 1
+
+    ExpensesService.get_singleton().add_expense(1, Decimal("10"), transaction_date=date.today())
+    assert summary_service.get_summary()["monthlyExpenses"] == 10
+
+    # Written by another worker, whose invalidation has not arrived: the data version still gives it away
+    with db.connection.get_connection() as conn:
+        conn.execute("INSERT INTO transactions (user_id, category_id, amount) VALUES (1, 1, 5)")
+    assert summary_service.get_summary()["monthlyExpenses"] == 15
+
+
+def test_entry_of_an_older_version_is_not_served_under_the_requests_version():
+    cache = _cache()
+    app = Flask(__name__)
+    with app.test_request_context():
+        g.data_version = (1, 3)
+        cache.get_or_compute(1, "summary", (), lambda: "v3")
+        assert cache.get_or_compute(1, "summary", (), lambda: "v3'") == "v3"
+
+    # The ETag of this request says version 4
+    with app.test_request_context():
+        g.data_version = (1, 4)
+        assert cache.get_or_compute(1, "summary", (), lambda: "v4") == "v4"
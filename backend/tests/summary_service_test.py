@@ -127,3 +127,23 @@ def test_get_summary_percentage_over_budget(monkeypatch):
     assert summary["monthlyExpenses"] == 150.0
     assert summary["budgetRemaining"] == -50.0
     assert summary["percentageUsed"] == 150.0
+
+
+def test_get_summary_includes_month_boundaries(monkeypatch):
+    _set_user("u1", 1, Decimal("1000"))
+    _set_category(1, 1, "Food")
+
+    today = date.today()
+    first_day = today.replace(day=1)
+    next_month = (first_day + timedelta(days=32)).replace(day=1)
+    last_day = next_month - timedelta(days=1)
+    _set_transaction(1, 1, 1, Decimal("10.25"), first_day, "First day")
+    _set_transaction(2, 1, 1, Decimal("20.50"), last_day, "Last day")
+    _set_transaction(3, 1, 1, Decimal("400"), next_month, "Next month")
+
+    monkeypatch.setattr("services.summary_service.get_jwt_identity", lambda: "u1")
+    service = SummaryService.get_singleton()
+    summary = service.get_summary()
+
+    assert summary["monthlyExpenses"] == 30.75
+    assert summary["budgetRemaining"] == 969.25
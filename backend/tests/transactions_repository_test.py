@@ -0,0 +1,61 @@
+from datetime import date
+from decimal import Decimal
+
+import db.connection
+import repository.transactions_repository as transactions_repository
+from entities.transaction import Transaction
+
+
+def _set_user_with_category(user_id: int, category_id: int):
+    with db.connection.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO users (user_id, username, password_hash) VALUES (%s, %s, 'pw')",
+            (user_id, f"u{user_id}"),
+        )
+        conn.execute(
+            "INSERT INTO categories (category_id, user_id, name) VALUES (%s, %s, 'cat')",
+            (category_id, user_id),
+        )
+
+
+def _transaction(amount, transaction_id=None) -> Transaction:
+    return Transaction(transaction_id, 1, 1, Decimal(amount), date(2026, 1, 1), "note")
+
+
+def test_create_transaction_allocates_distinct_ids():
+    _set_user_with_category(1, 1)
+
+    first = transactions_repository.create_transaction(_transaction("10"))
+    second = transactions_repository.create_transaction(_transaction("20"))
+
+    assert second > first
+    assert transactions_repository.get_transaction(first).amount == Decimal("10")
+    assert transactions_repository.get_transaction(second).amount == Decimal("20")
+
+
+def test_reserve_transaction_ids_returns_unused_block():
+    _set_user_with_category(1, 1)
+    existing = transactions_repository.create_transaction(_transaction("10"))
+
+    reserved = transactions_repository.reserve_transaction_ids(5)
+
+    assert len(set(reserved)) == 5
+    assert existing not in reserved
+    assert transactions_repository.reserve_transaction_ids(0) == []
+
+
+def test_create_transactions_inserts_batch_in_order():
+    _set_user_with_category(1, 1)
+    explicit_id = transactions_repository.reserve_transaction_ids(1)[0]
+
+    ids = transactions_repository.create_transactions([
+        _transaction("1"),
+        _transaction("2", transaction_id=explicit_id),
+        _transaction("3"),
+    ])
+
+    assert ids[1] == explicit_id
+    assert len(set(ids)) == 3
+    assert [transactions_repository.get_transaction(i).amount for i in ids] == [
+        Decimal("1"), Decimal("2"), Decimal("3")
+    ]
@@ -0,0 +1,127 @@
+import pytest
+from flask import Flask
+
+import db.connection
+import repository.users_repository as users_repository
+from db import unit_of_work
+
+
+def _make_app() -> Flask:
+    app = Flask(__name__)
+    unit_of_work.init_app(app, db.connection.get_pool)
+    return app
+
+
+def test_request_shares_one_connection():
+    app = _make_app()
+    backend_pids = []
+
+    @app.get("/probe")
+    def probe():
+        for _ in range(3):
+            with db.connection.get_connection() as conn:
+                backend_pids.append(conn.info.backend_pid)
+        return "", 204
+
+    app.test_client().get("/probe")
+
+    assert len(backend_pids) == 3
+    assert len(set(backend_pids)) == 1
+
+
+def test_request_commits_when_finished():
+    app = _make_app()
+
+    @app.post("/create")
+    def create():
+        users_repository.create_user("u1", "pw")
+        # Visible to later statements of the same request before commit
+        assert users_repository.get_user_by_username("u1") is not None
+        return "", 204
+
+    response = app.test_client().post("/create")
+
+    assert response.status_code == 204
+    assert users_repository.get_user_by_username("u1") is not None
+
+
+def test_request_rolls_back_on_error():
+    app = _make_app()
+
+    @app.post("/create")
+    def create():
+        users_repository.create_user("u1", "pw")
+        raise RuntimeError("boom")
+
+    response = app.test_client().post("/create")
+
+    assert response.status_code == 500
+    assert users_repository.get_user_by_username("u1") is None
+
+
+def test_request_without_queries_borrows_no_connection():
+    app = _make_app()
+
+    @app.get("/noop")
+    def noop():
+        assert not unit_of_work.current().active
+        return "", 204
+
+    assert app.test_client().get("/noop").status_code == 204
+
+
+def test_after_commit_callbacks_run_only_on_commit():
+    app = _make_app()
+    ran = []
+
+    @app.post("/write/<int:status>")
+    def write(status):
+        users_repository.create_user(f"u{status}", "pw")
+        unit_of_work.after_commit(lambda: ran.append(status))
+        assert ran == []
+        return "", status
+
+    client = app.test_client()
+    client.post("/write/204")
+    client.post("/write/500")
+
+    assert ran == [204]
+
+
+def test_snapshot_view_sees_one_consistent_snapshot():
+    app = _make_app()
+    seen = {}
+
+    @app.get("/snapshot")
+    @unit_of_work.snapshot
+    def snapshot():
+        with db.connection.get_connection() as conn:
+            seen["before"] = conn.execute("SELECT COUNT(*) AS n FROM users").fetchone()["n"]
+            seen["conn"] = conn
+            seen["isolation"] = conn.execute("SHOW transaction_isolation").fetchone()["transaction_isolation"]
+
+        # Committed by another transaction in the middle of the request
+        with db.connection.get_dedicated_connection() as other:
+            other.execute("INSERT INTO users (username, password_hash) VALUES ('late', 'pw')")
+
+        with db.connection.get_connection() as conn:
+            seen["after"] = conn.execute("SELECT COUNT(*) AS n FROM users").fetchone()["n"]
+        return "", 204
+
+    app.test_client().get("/snapshot")
+
+    assert seen["isolation"] == "repeatable read"
+    assert seen["before"] == seen["after"] == 0
+    # The pooled connection went back with the default settings
+    assert seen["conn"].isolation_level is None
+    assert seen["conn"].read_only is None
+
+
+def test_set_transaction_after_first_statement_fails():
+    uow = unit_of_work.UnitOfWork(db.connection.get_pool)
+    uow.connection()
+    try:
+        with pytest.raises(RuntimeError):
+            uow.set_transaction(read_only=True)
+    finally:
+        uow.close()
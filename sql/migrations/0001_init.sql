@@ -1,11 +1,14 @@
-CREATE TABLE users (
+-- Baseline schema (formerly sql/init.sql). IF NOT EXISTS lets databases created
+-- from init.sql adopt the migration history.
+
+CREATE TABLE IF NOT EXISTS users (
     user_id SERIAL PRIMARY KEY,
     username VARCHAR(50) UNIQUE NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
     budget NUMERIC(10, 2) DEFAULT 0
 );
 
-CREATE TABLE categories (
+CREATE TABLE IF NOT EXISTS categories (
     category_id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
     name VARCHAR(100) NOT NULL,
@@ -14,7 +17,7 @@ CREATE TABLE categories (
     CONSTRAINT unique_user_category UNIQUE (user_id, name)
 );
 
-CREATE TABLE transactions (
+CREATE TABLE IF NOT EXISTS transactions (
     transaction_id BIGINT NOT NULL,
     user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
     category_id INTEGER NOT NULL REFERENCES categories(category_id) ON DELETE RESTRICT,
@@ -0,0 +1,28 @@
+-- Primary key and access-path indexes for transactions
+
+-- Ids allocated as MAX(transaction_id) + 1 collide under concurrent inserts.
+-- Keep the first row of each duplicated id and renumber the others above the
+-- current maximum, so that the key can be added.
+WITH copies AS (
+    SELECT ctid AS row_ctid, row_number() OVER (PARTITION BY transaction_id ORDER BY ctid) AS copy
+    FROM transactions
+), renumbered AS (
+    SELECT row_ctid,
+           (SELECT COALESCE(MAX(transaction_id), 0) FROM transactions) + row_number() OVER (ORDER BY row_ctid) AS new_id
+    FROM copies
+    WHERE copy > 1
+)
+UPDATE transactions t SET transaction_id = r.new_id
+FROM renumbered r
+WHERE t.ctid = r.row_ctid;
+
+ALTER TABLE transactions ADD CONSTRAINT transactions_pkey PRIMARY KEY (transaction_id);
+
+-- Per-user listing, date-range filters, aggregates and keyset pagination
+CREATE INDEX transactions_user_date_idx ON transactions (user_id, transaction_date, transaction_id);
+
+-- Per-user category filters
+CREATE INDEX transactions_user_category_idx ON transactions (user_id, category_id, transaction_date);
+
+-- Deleting a category checks for referencing transactions (ON DELETE RESTRICT)
+CREATE INDEX transactions_category_idx ON transactions (category_id);
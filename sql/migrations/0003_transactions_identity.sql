@@ -0,0 +1,10 @@
+-- Allocate transaction ids from an identity sequence instead of MAX(transaction_id) + 1.
+-- BY DEFAULT keeps explicit ids (e.g. from imports) possible.
+
+ALTER TABLE transactions ALTER COLUMN transaction_id ADD GENERATED BY DEFAULT AS IDENTITY;
+
+SELECT setval(
+    pg_get_serial_sequence('transactions', 'transaction_id'),
+    COALESCE((SELECT MAX(transaction_id) FROM transactions), 0) + 1,
+    false
+);
@@ -0,0 +1,5 @@
+-- Duplicate detection for statement imports: a transaction is identified by its
+-- content (date, amount, notes) within the user's ledger.
+
+CREATE INDEX transactions_user_content_idx
+    ON transactions (user_id, transaction_date, amount, md5(COALESCE(notes, '')));
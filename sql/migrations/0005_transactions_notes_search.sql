@@ -0,0 +1,8 @@
+-- Full-text search over expense notes. The 'simple' configuration does no
+-- language-specific stemming, which suits notes written in any language.
+
+ALTER TABLE transactions
+    ADD COLUMN notes_search TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('simple', COALESCE(notes, ''))) STORED;
+
+CREATE INDEX transactions_notes_search_idx ON transactions USING GIN (notes_search);
@@ -0,0 +1,7 @@
+-- Typo-tolerant search and autocomplete over expense notes. Lookups combine
+-- this index with the user_id indexes from 0002. pg_trgm is a trusted
+-- extension, the database owner can create it.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX transactions_notes_trgm_idx ON transactions USING GIN (notes gin_trgm_ops);
@@ -0,0 +1,102 @@
+-- Per-user, per-month, per-category totals of transactions, so summaries and
+-- monthly charts read a few rows instead of aggregating the whole history.
+--
+-- Kept exact by statement-level triggers on transactions: every INSERT,
+-- UPDATE (including moves between months and categories), DELETE and COPY
+-- adjusts the affected rows in the same transaction, once per statement.
+-- Groups whose count drops to zero are removed. `python -m db.rollups`
+-- rebuilds the table from transactions.
+
+CREATE TABLE monthly_category_totals (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    category_id INTEGER NOT NULL,
+    total NUMERIC(14, 2) NOT NULL,
+    expense_count INTEGER NOT NULL,
+
+    PRIMARY KEY (user_id, month, category_id)
+);
+
+-- Normally empty: lets each statement find emptied groups without a scan
+CREATE INDEX monthly_category_totals_empty_idx ON monthly_category_totals (user_id)
+    WHERE expense_count = 0;
+
+CREATE FUNCTION monthly_category_totals_apply() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO monthly_category_totals AS m (user_id, month, category_id, total, expense_count)
+        SELECT user_id, date_trunc('month', transaction_date)::date, category_id, SUM(amount), COUNT(*)
+        FROM new_rows
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, month, category_id) DO UPDATE
+            SET total = m.total + EXCLUDED.total,
+                expense_count = m.expense_count + EXCLUDED.expense_count;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        -- Only ever decrements existing groups, so rows removed by a user
+        -- cascade never re-insert totals for that user
+        UPDATE monthly_category_totals m
+        SET total = m.total - d.total,
+            expense_count = m.expense_count - d.expense_count
+        FROM (
+            SELECT user_id, date_trunc('month', transaction_date)::date AS month, category_id,
+                   SUM(amount) AS total, COUNT(*) AS expense_count
+            FROM old_rows
+            GROUP BY 1, 2, 3
+        ) d
+        WHERE m.user_id = d.user_id AND m.month = d.month AND m.category_id = d.category_id;
+    ELSE
+        INSERT INTO monthly_category_totals AS m (user_id, month, category_id, total, expense_count)
+        SELECT user_id, date_trunc('month', transaction_date)::date, category_id, SUM(amount), SUM(n)
+        FROM (
+            SELECT user_id, transaction_date, category_id, amount, 1 AS n FROM new_rows
+            UNION ALL
+            SELECT user_id, transaction_date, category_id, -amount, -1 FROM old_rows
+        ) d
+        GROUP BY 1, 2, 3
+        -- Edits that leave a group unchanged (e.g. notes only) write nothing
+        HAVING SUM(amount) <> 0 OR SUM(n) <> 0
+        ON CONFLICT (user_id, month, category_id) DO UPDATE
+            SET total = m.total + EXCLUDED.total,
+                expense_count = m.expense_count + EXCLUDED.expense_count;
+    END IF;
+
+    DELETE FROM monthly_category_totals WHERE expense_count = 0;
+    RETURN NULL;
+END;
+$$;
+
+CREATE FUNCTION monthly_category_totals_truncate() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- DELETE rather than TRUNCATE: a TRUNCATE ... CASCADE from users may
+    -- already be truncating the rollup in this statement
+    DELETE FROM monthly_category_totals;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables require one trigger per event
+CREATE TRIGGER transactions_monthly_totals_insert
+    AFTER INSERT ON transactions REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION monthly_category_totals_apply();
+
+CREATE TRIGGER transactions_monthly_totals_update
+    AFTER UPDATE ON transactions REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION monthly_category_totals_apply();
+
+CREATE TRIGGER transactions_monthly_totals_delete
+    AFTER DELETE ON transactions REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION monthly_category_totals_apply();
+
+CREATE TRIGGER transactions_monthly_totals_truncate
+    AFTER TRUNCATE ON transactions
+    FOR EACH STATEMENT EXECUTE FUNCTION monthly_category_totals_truncate();
+
+INSERT INTO monthly_category_totals (user_id, month, category_id, total, expense_count)
+SELECT user_id, date_trunc('month', transaction_date)::date, category_id, SUM(amount), COUNT(*)
+FROM transactions
+GROUP BY 1, 2, 3;
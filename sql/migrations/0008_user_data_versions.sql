@@ -0,0 +1,63 @@
+-- Per-user data version for HTTP conditional requests (ETag/Last-Modified).
+-- Bumped in the writing transaction by any change to the user's transactions
+-- or categories, and by a budget change. Users without a row are at version 0.
+
+CREATE TABLE user_data_versions (
+    user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE FUNCTION bump_user_data_version() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    affected INTEGER[];
+BEGIN
+    IF TG_LEVEL = 'ROW' THEN
+        affected := ARRAY[NEW.user_id];
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT user_id) INTO affected FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT user_id) INTO affected FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT user_id) INTO affected
+        FROM (SELECT user_id FROM new_rows UNION ALL SELECT user_id FROM old_rows) r;
+    END IF;
+
+    -- Joining users skips users deleted in this statement (cascades)
+    INSERT INTO user_data_versions AS v (user_id, version, updated_at)
+    SELECT user_id, 1, now() FROM users WHERE user_id = ANY(affected)
+    ON CONFLICT (user_id) DO UPDATE SET version = v.version + 1, updated_at = now();
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables require one trigger per event
+CREATE TRIGGER transactions_data_version_insert
+    AFTER INSERT ON transactions REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_user_data_version();
+
+CREATE TRIGGER transactions_data_version_update
+    AFTER UPDATE ON transactions REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_user_data_version();
+
+CREATE TRIGGER transactions_data_version_delete
+    AFTER DELETE ON transactions REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_user_data_version();
+
+CREATE TRIGGER categories_data_version_insert
+    AFTER INSERT ON categories REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_user_data_version();
+
+CREATE TRIGGER categories_data_version_update
+    AFTER UPDATE ON categories REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_user_data_version();
+
+CREATE TRIGGER categories_data_version_delete
+    AFTER DELETE ON categories REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_user_data_version();
+
+CREATE TRIGGER users_data_version_budget
+    AFTER UPDATE OF budget ON users
+    FOR EACH ROW WHEN (OLD.budget IS DISTINCT FROM NEW.budget)
+    EXECUTE FUNCTION bump_user_data_version();
@@ -0,0 +1,37 @@
+-- Publish every bump of a user's data version on the user_data_changed
+-- channel, so each backend worker can drop its cached copies of that user's
+-- data. NOTIFY is transactional: listeners only hear about committed changes.
+-- Payload: {"user_id": ..., "entity": <table name>, "version": ...}
+
+CREATE OR REPLACE FUNCTION bump_user_data_version() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    affected INTEGER[];
+    bumped RECORD;
+BEGIN
+    IF TG_LEVEL = 'ROW' THEN
+        affected := ARRAY[NEW.user_id];
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT user_id) INTO affected FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT user_id) INTO affected FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT user_id) INTO affected
+        FROM (SELECT user_id FROM new_rows UNION ALL SELECT user_id FROM old_rows) r;
+    END IF;
+
+    -- Joining users skips users deleted in this statement (cascades)
+    FOR bumped IN
+        INSERT INTO user_data_versions AS v (user_id, version, updated_at)
+        SELECT user_id, 1, now() FROM users WHERE user_id = ANY(affected)
+        ON CONFLICT (user_id) DO UPDATE SET version = v.version + 1, updated_at = now()
+        RETURNING v.user_id, v.version
+    LOOP
+        PERFORM pg_notify(
+            'user_data_changed',
+            json_build_object('user_id', bumped.user_id, 'entity', TG_TABLE_NAME, 'version', bumped.version)::text
+        );
+    END LOOP;
+    RETURN NULL;
+END;
+$$;
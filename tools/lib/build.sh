@@ -11,13 +11,22 @@ function build-backend() {
 }
 
 function start-backend() {
-    GUNICORN_WORKERS="${1:-2}"
-    BACKEND_HOST="${2:-0.0.0.0}"
-    BACKEND_PORT="${3:-5000}"
+    # Workers are sized from the CPU count unless given (see gunicorn.conf.py)
+    if [ -n "${1:-}" ]; then export GUNICORN_WORKERS="$1"; fi
+    export HOST="${2:-${HOST:-0.0.0.0}}"
+    export PORT="${3:-${PORT:-5000}}"
     cd ${BACKEND_DIR} && \
-    exec gunicorn -w "${GUNICORN_WORKERS}" \
-        -b "${BACKEND_HOST}:${BACKEND_PORT}" \
-        app:app
+    exec gunicorn -c gunicorn.conf.py wsgi:app
+}
+
+function migrate-backend() {
+    cd ${BACKEND_DIR} && \
+    python -m db.migrations
+}
+
+function rebuild-rollups-backend() {
+    cd ${BACKEND_DIR} && \
+    python -m db.rollups "$@"
 }
 
 function build-frontend() {